@@ -0,0 +1,98 @@
+import argparse
+import random
+import time
+
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from check_packing import synthetic_scripts, tiny_tokenizer
+from check_script_server import LLAMA3_CHAT_TEMPLATE
+from generate import build_prompt, generate_script, generate_scripts
+
+# ============================================================
+# Batch generation benchmark on a small CPU model
+# ------------------------------------------------------------
+# Generates scripts for the same summaries:
+#   - one at a time with model.generate (generate_script, as
+#     generate.py did)
+#   - with model.generate on batches of 16 (finished rows keep
+#     being computed, padded, until the longest is done)
+#   - with generate_scripts at increasing max_batch
+# checks that every batched script equals its one-at-a-time
+# script, and reports scripts/s for each.
+#
+# The random model is initialized wide enough that it emits
+# <|eot_id|> at varying points, so scripts end at different
+# lengths, like real ones, and rows leave their batch at
+# different steps.
+#
+# Usage:
+#   python bench_batch_generation.py --summaries 32 --max-new-tokens 64
+# ============================================================
+
+
+def bench_model(tokenizer):
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=256, intermediate_size=512, num_hidden_layers=4,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=1024,
+        pad_token_id=tokenizer.pad_token_id,
+        initializer_range=0.2,   # wider than default so greedy output doesn't collapse to one token
+    )
+    return LlamaForCausalLM(config).eval()
+
+
+def synthetic_summaries(count, seed=0):
+    rng = random.Random(seed)
+    texts = synthetic_scripts(count, seed=seed)
+    # Summaries of very different lengths, as scraped articles are
+    return [" ".join(t.split()[:rng.randint(10, 120)]) for t in texts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched script generation.")
+    parser.add_argument("--summaries", type=int, default=32)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    summaries = synthetic_summaries(args.summaries)
+    tokenizer = tiny_tokenizer(synthetic_scripts(300))
+    tokenizer.chat_template = LLAMA3_CHAT_TEMPLATE
+    model = bench_model(tokenizer)
+
+    model.generation_config.eos_token_id = tokenizer.convert_tokens_to_ids("<|eot_id|>")
+    model.generation_config.pad_token_id = tokenizer.pad_token_id
+
+    start = time.perf_counter()
+    expected = [generate_script(model, tokenizer, s, max_new_tokens=args.max_new_tokens) for s in summaries]
+    serial = time.perf_counter() - start
+    lengths = [len(tokenizer(s, add_special_tokens=False)["input_ids"]) for s in expected]
+    print(f"{len(summaries)} summaries, max_new_tokens {args.max_new_tokens}, "
+          f"script lengths {min(lengths)}-{max(lengths)} tokens (mean {sum(lengths) / len(lengths):.0f})")
+    print(f"{'mode':22} {'seconds':>8} {'scripts/s':>10} {'speedup':>8}")
+    print(f"{'model.generate x1':22} {serial:8.2f} {len(summaries) / serial:10.2f} {1.0:7.1f}x")
+
+    start = time.perf_counter()
+    tokenizer.padding_side = "left"
+    for i in range(0, len(summaries), 16):
+        prompts = [build_prompt(tokenizer, s) for s in summaries[i:i + 16]]
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True, add_special_tokens=False)
+        with torch.no_grad():
+            model.generate(**inputs, max_new_tokens=args.max_new_tokens, do_sample=False)
+    elapsed = time.perf_counter() - start
+    print(f"{'model.generate x16':22} {elapsed:8.2f} {len(summaries) / elapsed:10.2f} {serial / elapsed:7.1f}x")
+
+    for max_batch in (1, 4, 8, 16, 32):
+        start = time.perf_counter()
+        scripts = generate_scripts(model, tokenizer, summaries, max_new_tokens=args.max_new_tokens,
+                                   max_batch=max_batch)
+        elapsed = time.perf_counter() - start
+        mismatches = sum(a != b for a, b in zip(scripts, expected))
+        assert mismatches == 0, f"max_batch {max_batch}: {mismatches} scripts differ from model.generate"
+        print(f"{f'batched, max_batch {max_batch}':22} {elapsed:8.2f} {len(summaries) / elapsed:10.2f} "
+              f"{serial / elapsed:7.1f}x")
+    print("Every batched script matches its one-at-a-time script.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import math
+import time
+
+from datasets import Dataset
+from transformers import LlamaConfig, LlamaForCausalLM, Trainer, TrainingArguments
+
+from check_packing import format_script, synthetic_scripts, tiny_tokenizer
+from packing import (
+    LengthBucketMixin, PackedCollator, PaddedCollator, pack_dataset, tokenize_dataset,
+)
+
+# ============================================================
+# Packing / bucketing throughput benchmark on a tiny CPU model
+# ------------------------------------------------------------
+# Trains the same synthetic scripts three ways (with Trainer,
+# SFTTrainer's base: recent trl computes its loss with a GPU-only
+# fused kernel),
+# with train.py's effective batch of 8 rows per optimizer step:
+#   padded:   one example per micro-batch, grad accum 8 (before)
+#   bucketed: 8 similar-length examples per batch, padded per batch
+#   packed:   examples packed into MAX_LENGTH rows, grad accum 8
+# and reports optimizer steps per epoch and trained (non-pad)
+# tokens per second over a few steps.
+#
+# Usage:
+#   python bench_packing.py --examples 2000 --steps 4
+# ============================================================
+
+MAX_LENGTH = 512
+
+
+class BucketedTrainer(LengthBucketMixin, Trainer):
+    pass
+
+
+def bench_model(tokenizer):
+    config = LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=256, intermediate_size=512, num_hidden_layers=4,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=MAX_LENGTH,
+        pad_token_id=tokenizer.pad_token_id, use_cache=False,
+    )
+    return LlamaForCausalLM(config)
+
+
+def run(mode, texts, tokenizer, steps):
+    dataset = Dataset.from_dict({"text": texts})
+    batch_size, grad_accum, trainer_cls = 1, 8, Trainer
+    if mode == "packed":
+        dataset = pack_dataset(dataset, tokenizer, MAX_LENGTH)
+        collator = PackedCollator(tokenizer.pad_token_id)
+    else:
+        dataset = tokenize_dataset(dataset, tokenizer, MAX_LENGTH)
+        collator = PaddedCollator(tokenizer.pad_token_id)
+    if mode == "bucketed":
+        batch_size, grad_accum, trainer_cls = 8, 1, BucketedTrainer
+
+    args = TrainingArguments(
+        output_dir=f"/tmp/bench_packing_{mode}", per_device_train_batch_size=batch_size,
+        gradient_accumulation_steps=grad_accum, max_steps=steps, learning_rate=2e-4,
+        logging_strategy="no", save_strategy="no", report_to="none", use_cpu=True,
+        dataloader_drop_last=False,
+    )
+    trainer = trainer_cls(
+        model=bench_model(tokenizer), args=args, train_dataset=dataset, data_collator=collator,
+    )
+    steps_per_epoch = math.ceil(len(trainer.get_train_dataloader()) / grad_accum)
+    start = time.perf_counter()
+    trainer.train()
+    elapsed = time.perf_counter() - start
+
+    real_tokens = sum(len(tokenizer(t, add_special_tokens=False)["input_ids"]) for t in texts)
+    tokens_per_step = real_tokens / steps_per_epoch
+    return steps_per_epoch, tokens_per_step * steps / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequence packing and length bucketing.")
+    parser.add_argument("--examples", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=4, help="Optimizer steps to time per mode")
+    args = parser.parse_args()
+
+    texts = [format_script(s) for s in synthetic_scripts(args.examples)]
+    tokenizer = tiny_tokenizer(texts)
+    print(f"{args.examples} examples, MAX_LENGTH {MAX_LENGTH}, 8 rows per optimizer step")
+    print(f"{'mode':10} {'steps/epoch':>12} {'tokens/s':>10}")
+    baseline = None
+    for mode in ("padded", "bucketed", "packed"):
+        steps_per_epoch, tokens_per_second = run(mode, texts, tokenizer, args.steps)
+        baseline = baseline or tokens_per_second
+        print(f"{mode:10} {steps_per_epoch:12} {tokens_per_second:10.0f}  ({tokens_per_second / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import queue
+import random
+import threading
+import time
+
+import torch
+
+from bench_batch_generation import bench_model, synthetic_summaries
+from check_packing import synthetic_scripts, tiny_tokenizer
+from check_script_server import LLAMA3_CHAT_TEMPLATE
+from generate import PromptPrefix, complete_sentences, generate_script, stream_script
+
+# ============================================================
+# Streaming generation -> TTS latency benchmark (small CPU model)
+# ------------------------------------------------------------
+# For each summary, the time until narration audio is ready:
+#   - whole script: generate_script, then TTS of the full script
+#     (what the frontend does today: /api/generate-audio after
+#     generation returns)
+#   - streamed: stream_script, with a TTS worker synthesizing each
+#     sentence as soon as its "sentence" event arrives
+# TTS is simulated (sleep per word, --tts-ms-per-word; Edge TTS
+# takes roughly 30-60 ms a word), so only the overlap is measured.
+# Also reports time-to-first-token and time-to-first-sentence,
+# and checks the streamed script equals generate_script's.
+#
+# The random model never ends a sentence by itself, so it is made
+# to write "." at pseudo-random steps (about every
+# --sentence-tokens tokens, as a fine-tuned script would).
+#
+# Usage:
+#   python bench_streaming.py --summaries 8 --max-new-tokens 128
+# ============================================================
+
+
+def end_sentences(model, tokenizer, every, seed=0):
+    # Forces "." at steps picked from the sequence length alone, so
+    # generate_script (model.generate) and stream_script agree
+    period = tokenizer.convert_tokens_to_ids(".")
+    length = {}
+
+    def remember_length(module, args, kwargs):
+        length["tokens"] = kwargs["past_key_values"].get_seq_length() + kwargs["input_ids"].shape[-1]
+
+    def add_period(module, args, output):
+        if random.Random(length["tokens"] * 1000 + seed).random() < 1 / every:
+            output[:, -1, period] += 100
+        return output
+
+    model.model.register_forward_pre_hook(remember_length, with_kwargs=True)
+    model.lm_head.register_forward_hook(add_period)
+
+
+def fake_tts(text, ms_per_word):
+    time.sleep(len(text.split()) * ms_per_word / 1000)
+
+
+def whole_script(model, tokenizer, summary, args, prefix):
+    start = time.perf_counter()
+    script = generate_script(model, tokenizer, summary, args.max_new_tokens, prefix=prefix)
+    generated = time.perf_counter() - start
+    fake_tts(script, args.tts_ms_per_word)
+    return script, generated, time.perf_counter() - start
+
+
+def streamed(model, tokenizer, summary, args, prefix):
+    start = time.perf_counter()
+    sentences = queue.Queue()
+
+    def tts_worker():
+        for sentence in iter(sentences.get, None):
+            fake_tts(sentence, args.tts_ms_per_word)
+
+    worker = threading.Thread(target=tts_worker)
+    worker.start()
+    for event in stream_script(model, tokenizer, summary, args.max_new_tokens, prefix=prefix):
+        if event["event"] == "sentence":
+            sentences.put(event["text"])
+        elif event["event"] == "done":
+            done = event
+    sentences.put(None)
+    worker.join()
+    return done, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streamed generation feeding TTS.")
+    parser.add_argument("--summaries", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--tts-ms-per-word", type=float, default=40)
+    parser.add_argument("--sentence-tokens", type=int, default=15)
+    args = parser.parse_args()
+
+    text = "No cap. It's giving \"chaos!\" Period...\nNew line u.s. 3.5 bn"
+    sentences, rest = complete_sentences(text)
+    assert sentences == ["No cap.", "It's giving \"chaos!\"", "Period...", "New line u.s."], sentences
+    assert text[rest:] == "3.5 bn"
+
+    summaries = synthetic_summaries(args.summaries)
+    tokenizer = tiny_tokenizer([f"{script}." for script in synthetic_scripts(300)])   # with a "." token
+    tokenizer.chat_template = LLAMA3_CHAT_TEMPLATE
+    model = bench_model(tokenizer)
+    model.generation_config.eos_token_id = tokenizer.convert_tokens_to_ids("<|eot_id|>")
+    model.generation_config.pad_token_id = tokenizer.pad_token_id
+    end_sentences(model, tokenizer, args.sentence_tokens)
+    prefix = PromptPrefix(model, tokenizer)
+
+    totals = {"generate": 0.0, "whole": 0.0, "streamed": 0.0, "first_token": 0.0, "first_sentence": 0.0}
+    count = 0
+    for summary in summaries:
+        script, generated, whole = whole_script(model, tokenizer, summary, args, prefix)
+        done, total = streamed(model, tokenizer, summary, args, prefix)
+        assert done["script"] == script, "streamed script differs from generate_script"
+        count += done["sentences"]
+        totals["generate"] += generated
+        totals["whole"] += whole
+        totals["streamed"] += total
+        totals["first_token"] += done["time_to_first_token"] or done["seconds"]
+        totals["first_sentence"] += done["time_to_first_sentence"] or done["seconds"]
+
+    n = len(summaries)
+    print(f"{n} scripts, {count} sentences, TTS simulated at {args.tts_ms_per_word:.0f} ms/word")
+    print(f"mean time to first token    {totals['first_token'] / n * 1000:8.0f} ms")
+    print(f"mean time to first sentence {totals['first_sentence'] / n * 1000:8.0f} ms "
+          f"(whole script: {totals['generate'] / n * 1000:.0f} ms)")
+    print(f"mean article -> audio, whole script then TTS {totals['whole'] / n * 1000:8.0f} ms")
+    print(f"mean article -> audio, streamed sentences    {totals['streamed'] / n * 1000:8.0f} ms "
+          f"({totals['whole'] / totals['streamed']:.2f}x)")
+    print("Streamed scripts match generate_script.")
+
+
+if __name__ == "__main__":
+    with torch.no_grad():
+        main()
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import torch
+import transformers
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraping"))
+from html_corpus import get_corpus
+from python_scraper import ArticleScraper
+from stand_in_server import StandInServer
+from telemetry import METRICS
+
+from bench_batch_generation import bench_model, synthetic_summaries
+from bench_transcript_store import synthetic_videos
+from check_packing import synthetic_scripts, tiny_tokenizer
+from check_script_server import LLAMA3_CHAT_TEMPLATE
+from generate import generate_script, generate_scripts
+from packing import tokenize_with_labels
+
+# ============================================================
+# Benchmark suite: scraping, extraction, training data prep and
+# generation, all offline, results as JSON
+# ------------------------------------------------------------
+# Fixtures:
+#   - news HTML pages: saved pages (--corpus) or the synthetic
+#     corpus from html_corpus.py
+#   - a local HTTP server serving them with --latency seconds
+#     per request (stand_in_server.py)
+#   - synthetic TikTok transcripts (bench_transcript_store.py)
+#   - a tiny random CPU Llama + BPE tokenizer trained on them
+#
+# Benchmarks (--only to pick):
+#   scrape    ArticleScraper.fetch_article end to end against
+#             the local server: pages/s, p50/p95 per page, and
+#             per stage (fetch, parse, metadata, readability,
+#             images) from telemetry.METRICS
+#   extract   ArticleScraper.extract on the same pages, no I/O
+#   format    train.py's formatting_function, tokenization and
+#             tokenize_with_labels (what prepare_splits runs)
+#   generate  one script at a time (generate_script) versus
+#             generate_scripts batches
+#
+# Every benchmark runs --repeat times; each metric is the median.
+# Metric names say which way is better: *_per_s higher, *_ms
+# lower; anything else is informational.
+#
+# --compare flags every metric that got worse than the baseline
+# file by more than --tolerance and exits 1, so a run can gate a
+# change.
+#
+# Usage:
+#   python bench_suite.py --out baseline.json
+#   python bench_suite.py --compare baseline.json --out after.json
+#   python bench_suite.py --only scrape extract --corpus fixtures/ --latency 0.05
+# ============================================================
+
+BENCHMARKS = ["scrape", "extract", "format", "generate"]
+STAGES = ["fetch", "parse", "metadata", "readability", "images"]
+TRAIN_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "train.py")
+DEFAULT_TOLERANCE = 0.10
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def stage_means_ms(stages):
+    timers = METRICS.snapshot()["timers"]
+    return {f"{stage}_ms": timers[stage]["mean_seconds"] * 1000 for stage in stages if stage in timers}
+
+
+# ---- fixtures ----
+
+def html_route(html):
+    return 200, {"Content-Type": "text/html; charset=utf-8"}, html.encode("utf-8")
+
+
+def train_formatting_function(path=TRAIN_PY):
+    # train.py loads an 8B model at import time (and needs HF_TOKEN
+    # filled in), so the function is taken from its source instead:
+    # the benchmark always measures the template train.py uses.
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    start = source.index("def formatting_function(")
+    lines = source[start:].split("\n")
+    end = next(i for i, line in enumerate(lines[1:], 1) if line and not line[0].isspace())
+    namespace = {}
+    exec("\n".join(lines[:end]), namespace)
+    return namespace["formatting_function"]
+
+
+def generation_fixture(seed=0):
+    tokenizer = tiny_tokenizer(synthetic_scripts(300, seed=seed))
+    tokenizer.chat_template = LLAMA3_CHAT_TEMPLATE
+    model = bench_model(tokenizer)
+    model.generation_config.eos_token_id = tokenizer.convert_tokens_to_ids("<|eot_id|>")
+    model.generation_config.pad_token_id = tokenizer.pad_token_id
+    return model, tokenizer
+
+
+# ---- benchmarks ----
+
+def bench_scrape(pages, args):
+    routes = {f"/article/{i}": html_route(html) for i, (_, html) in enumerate(pages)}
+    METRICS.reset()
+    seconds = []
+    with StandInServer(routes, latency=args.latency) as server:
+        started = time.perf_counter()
+        for path in routes:
+            page_started = time.perf_counter()
+            ArticleScraper(server.url(path)).fetch_article()
+            seconds.append(time.perf_counter() - page_started)
+        elapsed = time.perf_counter() - started
+    return {
+        "pages": len(seconds),
+        "pages_per_s": len(seconds) / elapsed,
+        "page_p50_ms": percentile(seconds, 0.5) * 1000,
+        "page_p95_ms": percentile(seconds, 0.95) * 1000,
+        **stage_means_ms(STAGES),
+    }
+
+
+def bench_extract(pages, args):
+    METRICS.reset()
+    started = time.perf_counter()
+    for _, html in pages:
+        ArticleScraper("https://news.example.com/story").extract(html)
+    elapsed = time.perf_counter() - started
+    return {"pages": len(pages), "pages_per_s": len(pages) / elapsed, **stage_means_ms(STAGES[1:])}
+
+
+def bench_format(fixture, args):
+    formatting_function, tokenizer, scripts = fixture
+    batch = {"tiktok_script": scripts}
+
+    started = time.perf_counter()
+    texts = formatting_function(batch)["text"]
+    format_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    ids = tokenizer(texts, add_special_tokens=False)["input_ids"]
+    tokenize_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    tokenize_with_labels(texts, tokenizer, max_length=args.max_length)
+    labels_seconds = time.perf_counter() - started
+
+    tokens = sum(len(row) for row in ids)
+    return {
+        "examples": len(scripts),
+        "tokens": tokens,
+        "format_examples_per_s": len(scripts) / format_seconds,
+        "tokenize_examples_per_s": len(scripts) / tokenize_seconds,
+        "tokenize_tokens_per_s": tokens / tokenize_seconds,
+        "labels_examples_per_s": len(scripts) / labels_seconds,
+    }
+
+
+def bench_generate(fixture, args):
+    model, tokenizer, summaries = fixture
+    METRICS.reset()
+    started = time.perf_counter()
+    single = [generate_script(model, tokenizer, s, max_new_tokens=args.max_new_tokens) for s in summaries]
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = generate_scripts(model, tokenizer, summaries, max_new_tokens=args.max_new_tokens)
+    batched_seconds = time.perf_counter() - started
+
+    tokens = sum(len(tokenizer(s, add_special_tokens=False)["input_ids"]) for s in batched)
+    return {
+        "scripts": len(summaries),
+        "single_scripts_per_s": len(summaries) / single_seconds,
+        "batched_scripts_per_s": len(summaries) / batched_seconds,
+        "batched_tokens_per_s": tokens / batched_seconds,
+        "batch_speedup": single_seconds / batched_seconds,
+        "scripts_match": sum(a == b for a, b in zip(single, batched)) == len(summaries),
+        **stage_means_ms(["tokenize", "prefill", "decode"]),
+    }
+
+
+def fixtures_for(name, args):
+    if name in ("scrape", "extract"):
+        return get_corpus(args.corpus, args.pages)
+    if name == "format":
+        scripts = [v["voice_to_text"] for v in synthetic_videos(1, args.examples)]
+        return train_formatting_function(), tiny_tokenizer(scripts[:300]), scripts
+    model, tokenizer = generation_fixture()
+    return model, tokenizer, synthetic_summaries(args.summaries)
+
+
+RUNNERS = {"scrape": bench_scrape, "extract": bench_extract, "format": bench_format, "generate": bench_generate}
+
+
+def run_benchmark(name, args):
+    # Warm-up run (imports, parser and allocator caches), then the
+    # median of each metric over --repeat runs
+    fixture = fixtures_for(name, args)
+    RUNNERS[name](fixture, args)
+    runs = [RUNNERS[name](fixture, args) for _ in range(args.repeat)]
+    result = {}
+    for key, value in runs[0].items():
+        if isinstance(value, float):
+            result[key] = round(statistics.median(run[key] for run in runs), 4)
+        else:
+            result[key] = value
+    return result
+
+
+# ---- results ----
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(TRAIN_PY), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args):
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+    }
+
+
+def direction(metric):
+    # +1: higher is better, -1: lower is better, 0: not compared
+    if metric.endswith("_per_s") or metric.endswith("_speedup"):
+        return 1
+    if metric.endswith("_ms"):
+        return -1
+    return 0
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Returns (benchmark.metric, baseline, current, relative change)
+    # for every metric that got worse by more than tolerance
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            before = baseline.get(name, {}).get(metric)
+            if not sign or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (value - before) / before
+            if sign * change < -tolerance:
+                regressions.append((f"{name}.{metric}", before, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite and write JSON results.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--out", default="bench_results.json", help="JSON results file ('-' for stdout only)")
+    parser.add_argument("--compare", help="Baseline results JSON: flag regressions and exit 1 if any")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown allowed before a metric counts as a regression")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus", help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument("--pages", type=int, default=50, help="Synthetic corpus size")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds the local server waits per request")
+    parser.add_argument("--examples", type=int, default=2000, help="Synthetic transcripts for the format benchmark")
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--summaries", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        started = time.perf_counter()
+        results[name] = run_benchmark(name, args)
+        print(f"{name:9} {time.perf_counter() - started:6.1f}s  "
+              + ", ".join(f"{k} {v:g}" if isinstance(v, float) else f"{k} {v}" for k, v in results[name].items()),
+              file=sys.stderr)
+
+    report = {"environment": environment(args), "results": results}
+    text = json.dumps(report, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if baseline["environment"].get("cpus") != os.cpu_count():
+            print("Warning: baseline ran on a different number of CPUs", file=sys.stderr)
+        for metric, before, after, change in regressions:
+            print(f"REGRESSION {metric}: {before:g} -> {after:g} ({change:+.0%})", file=sys.stderr)
+        print(f"{len(regressions)} regressions against {args.compare} "
+              f"(commit {baseline['environment'].get('commit')}, tolerance {args.tolerance:.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import csv
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from transcripts_generation import save_to_csv
+from transcript_store import TranscriptStore, load_table, parquet_files
+
+# ============================================================
+# CSV vs Parquet transcript store benchmark
+# ------------------------------------------------------------
+# Writes the same synthetic videos (page by page, like the
+# harvester) to the append-only CSV and to the Parquet store, then
+# reports for each:
+#   - write throughput (videos/s)
+#   - bytes on disk
+#   - load time (CSV: DictReader + int conversion; Parquet:
+#     memory-mapped load_table)
+# and then writes everything a second time, as a re-run of the
+# harvest would: the CSV doubles, the store upserts in place.
+#
+# Usage:
+#   python bench_transcript_store.py --accounts 20 --videos 2000
+# ============================================================
+
+WORDS = (
+    "so my roommate told me that she was moving out and honestly I did not expect "
+    "what happened next because the landlord called and said the rent was going up"
+).split()
+
+
+def synthetic_videos(accounts, per_account, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    videos = []
+    for a in range(accounts):
+        username = f"story_account_{a}"
+        for i in range(per_account):
+            videos.append({
+                "id": str(7_300_000_000_000_000_000 + a * 1_000_000 + i),
+                "username": username,
+                "video_description": f"Story time part {i} #reddit #storytime",
+                "like_count": rng.randint(0, 50000),
+                "view_count": rng.randint(1000, 2000000),
+                "voice_to_text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(80, 250))),
+                "create_time": int(start + rng.randint(0, 180) * 86400),
+            })
+    return videos
+
+
+def pages(videos, size=100):
+    for i in range(0, len(videos), size):
+        yield videos[i:i + size]
+
+
+def write_csv(videos, path):
+    for page in pages(videos):
+        save_to_csv(page, filename=path)
+
+
+def write_store(videos, root):
+    store = TranscriptStore(root)
+    for page in pages(videos):
+        store.upsert(page)
+    store.flush()
+
+
+def load_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["like_count"] = int(row["like_count"])
+        row["view_count"] = int(row["view_count"])
+    return len(rows)
+
+
+def load_store(root):
+    return load_table(root).num_rows
+
+
+def size_of(paths):
+    return sum(os.path.getsize(p) for p in paths)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CSV output against the Parquet store.")
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--videos", type=int, default=2000, help="Videos per account")
+    args = parser.parse_args()
+
+    videos = synthetic_videos(args.accounts, args.videos)
+    workdir = tempfile.mkdtemp(prefix="bench_store_")
+    csv_path = os.path.join(workdir, "videos.csv")
+    root = os.path.join(workdir, "transcripts")
+    try:
+        csv_write, _ = timed(write_csv, videos, csv_path)
+        store_write, _ = timed(write_store, videos, root)
+        csv_size = size_of([csv_path])
+        store_size = size_of(parquet_files(root))
+        csv_load, csv_rows = timed(load_csv, csv_path)
+        store_load, store_rows = timed(load_store, root)
+
+        print(f"{len(videos)} videos, {args.accounts} accounts, pages of 100")
+        print(f"{'':10} {'write/s':>10} {'size KB':>10} {'load s':>8} {'rows':>8}")
+        print(f"{'csv':10} {len(videos) / csv_write:10.0f} {csv_size / 1024:10.0f} {csv_load:8.3f} {csv_rows:8}")
+        print(f"{'parquet':10} {len(videos) / store_write:10.0f} {store_size / 1024:10.0f} {store_load:8.3f} {store_rows:8}")
+
+        # Second harvest of the same videos
+        write_csv(videos, csv_path)
+        write_store(videos, root)
+        print(f"After a re-run: csv {load_csv(csv_path)} rows ({size_of([csv_path]) / 1024:.0f} KB), "
+              f"parquet {load_store(root)} rows ({size_of(parquet_files(root)) / 1024:.0f} KB)")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import random
+
+import pyarrow as pa
+
+from bench_transcript_store import WORDS, synthetic_videos
+from curate_transcripts import curate, format_report
+from transcript_store import SCHEMA, video_row
+
+# ============================================================
+# Checks for curate_transcripts.py on a seeded table
+# ------------------------------------------------------------
+# Clean synthetic transcripts (bench_transcript_store.py) plus a
+# known number of bad rows of each kind:
+#   - empty or whitespace-only transcripts
+#   - transcripts under MIN_WORDS words
+#   - Spanish (Latin script) and Russian (Cyrillic) transcripts
+#   - exact reposts, differing only in case and whitespace
+#   - edited reposts: a couple of words changed
+#   - transcripts over the token budget
+# Every step must remove exactly its seeded rows and nothing
+# else; of a duplicate pair the more viewed copy is kept; top_k
+# keeps the most viewed survivors; with the optional steps turned
+# off, their rows stay.
+#
+# Usage:
+#   python check_curate_transcripts.py
+# ============================================================
+
+CLEAN = 300
+MAX_TOKENS = 600              # clean transcripts are at most ~400 estimated tokens
+SPANISH = ("mi compañera de piso me dijo que se iba a mudar y la verdad es que no esperaba lo que pasó "
+           "después porque el casero llamó y dijo que el alquiler iba a subir otra vez este mes")
+RUSSIAN = ("моя соседка сказала что она переезжает и честно говоря я не ожидала того что случилось "
+           "потом потому что хозяин позвонил и сказал что аренда снова вырастет в этом месяце")
+
+
+def seeded_table(seed=0):
+    rng = random.Random(seed)
+    clean = [video_row(v) for v in synthetic_videos(3, CLEAN // 3, seed=seed)]
+    for row in clean:
+        row["view_count"] = rng.randint(10_000, 1_000_000)
+    seeded = {"empty": [], "too_short": [], "not_english": [], "duplicate": [], "near_dup": [], "too_long": []}
+
+    def bad(kind, transcript, view_count=100):
+        row = {**clean[0], "id": f"{kind}-{len(seeded[kind])}", "transcript": transcript, "view_count": view_count}
+        seeded[kind].append(row)
+
+    for text in (None, "", "   ", "\n\t "):
+        bad("empty", text)
+    for n in (1, 5, 12, 19):
+        bad("too_short", " ".join(rng.choice(WORDS) for _ in range(n)))
+    for text in (SPANISH, RUSSIAN, SPANISH + " y nadie sabe qué hacer", RUSSIAN + " " + RUSSIAN):
+        bad("not_english", text)
+    # Reposts of the first clean rows, more viewed than the originals: the repost is the copy kept
+    for row in clean[:5]:
+        bad("duplicate", "  " + row["transcript"].upper().replace(" ", "  \n "), view_count=2_000_000)
+    # Edited reposts of the next rows, less viewed: the original is kept
+    for row in clean[5:10]:
+        words = row["transcript"].split()
+        for i in (len(words) // 3, 2 * len(words) // 3):
+            words[i] = "honestly"
+        bad("near_dup", " ".join(words))
+    for _ in range(3):
+        bad("too_long", " ".join(rng.choice(WORDS) for _ in range(900)))
+
+    rows = clean + [row for rows in seeded.values() for row in rows]
+    rng.shuffle(rows)
+    return pa.Table.from_pylist(rows, schema=SCHEMA), clean, seeded
+
+
+def main():
+    table, clean, seeded = seeded_table()
+    curated, report = curate(table, max_tokens=MAX_TOKENS)
+    print(format_report(report))
+
+    removed = {r["step"]: r["removed"] for r in report}
+    assert removed["normalize"] == 0
+    for kind, rows in seeded.items():
+        assert removed[kind] == len(rows), (kind, removed[kind], len(rows))
+
+    kept = set(curated["id"].to_pylist())
+    reposted = {row["id"] for row in clean[:5]}
+    expected = {row["id"] for row in clean} - reposted | {row["id"] for row in seeded["duplicate"]}
+    assert kept == expected, (sorted(kept - expected), sorted(expected - kept))
+    views = curated["view_count"].to_pylist()
+    assert views == sorted(views, reverse=True), "curated rows should be ranked by view_count"
+    assert all("  " not in t and t == t.strip() for t in curated["transcript"].to_pylist())
+
+    top, top_report = curate(table, max_tokens=MAX_TOKENS, top_k=25)
+    assert top_report[-1]["step"] == "top_k" and top_report[-1]["removed"] == len(expected) - 25
+    assert top["id"].to_pylist() == curated["id"].to_pylist()[:25]
+    assert min(top["view_count"].to_pylist()) >= max(curated["view_count"].to_pylist()[25:])
+
+    untouched, _ = curate(table, max_tokens=None, near_dup_threshold=0, english_only=False)
+    assert untouched.num_rows == table.num_rows - sum(len(seeded[k]) for k in ("empty", "too_short", "duplicate"))
+    print(f"Seeded {sum(map(len, seeded.values()))} bad rows among {len(clean)} clean: each step removed "
+          f"exactly its own, top_k=25 kept the 25 most viewed")
+    print("All curation checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from datasets import load_dataset
+from datasets.table import MemoryMappedTable
+
+from check_packing import INSTRUCTION, synthetic_scripts, tiny_tokenizer
+from dataset_cache import cache_key, data_files, load_or_build, prepare_splits
+
+# ============================================================
+# Checks for dataset_cache.py with a small local tokenizer
+# ------------------------------------------------------------
+#   1. The first run builds the cache; the second loads it, much
+#      faster, with identical splits
+#   2. Loaded splits are memory-mapped Arrow tables (no RAM copy)
+#   3. The key changes with the data, the tokenizer, the template
+#      version and the settings, and only with them
+#
+# Usage:
+#   python check_dataset_cache.py
+# ============================================================
+
+TEMPLATE_VERSION = 1
+
+
+def formatting_function(examples):
+    # Same template as train.py
+    return {"text": [
+        f"<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n"
+        f"{INSTRUCTION}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n"
+        f"{script}<|eot_id|>"
+        for script in examples["tiktok_script"]
+    ]}
+
+
+def write_json(path, scripts):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"tiktok_script": s} for s in scripts], f)
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="check_cache_")
+    try:
+        data_path = os.path.join(workdir, "reddit_transcripts.json")
+        cache_dir = os.path.join(workdir, "token_cache")
+        scripts = synthetic_scripts(5000)
+        write_json(data_path, scripts)
+        tokenizer = tiny_tokenizer(scripts[:500])
+
+        def key_for(tok=tokenizer, template=TEMPLATE_VERSION, max_length=512, test_size=0.1, min_words=20):
+            return cache_key(data_files=data_files(data_path), tokenizer=tok,
+                             template_version=template, max_length=max_length, batching="packed",
+                             test_size=test_size, curation={"min_words": min_words})
+
+        def build():
+            raw = load_dataset("json", data_files=data_path, split="train", cache_dir=os.path.join(workdir, "hf"))
+            return prepare_splits(raw, formatting_function, tokenizer, 512, batching="packed", seed=42)
+
+        key = key_for()
+        start = time.perf_counter()
+        built = load_or_build(cache_dir, key, build)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        cached = load_or_build(cache_dir, key, build)
+        load_time = time.perf_counter() - start
+
+        for name in ("train", "eval"):
+            assert cached[name]["input_ids"][:] == built[name]["input_ids"][:]
+            assert cached[name]["labels"][:] == built[name]["labels"][:]
+            tables = getattr(cached[name].data, "tables", [[cached[name].data]])
+            assert all(isinstance(t, MemoryMappedTable) for row in tables for t in row), type(cached[name].data)
+        print(f"Cache: built in {build_time:.2f}s, loaded in {load_time:.3f}s "
+              f"({build_time / load_time:.0f}x), {len(cached['train'])} packed rows, memory-mapped")
+        assert load_time < build_time / 5
+
+        assert key_for() == key, "key must be stable"
+        assert key_for(template=TEMPLATE_VERSION + 1) != key
+        assert key_for(max_length=256) != key
+        assert key_for(test_size=0.2) != key
+        assert key_for(min_words=10) != key
+        assert key_for(tok=tiny_tokenizer([s.upper() for s in scripts[:500]])) != key
+        write_json(data_path, scripts[:-1])
+        assert key_for() != key
+        print("Key: changes with data, tokenizer, template version and settings")
+        print("All dataset cache checks passed.")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import date
+
+from mock_research_api import QUERY_PATH, MockResearchAPI
+from tiktok_harvester import HarvestCheckpoint, TikTokHarvester, split_windows
+from http_session import PooledSession
+from politeness import HostScheduler, host_of
+from transcripts_generation import get_token_manager
+
+# ============================================================
+# Checks tiktok_harvester.py against the local mock Research API
+# ------------------------------------------------------------
+#   1. Throughput: one worker vs several, same rate budget
+#   2. Resume: an outage mid-harvest leaves windows pending;
+#      a second run finishes them with no duplicate videos
+#   3. Long windows that the API rejects are split until they work
+#
+# Usage:
+#   python check_harvester.py
+# ============================================================
+
+USERNAMES = ["storiesq2", "story_dive", "yankeereads", "redditnarrs"]
+START = date(2025, 10, 1)
+END = date(2025, 10, 30)
+RATE = 40.0   # API requests/second budget for every run
+
+
+def make_session(api):
+    scheduler = HostScheduler(host_rates={host_of(api.query_url): RATE}, base_backoff=0.05, max_backoff=0.2)
+    return PooledSession(scheduler=scheduler)
+
+
+def harvest(api, workdir, workers, window_days=3, name="run"):
+    session = make_session(api)
+    checkpoint = HarvestCheckpoint(os.path.join(workdir, f"{name}.sqlite3"))
+    checkpoint.plan(USERNAMES, split_windows(START, END, window_days))
+    tokens = get_token_manager(session=session, token_url=api.token_url, cache_file=None)
+    harvester = TikTokHarvester(checkpoint, tokens, output=os.path.join(workdir, f"{name}.csv"),
+                                workers=workers, query_url=api.query_url, max_count=20, session=session,
+                                min_window_days=min(window_days, 5))
+    started = time.perf_counter()
+    complete = harvester.run()
+    return harvester, checkpoint, complete, time.perf_counter() - started
+
+
+def csv_ids(path):
+    with open(path, encoding="utf-8") as f:
+        next(f)
+        return [line.split(",", 1)[0] for line in f]
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="harvest-check-")
+    out = io.StringIO()
+
+    with MockResearchAPI(videos_per_day=12, latency=0.05) as api, contextlib.redirect_stdout(out):
+        expected = api.expected_ids(USERNAMES, START, END)
+
+        # 1. Throughput
+        timings = {}
+        for workers in (1, 8):
+            _, checkpoint, complete, elapsed = harvest(api, workdir, workers, name=f"workers{workers}")
+            assert complete
+            ids = csv_ids(os.path.join(workdir, f"workers{workers}.csv"))
+            assert set(ids) == expected and len(ids) == len(expected)
+            timings[workers] = (elapsed, checkpoint.summary())
+
+        # 2. Resume after an outage that starts partway through pagination
+        original_query = api._query
+        remaining = {"queries": 40}
+
+        def outage_after_some_queries(handler):
+            remaining["queries"] -= 1
+            api.failing = remaining["queries"] < 0
+            return original_query(handler)
+
+        api.server.routes[QUERY_PATH] = outage_after_some_queries
+        _, checkpoint, complete, _ = harvest(api, workdir, workers=4, window_days=5, name="resume")
+        interrupted = checkpoint.summary()
+        checkpoint.close()
+        assert not complete and interrupted["windows_pending"] > 0 and interrupted["videos"] > 0
+
+        api.failing = False
+        api.server.routes[QUERY_PATH] = original_query
+        _, checkpoint, complete, _ = harvest(api, workdir, workers=4, window_days=5, name="resume")
+        resumed = checkpoint.summary()
+        ids = csv_ids(os.path.join(workdir, "resume.csv"))
+        assert complete, resumed
+        assert len(ids) == len(set(ids)), "resume wrote duplicate videos"
+        assert set(ids) == expected
+
+        # 3. Windows longer than the API accepts are split until they succeed
+        _, checkpoint, complete, _ = harvest(api, workdir, workers=4, window_days=30, name="split")
+        split = checkpoint.summary()
+        split_ids = csv_ids(os.path.join(workdir, "split.csv"))
+        assert complete and set(split_ids) == expected and len(split_ids) == len(expected)
+
+    print(f"{'workers':<10}{'seconds':>9}{'pages':>7}{'videos/s':>10}")
+    for workers, (elapsed, summary) in timings.items():
+        print(f"{workers:<10}{elapsed:>9.2f}{summary['pages']:>7}{summary['videos'] / elapsed:>10.0f}")
+    print(f"Outage: {interrupted['videos']} videos saved, {interrupted['windows_pending']} windows pending; "
+          f"resume finished {resumed['windows_done']} windows, {len(ids)} unique videos, no duplicates")
+    print(f"30-day windows: split into {split['windows_done']} windows the API accepts, "
+          f"{len(split_ids)} videos")
+    print("All harvester checks passed.")
+
+
+if __name__ == "__main__":
+    main()
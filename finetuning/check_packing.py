@@ -0,0 +1,205 @@
+import os
+import random
+import tempfile
+
+import torch
+from datasets import Dataset
+from tokenizers import Tokenizer, models, pre_tokenizers, trainers, decoders
+from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast, TrainingArguments
+from trl import SFTTrainer
+
+from bench_transcript_store import synthetic_videos
+from dataset_cache import prepare_splits
+from packing import (
+    IGNORE_INDEX, LengthBucketMixin, LengthBucketSampler, PackedCollator, PaddedCollator, pack_dataset,
+    pack_examples, tokenize_with_labels,
+)
+
+# ============================================================
+# Correctness checks for packing.py on a tiny CPU model
+# ------------------------------------------------------------
+#   1. Labels cover exactly the assistant turn (script + <|eot_id|>)
+#   2. Packing places every example once, within max_length
+#   3. No attention across packed examples: the logits of a packed
+#      row match the logits of each example run on its own
+#   4. LengthBucketSampler batches examples of similar length
+#   5. Each BATCHING mode trains through SFTTrainer the way
+#      train.py sets it up: the trainer's dataloader feeds the
+#      collator what it needs (packed rows keep position_ids)
+#      and a training step runs. trl's SFTTrainer computes the
+#      loss with a Triton kernel, so without a GPU the step is
+#      the same forward/backward/optimizer step run by hand on
+#      the trainer's batch and optimizer
+#
+# The tokenizer is a small BPE trained on synthetic transcripts,
+# with the Llama 3 chat special tokens; the model is a randomly
+# initialized 2-layer Llama. Nothing is downloaded.
+#
+# Usage:
+#   python check_packing.py
+# ============================================================
+
+SPECIAL_TOKENS = [
+    "<|begin_of_text|>", "<|start_header_id|>", "<|end_header_id|>", "<|eot_id|>", "<|pad|>",
+]
+INSTRUCTION = "Generate a viral short-form video script in the Gen Z voice for a TikTok video."
+
+
+def format_script(script):
+    # Same template as train.py's formatting_function
+    return (
+        f"<|begin_of_text|><|start_header_id|>user<|end_header_id|>\n"
+        f"{INSTRUCTION}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n"
+        f"{script}<|eot_id|>"
+    )
+
+
+def synthetic_scripts(count, seed=0):
+    videos = synthetic_videos(1, count, seed=seed)
+    rng = random.Random(seed)
+    # Real scripts vary a lot in length: cut each to a random number of words
+    return [" ".join(v["voice_to_text"].split()[:rng.randint(15, 250)]) for v in videos]
+
+
+def tiny_tokenizer(texts, vocab_size=500):
+    tok = Tokenizer(models.BPE())
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    tok.train_from_iterator(texts, trainers.BpeTrainer(vocab_size=vocab_size, special_tokens=SPECIAL_TOKENS))
+    return PreTrainedTokenizerFast(tokenizer_object=tok, pad_token="<|pad|>", eos_token="<|eot_id|>")
+
+
+def tiny_model(tokenizer, attn_implementation="sdpa", seed=0):
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=1024,
+        pad_token_id=tokenizer.pad_token_id, use_cache=False,   # as in train.py
+    )
+    config._attn_implementation = attn_implementation
+    return LlamaForCausalLM(config).eval()
+
+
+def check_labels(tokenizer, scripts):
+    texts = [format_script(s) for s in scripts]
+    ids, labels = tokenize_with_labels(texts, tokenizer)
+    for script, row_ids, row_labels in zip(scripts, ids, labels):
+        trained = [t for t in row_labels if t != IGNORE_INDEX]
+        assert tokenizer.decode(trained) == f"{script}<|eot_id|>", tokenizer.decode(trained)
+        assert row_labels[:len(row_ids) - len(trained)] == [IGNORE_INDEX] * (len(row_ids) - len(trained))
+    print(f"Labels: {len(scripts)} examples, loss only on the assistant turn")
+
+
+def check_bin_packing():
+    rng = random.Random(1)
+    lengths = [rng.randint(20, 512) for _ in range(2000)]
+    rows = pack_examples(lengths, 512)
+    placed = sorted(i for row in rows for i in row)
+    assert placed == list(range(len(lengths)))
+    assert all(sum(lengths[i] for i in row) <= 512 for row in rows)
+    fill = sum(lengths) / (len(rows) * 512)
+    print(f"Bin packing: {len(lengths)} examples -> {len(rows)} rows of 512, {fill:.1%} full")
+
+
+def check_no_leakage(tokenizer, scripts):
+    dataset = Dataset.from_dict({"text": [format_script(s) for s in scripts]})
+    packed = pack_dataset(dataset, tokenizer, 512)
+    row = max(packed, key=lambda r: r["position_ids"].count(0))
+    batch = PackedCollator(tokenizer.pad_token_id)([row])
+    starts = [i for i, p in enumerate(row["position_ids"]) if p == 0] + [len(row["input_ids"])]
+    assert len(starts) > 2, "expected a row holding several examples"
+
+    for attn in ("eager", "sdpa"):
+        model = tiny_model(tokenizer, attn)
+        with torch.no_grad():
+            packed_logits = model(**{k: v for k, v in batch.items() if k != "labels"}).logits[0]
+            for start, end in zip(starts, starts[1:]):
+                alone = model(input_ids=batch["input_ids"][:, start:end]).logits[0]
+                diff = (packed_logits[start:end] - alone).abs().max().item()
+                assert diff < 1e-4, f"{attn}: example at {start} sees other examples (max diff {diff})"
+            loss = model(**batch).loss
+        assert torch.isfinite(loss)
+    print(f"No leakage: {len(starts) - 1} examples packed in one row match their unpacked logits (eager, sdpa)")
+
+
+def check_bucketing():
+    rng = random.Random(2)
+    lengths = [rng.randint(20, 512) for _ in range(4000)]
+    sampler = LengthBucketSampler(lengths, batch_size=8)
+    order = list(sampler)
+    assert sorted(order) == list(range(len(lengths)))
+    assert list(sampler) != order, "a new epoch should reshuffle"
+
+    def padding(indices):
+        batches = [indices[i:i + 8] for i in range(0, len(indices), 8)]
+        return sum(max(lengths[i] for i in b) * len(b) - sum(lengths[i] for i in b) for b in batches)
+
+    shuffled = list(range(len(lengths)))
+    rng.shuffle(shuffled)
+    print(f"Bucketing: padding tokens per epoch {padding(shuffled)} (random batches) -> {padding(order)}")
+    assert padding(order) < padding(shuffled) / 5
+
+
+TRAIN_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "train.py")
+
+
+def check_sft_trainer(tokenizer, scripts):
+    # train.py needs remove_unused_columns=False for these collators
+    with open(TRAIN_PY, encoding="utf-8") as f:
+        assert "remove_unused_columns=False" in f.read(), "train.py no longer keeps position_ids for PackedCollator"
+
+    def formatting_function(examples):
+        return {"text": [format_script(s) for s in examples["tiktok_script"]]}
+
+    raw = Dataset.from_dict({"tiktok_script": scripts})
+    for batching in ("packed", "bucketed", "padded"):
+        splits = prepare_splits(raw, formatting_function, tokenizer, 256, batching=batching, seed=0)
+        collator = (PackedCollator if batching == "packed" else PaddedCollator)(tokenizer.pad_token_id)
+        trainer_class = SFTTrainer
+        if batching == "bucketed":
+            class BucketedSFTTrainer(LengthBucketMixin, SFTTrainer):
+                pass
+
+            trainer_class = BucketedSFTTrainer
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            args = TrainingArguments(
+                output_dir=output_dir, max_steps=1, per_device_train_batch_size=2, learning_rate=1e-3,
+                save_strategy="no", report_to="none", use_cpu=not torch.cuda.is_available(),
+                remove_unused_columns=False,
+            )
+            model = tiny_model(tokenizer).train()
+            trainer = trainer_class(model=model, train_dataset=splits["train"], eval_dataset=splits["eval"],
+                                    args=args, processing_class=tokenizer, data_collator=collator)
+            batch = next(iter(trainer.get_train_dataloader()))
+            next(iter(trainer.get_eval_dataloader()))
+            expected = {"input_ids", "labels", "position_ids" if batching == "packed" else "attention_mask"}
+            assert set(batch) == expected, (batching, sorted(batch))
+
+            before = model.model.embed_tokens.weight.detach().clone()
+            if torch.cuda.is_available():
+                trainer.train()
+                loss = trainer.state.log_history[-1]["train_loss"]
+            else:
+                optimizer = trainer.create_optimizer()
+                loss = model(**{k: v.to(model.device) for k, v in batch.items()}).loss
+                loss.backward()
+                optimizer.step()
+                loss = loss.item()
+            assert loss == loss and (model.model.embed_tokens.weight.detach() != before).any(), batching
+        print(f"SFTTrainer {batching}: batch {sorted(batch)}, one step, loss {loss:.3f}")
+
+
+def main():
+    scripts = synthetic_scripts(300)
+    tokenizer = tiny_tokenizer([format_script(s) for s in scripts])
+    check_labels(tokenizer, scripts[:50])
+    check_bin_packing()
+    check_no_leakage(tokenizer, scripts[:40])
+    check_bucketing()
+    check_sft_trainer(tokenizer, scripts[:64])
+    print("All packing checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+import requests
+
+from check_packing import synthetic_scripts, tiny_model, tiny_tokenizer
+from generate import generate_script, generate_scripts, load_model
+from script_server import ScriptServer, run_jsonl, summary_of
+
+# ============================================================
+# Checks for script_server.py with a tiny CPU model for Llama
+# ------------------------------------------------------------
+#   1. The model is loaded once, through generate.load_model
+#   2. POST /generate answers summaries, scraper records and
+#      lists of them, concurrently, with the same scripts as a
+#      direct generate_script call
+#   3. GET /stats reports load time, counts, queue depth, latency
+#      and batching (concurrent requests share a generation batch)
+#      with the system prompt's KV cache reused across batches
+#      and GET /metrics exports tokenize/prefill/decode timers
+#   4. POST /stream sends token and sentence events as the script
+#      decodes; the sentences make up the same script
+#   5. A full queue answers 503
+#   6. The --stdin JSONL worker keeps input order
+#   7. A max_new_tokens that isn't an int from 1 to the server's
+#      limit answers 400 instead of joining a batch
+#
+# Usage:
+#   python check_script_server.py
+# ============================================================
+
+# Llama 3 chat template (what apply_chat_template produces for the real model)
+LLAMA3_CHAT_TEMPLATE = (
+    "{{ '<|begin_of_text|>' }}{% for message in messages %}"
+    "{{ '<|start_header_id|>' + message['role'] + '<|end_header_id|>\n\n' + message['content'] + '<|eot_id|>' }}"
+    "{% endfor %}{% if add_generation_prompt %}{{ '<|start_header_id|>assistant<|end_header_id|>\n\n' }}{% endif %}"
+)
+MAX_NEW_TOKENS = 24
+
+
+def save_tiny_model(path):
+    # Tiny random Llama + local tokenizer saved like a Hub checkpoint
+    tokenizer = tiny_tokenizer(synthetic_scripts(300))
+    tokenizer.chat_template = LLAMA3_CHAT_TEMPLATE
+    model = tiny_model(tokenizer)
+    model.generation_config.eos_token_id = tokenizer.eos_token_id
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+
+def load_tiny_model(path):
+    start = time.perf_counter()
+    model, tokenizer = load_model(path, adapter_path=None, quantization_config=None)
+    return model.float(), tokenizer, time.perf_counter() - start
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="check_server_")
+    try:
+        save_tiny_model(workdir)
+        model, tokenizer, load_seconds = load_tiny_model(workdir)
+        summaries = [f"City council story number {i}: the new transit line opens early." for i in range(8)]
+        expected = {s: generate_script(model, tokenizer, s, max_new_tokens=MAX_NEW_TOKENS) for s in summaries}
+
+        with ScriptServer(model, tokenizer, load_seconds=load_seconds, max_new_tokens=MAX_NEW_TOKENS,
+                          port=0) as server:
+            results = {}
+
+            def post(summary):
+                results[summary] = requests.post(server.url("/generate"), json={"summary": summary}).json()
+
+            threads = [threading.Thread(target=post, args=(s,)) for s in summaries]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert all(results[s]["script"] == expected[s] for s in summaries)
+
+            record = {"url": "https://news.example.com/a", "title": "Transit line", "article_text": summaries[0]}
+            single = requests.post(server.url("/generate"), json=record).json()
+            assert single["script"] == generate_script(model, tokenizer, summary_of(record), MAX_NEW_TOKENS)
+            batch = requests.post(server.url("/generate"), json=[{"summary": s} for s in summaries[:3]]).json()
+            assert [r["script"] for r in batch] == [expected[s] for s in summaries[:3]]
+            assert requests.post(server.url("/generate"), json={"nothing": 1}).status_code == 400
+
+            # A bad max_new_tokens is refused up front, so it can't fail or stretch the batch it would join
+            for bad in ("8", 0, -1, 1.5, True, MAX_NEW_TOKENS + 1, 10 ** 9):
+                for path in ("/generate", "/stream"):
+                    response = requests.post(server.url(path), json={"summary": summaries[0], "max_new_tokens": bad})
+                    assert response.status_code == 400, (path, bad, response.status_code)
+            short = requests.post(server.url("/generate"), json={"summary": summaries[2], "max_new_tokens": 4})
+            assert short.status_code == 200
+            assert short.json()["script"] == generate_script(model, tokenizer, summaries[2], max_new_tokens=4)
+
+            with requests.post(server.url("/stream"), json={"summary": summaries[1]}, stream=True) as response:
+                assert response.headers["Content-Type"] == "application/x-ndjson"
+                events = [json.loads(line) for line in response.iter_lines() if line]
+            kinds = [e["event"] for e in events]
+            sentences = [e["text"] for e in events if e["event"] == "sentence"]
+            done = events[-1]
+            assert kinds[0] == "token" and kinds[-1] == "done" and "sentence" in kinds, kinds
+            assert done["script"] == expected[summaries[1]] == "".join(e["text"] for e in events[:-1]
+                                                                       if e["event"] == "token").strip()
+            assert " ".join(sentences).split() == done["script"].split()
+            assert done["time_to_first_token"] <= done["time_to_first_sentence"] <= done["seconds"]
+            print(f"Stream: {len(kinds) - len(sentences) - 1} token events, {len(sentences)} sentences, first "
+                  f"sentence after {done['time_to_first_sentence'] * 1000:.0f} ms of {done['seconds'] * 1000:.0f} ms")
+
+            stats = requests.get(server.url("/stats")).json()
+            assert stats["requests"] == stats["completed"] == len(summaries) + 1 + 3 + 1 + 1, stats
+            assert stats["streamed"] == 1 and stats["first_sentence_p50"] > 0
+            assert stats["queue_depth"] == 0 and stats["errors"] == 0
+            assert stats["latency_p50"] > 0 and stats["load_seconds"] == round(load_seconds, 3)
+            assert stats["batches"] < stats["completed"], "concurrent requests should share batches"
+            assert stats["prefix_tokens"] > 0
+            metrics = requests.get(server.url("/metrics")).text
+            for stage in ("tokenize", "prefill", "decode"):
+                assert f'tiktok_pipeline_stage_seconds_count{{stage="{stage}"}}' in metrics, stage
+            assert "tiktok_pipeline_generated_tokens_total" in metrics
+            print(f"HTTP: {stats['completed']} scripts in {stats['batches']} batches, model loaded once in "
+                  f"{load_seconds:.2f}s, latency p50 {stats['latency_p50'] * 1000:.0f} ms / "
+                  f"p95 {stats['latency_p95'] * 1000:.0f} ms")
+
+        def slow_generate(*args, **kwargs):
+            time.sleep(0.3)
+            return generate_scripts(*args, **kwargs)
+
+        with ScriptServer(model, tokenizer, max_new_tokens=MAX_NEW_TOKENS, port=0, max_queue=1,
+                          generate=slow_generate) as server:
+            statuses = []
+            threads = [
+                threading.Thread(target=lambda: statuses.append(
+                    requests.post(server.url("/generate"), json={"summary": summaries[0]}).status_code))
+                for _ in range(4)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert 503 in statuses and 200 in statuses, statuses
+            assert server.stats()["rejected"] == statuses.count(503)
+            print(f"Backpressure: queue of 1 answered {sorted(statuses)}")
+
+        with ScriptServer(model, tokenizer, max_new_tokens=MAX_NEW_TOKENS).start(http=False) as server:
+            lines = [json.dumps({"summary": s, "n": i}) for i, s in enumerate(summaries)]
+            out = io.StringIO()
+            run_jsonl(server, lines, out)
+            rows = [json.loads(line) for line in out.getvalue().splitlines()]
+            assert [r["n"] for r in rows] == list(range(len(summaries)))
+            assert all(r["script"] == expected[r["summary"]] for r in rows)
+            print(f"JSONL worker: {len(rows)} records in order")
+        print("All script server checks passed.")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
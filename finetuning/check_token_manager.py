@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+
+from mock_research_api import TOKEN_PATH, MockResearchAPI
+from http_session import PooledSession
+from transcripts_generation import build_video_query, get_token_manager, query_video_page
+
+# ============================================================
+# Checks token_manager.py against the mock token endpoint
+# ------------------------------------------------------------
+#   1. A second run reuses the persisted token (no round trip)
+#   2. 32 workers asking at once with no token: one request
+#   3. 16 workers reporting the same rejected token: one refresh
+#   4. Short-lived tokens are refreshed before they expire, so a
+#      steady stream of queries never sees a 401
+#
+# Usage:
+#   python check_token_manager.py
+# ============================================================
+
+TOKEN_LATENCY = 0.3   # seconds the stand-in token endpoint takes
+
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        target()
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="token-check-")
+    cache_file = os.path.join(workdir, "token.json")
+    latency = lambda path: TOKEN_LATENCY if path == TOKEN_PATH else 0.01
+
+    with MockResearchAPI(latency=latency) as api, contextlib.redirect_stdout(io.StringIO()):
+        session = PooledSession()
+
+        def manager(**kwargs):
+            return get_token_manager(session=session, token_url=api.token_url, **kwargs)
+
+        # 1. Persistence between runs
+        started = time.perf_counter()
+        manager(cache_file=cache_file).get()
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        manager(cache_file=cache_file).get()
+        warm = time.perf_counter() - started
+        assert api.token_count == 1, api.token_count
+        assert oct(os.stat(cache_file).st_mode & 0o777) == "0o600"
+
+        # 2. Concurrent first use
+        before = api.token_count
+        shared = manager(cache_file=None)
+        run_threads(32, shared.get)
+        herd_requests = api.token_count - before
+        assert herd_requests == 1, herd_requests
+
+        # 3. Concurrent invalidation of the same token
+        before = api.token_count
+        rejected = shared.get()
+        run_threads(16, lambda: shared.invalidate(rejected))
+        invalidate_requests = api.token_count - before
+        assert invalidate_requests == 1, invalidate_requests
+
+        # 4. Proactive refresh of short-lived tokens
+        api.token_lifetime = 2
+        short = manager(cache_file=None).start()
+        payload = build_video_query("storiesq2", date(2025, 11, 1), date(2025, 11, 3), 20)
+        before_401 = api.unauthorized
+        queries = 0
+        deadline = time.monotonic() + 6
+        while time.monotonic() < deadline:
+            resp = query_video_page(short.get(), payload, session=session, query_url=api.query_url)
+            assert resp.status_code == 200, resp.status_code
+            queries += 1
+        short.stop()
+        assert api.unauthorized == before_401
+        assert short.refreshes >= 3, short.refreshes
+
+    print(f"First run token fetch: {cold * 1000:.0f} ms; next run from cache: {warm * 1000:.1f} ms")
+    print(f"32 concurrent first requests -> {herd_requests} token request")
+    print(f"16 concurrent invalidations -> {invalidate_requests} refresh")
+    print(f"2s tokens: {queries} queries over 6s, {short.refreshes} background refreshes, 0 rejected")
+    print("All token manager checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+from bench_transcript_store import synthetic_videos
+from transcript_store import TranscriptStore, load_table, parquet_files
+
+# ============================================================
+# Upsert checks for transcript_store.py
+# ------------------------------------------------------------
+#   1. Writing the same videos twice leaves one row per id
+#   2. A row stored without create_time ("undated", e.g. from the
+#      old CSV) is replaced, not duplicated, when the same id comes
+#      back with a create_time; the emptied partition is removed
+#   3. A video whose create_time moves to another month moves
+#      partition, also from a fresh TranscriptStore (the id index
+#      is rebuilt from the files)
+#
+# Usage:
+#   python check_transcript_store.py
+# ============================================================
+
+MARCH = int(datetime(2025, 3, 10, tzinfo=timezone.utc).timestamp())
+APRIL = int(datetime(2025, 4, 10, tzinfo=timezone.utc).timestamp())
+
+
+def ids_in(root):
+    return load_table(root, columns=["id"])["id"].to_pylist()
+
+
+def partitions(root):
+    return sorted(os.path.relpath(path, root) for path in parquet_files(root))
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="check_store_")
+    try:
+        videos = synthetic_videos(3, 200)
+        for _ in range(2):
+            with TranscriptStore(root) as store:
+                for i in range(0, len(videos), 50):
+                    store.upsert(videos[i:i + 50])
+        ids = ids_in(root)
+        assert sorted(ids) == sorted(v["id"] for v in videos), "re-run duplicated or lost videos"
+        print(f"Re-run: {len(ids)} rows for {len(videos)} videos")
+
+        legacy = {"id": "1", "username": "storyteller", "transcript": "first take", "like_count": "5"}
+        with TranscriptStore(root) as store:
+            store.upsert([legacy])
+        assert partitions(root)[-1] == os.path.join("storyteller", "undated.parquet")
+
+        with TranscriptStore(root) as store:
+            store.upsert([{**legacy, "transcript": "dated", "create_time": MARCH}])
+        rows = [r for r in load_table(root).to_pylist() if r["username"] == "storyteller"]
+        assert [(r["id"], r["transcript"]) for r in rows] == [("1", "dated")], rows
+        assert [p for p in partitions(root) if p.startswith("storyteller")] == [
+            os.path.join("storyteller", "2025-03.parquet")]
+        print("Undated row replaced by its dated upsert")
+
+        with TranscriptStore(root) as store:
+            store.upsert([{**legacy, "transcript": "moved", "create_time": APRIL},
+                          {"id": "2", "username": "storyteller", "create_time": MARCH}])
+        rows = {r["id"]: r for r in load_table(root).to_pylist() if r["username"] == "storyteller"}
+        assert sorted(rows) == ["1", "2"] and rows["1"]["transcript"] == "moved", rows
+        assert rows["1"]["create_time"].month == 4
+        assert len(ids_in(root)) == len(videos) + 2
+        print("Row moved to its new month, from a fresh store")
+    finally:
+        shutil.rmtree(root)
+    print("All transcript store checks passed.")
+
+
+if __name__ == "__main__":
+    main()
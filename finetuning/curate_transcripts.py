@@ -0,0 +1,211 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraping"))
+from dedup import Deduplicator
+from transcript_store import STORE_DIR, load_table
+
+# ============================================================
+# Transcript cleaning + training-set curation
+# ------------------------------------------------------------
+# Raw voice_to_text transcripts are noisy: empty, repeated across
+# reposts, a few words long, or not English. Each of these costs
+# training steps for nothing. curate() runs a fixed sequence of
+# steps over an Arrow table (the transcript store, or a datasets
+# Dataset's underlying table), mostly as vectorized pyarrow
+# compute kernels:
+#   1. normalize   collapse whitespace, trim
+#   2. empty       no transcript
+#   3. too_short   fewer than min_words words
+#   4. not_english too few ASCII letters / English stopwords
+#   5. duplicate   identical transcript (case-insensitive)
+#   6. near_dup    MinHash-LSH near-duplicates (scraping/dedup.py)
+#   7. too_long    more tokens than fit in MAX_LENGTH
+#   8. top_k       optionally keep only the most viewed/liked rows
+#
+# When view_count is present, rows are ranked by it first, so the
+# copy kept of a duplicate is the most viewed one.
+#
+# Each step is timed and the report lists the rows it removed:
+#   table, report = curate(load_table("transcripts"))
+#   print(format_report(report))
+#
+# Usage:
+#   python curate_transcripts.py --root transcripts -o curated.parquet --top-k 5000
+# ============================================================
+
+MIN_WORDS = 20
+MIN_ASCII_RATIO = 0.7         # ASCII letters / non-space characters
+MIN_STOPWORD_RATIO = 0.15     # common English words / words
+NEAR_DUP_THRESHOLD = 0.7
+CHARS_PER_TOKEN = 4           # token estimate when no tokenizer is given
+TOKENIZE_BATCH = 1000
+
+STOPWORDS_RE = r"(?i)\b(the|and|to|a|i|you|my|me|was|that|it|of|is|in|he|she|so|this|but|for|with)\b"
+
+
+def normalize_whitespace(column):
+    return pc.utf8_trim_whitespace(pc.replace_substring_regex(column, r"\s+", " "))
+
+
+def word_counts(column):
+    return pc.fill_null(pc.count_substring_regex(column, r"\S+"), 0)
+
+
+def token_lengths(texts, tokenizer=None):
+    # ------------------------------------------------------------
+    # Tokens per text: batched through a Hugging Face tokenizer if
+    # given, otherwise estimated from the character count.
+    # ------------------------------------------------------------
+    if tokenizer is None:
+        return pc.ceil(pc.divide(pc.cast(pc.utf8_length(texts), pa.float64()), CHARS_PER_TOKEN))
+    texts = texts.to_pylist()
+    lengths = []
+    for i in range(0, len(texts), TOKENIZE_BATCH):
+        ids = tokenizer(texts[i:i + TOKENIZE_BATCH], add_special_tokens=False)["input_ids"]
+        lengths.extend(len(x) for x in ids)
+    return pa.array(lengths, pa.int64())
+
+
+def english_mask(column):
+    # ------------------------------------------------------------
+    # Cheap language check without a language model: English
+    # transcripts are mostly ASCII letters, and a good share of their
+    # words are common stopwords. Catches other scripts as well as
+    # Spanish/French/etc. transcripts in Latin script.
+    # ------------------------------------------------------------
+    letters = pc.cast(pc.count_substring_regex(column, r"[A-Za-z]"), pa.float64())
+    visible = pc.cast(pc.count_substring_regex(column, r"\S"), pa.float64())
+    stopwords = pc.cast(pc.count_substring_regex(column, STOPWORDS_RE), pa.float64())
+    words = pc.cast(pc.max_element_wise(word_counts(column), 1), pa.float64())
+    ascii_ok = pc.greater_equal(pc.divide(letters, pc.max_element_wise(visible, 1.0)), MIN_ASCII_RATIO)
+    stop_ok = pc.greater_equal(pc.divide(stopwords, words), MIN_STOPWORD_RATIO)
+    return pc.and_(ascii_ok, stop_ok)
+
+
+def first_occurrence_mask(values):
+    seen = set()
+    keep = []
+    for value in values.to_pylist():
+        keep.append(value not in seen)
+        seen.add(value)
+    return pa.array(keep, pa.bool_())
+
+
+def near_duplicate_mask(column, threshold=NEAR_DUP_THRESHOLD):
+    dedup = Deduplicator(threshold=threshold)
+    return pa.array(
+        [dedup.add(i, text) is None for i, text in enumerate(column.to_pylist())],
+        pa.bool_(),
+    )
+
+
+def curate(table, column="transcript", min_words=MIN_WORDS, max_tokens=None, tokenizer=None,
+           near_dup_threshold=NEAR_DUP_THRESHOLD, english_only=True, top_k=None,
+           top_by=("view_count", "like_count")):
+    # ------------------------------------------------------------
+    # Returns (curated table, report). The report is a list of
+    # {"step", "removed", "remaining", "seconds"} dicts, in order.
+    # max_tokens=None skips the length cap; top_k=None keeps every
+    # row that passes the filters.
+    # ------------------------------------------------------------
+    report = []
+    ranked_by = [name for name in top_by if name in table.column_names]
+
+    def step(name, fn):
+        nonlocal table
+        start = time.perf_counter()
+        before = table.num_rows
+        table = fn(table)
+        report.append({
+            "step": name,
+            "removed": before - table.num_rows,
+            "remaining": table.num_rows,
+            "seconds": time.perf_counter() - start,
+        })
+
+    def keep(mask_fn):
+        return lambda t: t.filter(pc.fill_null(mask_fn(t[column]), False))
+
+    def normalize(t):
+        t = t.set_column(t.column_names.index(column), column, normalize_whitespace(t[column]))
+        if ranked_by:
+            t = t.sort_by([(name, "descending") for name in ranked_by])
+        return t
+
+    step("normalize", normalize)
+    step("empty", keep(lambda c: pc.greater(pc.utf8_length(c), 0)))
+    step("too_short", keep(lambda c: pc.greater_equal(word_counts(c), min_words)))
+    if english_only:
+        step("not_english", keep(english_mask))
+    step("duplicate", keep(lambda c: first_occurrence_mask(pc.utf8_lower(c))))
+    if near_dup_threshold:
+        step("near_dup", keep(lambda c: near_duplicate_mask(c, near_dup_threshold)))
+    if max_tokens:
+        step("too_long", keep(lambda c: pc.less_equal(token_lengths(c, tokenizer), max_tokens)))
+    if top_k is not None and ranked_by:
+        # Already sorted by engagement
+        step("top_k", lambda t: t.slice(0, top_k))
+    return table, report
+
+
+def format_report(report):
+    total = sum(r["seconds"] for r in report)
+    start = report[0]["remaining"] + report[0]["removed"] if report else 0
+    lines = [f"{'step':12} {'removed':>8} {'remaining':>10} {'seconds':>8}"]
+    lines.append(f"{'input':12} {'':>8} {start:10} {'':>8}")
+    for r in report:
+        lines.append(f"{r['step']:12} {r['removed']:8} {r['remaining']:10} {r['seconds']:8.3f}")
+    kept = report[-1]["remaining"] if report else 0
+    lines.append(f"kept {kept} of {start} rows ({kept / max(start, 1):.0%}) in {total:.2f}s")
+    return "\n".join(lines)
+
+
+def load_csv(path):
+    # Old CSV output (save_to_csv), with the counts typed as in the store
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for name in ("like_count", "view_count"):
+            value = row.get(name)
+            row[name] = int(value) if value and value.isdigit() else None
+    return pa.Table.from_pylist(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean and curate harvested transcripts for training.")
+    parser.add_argument("--root", default=STORE_DIR, help="Parquet transcript store to read")
+    parser.add_argument("--csv", help="Read this CSV (save_to_csv output) instead of the store")
+    parser.add_argument("-o", "--output", help="Write the curated rows to this Parquet file")
+    parser.add_argument("--min-words", type=int, default=MIN_WORDS)
+    parser.add_argument("--max-tokens", type=int, help="Drop transcripts longer than this (estimated tokens)")
+    parser.add_argument("--near-dup-threshold", type=float, default=NEAR_DUP_THRESHOLD,
+                        help="MinHash Jaccard threshold (0 disables)")
+    parser.add_argument("--keep-non-english", action="store_true")
+    parser.add_argument("--top-k", type=int, help="Keep only the K most viewed transcripts")
+    args = parser.parse_args()
+
+    table = load_csv(args.csv) if args.csv else load_table(args.root)
+    table, report = curate(
+        table,
+        min_words=args.min_words,
+        max_tokens=args.max_tokens,
+        near_dup_threshold=args.near_dup_threshold,
+        english_only=not args.keep_non_english,
+        top_k=args.top_k,
+    )
+    print(format_report(report))
+    if args.output:
+        pq.write_table(table, args.output, compression="zstd")
+        print(f"Wrote {table.num_rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from datasets import DatasetDict, load_from_disk
+
+from packing import pack_dataset, tokenize_dataset
+
+# ============================================================
+# Pre-tokenized, memory-mapped dataset cache for train.py
+# ------------------------------------------------------------
+# Loading the raw data, curating, splitting, formatting with the
+# chat template and tokenizing is the same work on every run.
+# It is done once and the resulting train/eval splits (input_ids,
+# labels, and position_ids or length) are saved as Arrow files.
+# Later runs load them with load_from_disk, which memory-maps the
+# files: near-zero startup and no copy of the data in RAM.
+#
+# The cache key covers everything that changes the tokens:
+#   - the data files' contents
+#   - the tokenizer (its full serialized vocab/merges/config)
+#   - TEMPLATE_VERSION of the chat template in train.py
+#   - settings such as MAX_LENGTH, BATCHING and the split seed
+# so a stale cache is never used; old entries just sit unused.
+#
+# Usage:
+#   key = cache_key(data_files=data_files(DATA_PATH), tokenizer=tokenizer,
+#                   template_version=TEMPLATE_VERSION, max_length=MAX_LENGTH)
+#   splits = load_or_build(CACHE_DIR, key, build_splits)
+# ============================================================
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = "./data/token_cache"
+READ_CHUNK = 1 << 20
+
+
+def data_files(path):
+    # The file(s) behind DATA_PATH: a single file, or every Parquet file in a store directory
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(
+        os.path.join(directory, name)
+        for directory, _, names in os.walk(path)
+        for name in names
+        if name.endswith(".parquet")
+    )
+
+
+def data_fingerprint(paths):
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            while chunk := f.read(READ_CHUNK):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer):
+    # The serialized fast tokenizer covers vocab, merges, normalizers and special tokens.
+    # Truncation/padding are left out: they are runtime state set by the last call.
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        state = json.loads(backend.to_str())
+        state.pop("truncation", None)
+        state.pop("padding", None)
+    else:
+        state = tokenizer.get_vocab()
+    return hashlib.blake2b(json.dumps(state, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def cache_key(data_files, tokenizer, template_version, **settings):
+    parts = {
+        "data": data_fingerprint(data_files),
+        "tokenizer": tokenizer_fingerprint(tokenizer),
+        "template": template_version,
+        "settings": settings,
+    }
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=12).hexdigest()
+
+
+def load_or_build(cache_dir, key, build):
+    # ------------------------------------------------------------
+    # Returns the cached DatasetDict for `key` (memory-mapped), or
+    # calls build() -> DatasetDict, saves it and returns the saved
+    # (memory-mapped) copy.
+    # ------------------------------------------------------------
+    path = os.path.join(cache_dir, key)
+    start = time.perf_counter()
+    if os.path.isdir(path):
+        splits = load_from_disk(path)
+        log.info("Loaded tokenized dataset from cache %s in %.2fs", path, time.perf_counter() - start)
+        return splits
+
+    splits = build()
+    # Write-then-rename so an interrupted run never leaves a partial cache entry
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    splits.save_to_disk(tmp)
+    os.replace(tmp, path)
+    log.info("Built tokenized dataset cache %s in %.2fs", path, time.perf_counter() - start)
+    return load_from_disk(path)
+
+
+def prepare_splits(raw_dataset, formatting_function, tokenizer, max_length, batching="packed",
+                   test_size=0.1, seed=42):
+    # ------------------------------------------------------------
+    # Split, format with the chat template and tokenize: returns a
+    # DatasetDict with "train" and "eval" ready for the collators
+    # in packing.py (packed rows for "packed", one example per row
+    # otherwise).
+    # ------------------------------------------------------------
+    split = raw_dataset.train_test_split(test_size=test_size, seed=seed)
+    splits = {}
+    for name, part in (("train", split["train"]), ("eval", split["test"])):
+        formatted = part.map(formatting_function, batched=True, remove_columns=part.column_names)
+        if batching == "packed":
+            splits[name] = pack_dataset(formatted, tokenizer, max_length, seed=seed)
+        else:
+            splits[name] = tokenize_dataset(formatted, tokenizer, max_length)
+    return DatasetDict(splits)
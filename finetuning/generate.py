@@ -1,6 +1,18 @@
+import copy
+import logging
+import os
+import re
+import sys
+import time
+
 import torch
 from peft import PeftModel
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig, DynamicCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraping"))
+from telemetry import METRICS, configure_logging
+
+log = logging.getLogger(__name__)
 
 # --- CONFIG ---
 MODEL_PATH = "meta-llama/Meta-Llama-3-8B-Instruct" # or whatever model we use
@@ -13,76 +25,370 @@ SYSTEM_PROMPT = (
 )
 
 
-# NEWS_SUMMARY = ( wherever the news summary is coming from, change
-   
-# )
+# NEWS_SUMMARY comes from the command line or stdin:
+#   python generate.py "summary text"
+#   python generate.py < summary.txt
+# For many summaries, run script_server.py instead: it loads the model once.
 
 
 
 MAX_NEW_TOKENS = 385 # apprx length for around a 2min video
 
+# Batch generation (generate_scripts): batches are filled up to this many tokens,
+# counted as rows x (longest prompt + MAX_NEW_TOKENS), and at most MAX_BATCH rows
+TOKEN_BUDGET = 16384
+MAX_BATCH = 16
+
+# Streaming (stream_script): a sentence ends at . ! ? or … (plus closing quotes or
+# brackets) followed by whitespace, or at a line break
+SENTENCE_END = re.compile(r"[.!?\u2026]+[\"')\]]*\s+|\n+")
+
 # Configure 4-bit quantization (MUST MATCH TRAINING CONFIG)
 bnb_config = BitsAndBytesConfig(
     load_in_4bit=True,
-    bnb_4bit_quant_type="nf4", 
-    bnb_4bit_compute_dtype=torch.bfloat16, 
+    bnb_4bit_quant_type="nf4",
+    bnb_4bit_compute_dtype=torch.bfloat16,
     bnb_4bit_use_double_quant=False,
 )
 
-# 1. Load the Base Model and Tokenizer
-print("Loading base model...")
-base_model = AutoModelForCausalLM.from_pretrained(
-    MODEL_PATH,
-    quantization_config=bnb_config,
-    device_map="auto",
-    dtype=torch.bfloat16,
-)
-tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-if tokenizer.pad_token is None:
-    tokenizer.pad_token = tokenizer.eos_token
-
-# 2. Attach the Fine-Tuned Adapter Weights
-print(f"Loading LORA adapter from {ADAPTER_PATH}...")
-model = PeftModel.from_pretrained(base_model, ADAPTER_PATH)
-
-# Optional: Merge the adapter for cleaner generation
-# If you run out of VRAM, comment this line out, but it simplifies the model object.
-model = model.merge_and_unload()
-print("Model and adapter loaded successfully.")
-
-# 3. Format the Chat Prompt
-chat = [
-    {"role": "system", "content": SYSTEM_PROMPT},
-    {"role": "user", "content": f"News Summary:\n{NEWS_SUMMARY}"},
-]
-
-# Apply the chat template to get the exact format Llama 3 expects
-prompt = tokenizer.apply_chat_template(chat, tokenize=False, add_generation_prompt=True)
-print("\n--- Input Prompt ---")
-print(prompt.strip())
-
-# 4. Generate the Response
-inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
-
-# Use greedy decoding for this test
-output_tokens = model.generate(
-    **inputs,
-    max_new_tokens=MAX_NEW_TOKENS,
-    do_sample=False,
-)
 
-# 5. Decode and Print
-output_text = tokenizer.decode(output_tokens[0], skip_special_tokens=True)
-
-# Extract only the assistant's response part
-# We look for the last 'assistant' turn since the model generated it.
-try:
-    response = output_text.split("<|end_header_id|>assistant\n")[-1]
-    # Remove any trailing control tokens
-    response = response.replace("<|eot_id|>", "").strip()
-except IndexError:
-    response = "Error parsing response. Raw output:\n" + output_text
-
-print("\n--- TikTok Generation ---")
-print(response)
-print("-------------------------\n")
+def load_model(model_path=MODEL_PATH, adapter_path=ADAPTER_PATH, quantization_config=bnb_config):
+    # ------------------------------------------------------------
+    # Loads the base model + tokenizer and attaches the fine-tuned
+    # adapter. This is the slow part (tens of seconds); do it once.
+    # adapter_path=None loads the base model alone.
+    # ------------------------------------------------------------
+    # 1. Load the Base Model and Tokenizer
+    log.info("Loading base model %s", model_path)
+    base_model = AutoModelForCausalLM.from_pretrained(
+        model_path,
+        quantization_config=quantization_config,
+        device_map="auto",
+        dtype=torch.bfloat16,
+    )
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    if adapter_path is None:
+        return base_model, tokenizer
+
+    # 2. Attach the Fine-Tuned Adapter Weights
+    log.info("Loading LORA adapter from %s", adapter_path)
+    model = PeftModel.from_pretrained(base_model, adapter_path)
+
+    # Optional: Merge the adapter for cleaner generation
+    # If you run out of VRAM, comment this line out, but it simplifies the model object.
+    model = model.merge_and_unload()
+    log.info("Model and adapter loaded")
+    return model, tokenizer
+
+
+def build_prompt(tokenizer, news_summary, system_prompt=SYSTEM_PROMPT):
+    # 3. Format the Chat Prompt
+    chat = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"News Summary:\n{news_summary}"},
+    ]
+
+    # Apply the chat template to get the exact format Llama 3 expects
+    return tokenizer.apply_chat_template(chat, tokenize=False, add_generation_prompt=True)
+
+
+def generate_script(model, tokenizer, news_summary, max_new_tokens=MAX_NEW_TOKENS, prefix=None):
+    prompt = build_prompt(tokenizer, news_summary)
+
+    # 4. Generate the Response
+    # (the template already holds <|begin_of_text|>, so no extra special tokens)
+    inputs = tokenizer(prompt, return_tensors="pt", add_special_tokens=False).to(model.device)
+
+    # With a PromptPrefix, the system prompt's keys/values come from its cache
+    # and generate() only prefills the tokens after it
+    if prefix is not None and prefix.matches(inputs["input_ids"][0].tolist()):
+        inputs["past_key_values"] = prefix.expand(1)
+
+    # Use greedy decoding for this test
+    output_tokens = model.generate(
+        **inputs,
+        max_new_tokens=max_new_tokens,
+        do_sample=False,
+        pad_token_id=tokenizer.pad_token_id,
+    )
+
+    # 5. Decode only the assistant's response: the tokens after the prompt
+    new_tokens = output_tokens[0][inputs["input_ids"].shape[1]:]
+    return tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+
+
+class PromptPrefix:
+    # ------------------------------------------------------------
+    # Every prompt starts with the same tokens: the chat template
+    # and SYSTEM_PROMPT, up to "News Summary:". Their keys/values
+    # are computed once here; generation copies them into its
+    # cache and only prefills the per-article suffix. Build one
+    # per loaded model (and system prompt), e.g. at server start.
+    # ------------------------------------------------------------
+    def __init__(self, model, tokenizer, system_prompt=SYSTEM_PROMPT):
+        marker = "\x00"
+        prompt = build_prompt(tokenizer, marker, system_prompt)
+        # Keep the prefix on a token boundary shared by real prompts
+        # (BPE may merge the last prefix token with the summary)
+        ids = tokenizer(prompt[:prompt.index(marker)], add_special_tokens=False)["input_ids"]
+        probe = tokenizer(build_prompt(tokenizer, "News", system_prompt), add_special_tokens=False)["input_ids"]
+        while ids and probe[:len(ids)] != ids:
+            ids = ids[:-1]
+        self.ids = ids
+        self.cache = DynamicCache()
+        with torch.no_grad():
+            model(input_ids=torch.tensor([ids], device=model.device), past_key_values=self.cache, use_cache=True)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matches(self, ids):
+        return ids[:len(self.ids)] == self.ids
+
+    def expand(self, batch_size):
+        # A fresh cache holding the prefix once per batch row (generation appends to it)
+        cache = copy.deepcopy(self.cache)
+        if batch_size > 1:
+            cache.batch_repeat_interleave(batch_size)
+        return cache
+
+
+def stop_token_ids(tokenizer):
+    # Llama 3 ends an assistant turn with <|eot_id|>, not the tokenizer's eos
+    ids = {tokenizer.eos_token_id, tokenizer.convert_tokens_to_ids("<|eot_id|>")}
+    return {i for i in ids if i is not None and i != tokenizer.unk_token_id}
+
+
+def plan_batches(prompt_lengths, max_new_tokens=MAX_NEW_TOKENS, token_budget=TOKEN_BUDGET, max_batch=MAX_BATCH):
+    # ------------------------------------------------------------
+    # Groups prompts into batches: sorted by length (longest first)
+    # so each batch needs little padding, and filled while
+    # rows x (longest prompt + max_new_tokens) fits the token
+    # budget. Returns lists of indices into prompt_lengths.
+    # ------------------------------------------------------------
+    order = sorted(range(len(prompt_lengths)), key=lambda i: -prompt_lengths[i])
+    batches = []
+    for i in order:
+        if batches:
+            batch = batches[-1]
+            width = prompt_lengths[batch[0]] + max_new_tokens   # batch[0] is its longest prompt
+            if len(batch) < max_batch and (len(batch) + 1) * width <= token_budget:
+                batch.append(i)
+                continue
+        batches.append([i])
+    return batches
+
+
+@torch.no_grad()
+def prefill(model, tokenizer, prompts, prefix=None):
+    # ------------------------------------------------------------
+    # Runs the prompts through the model in one left-padded batch.
+    # With a PromptPrefix that every prompt starts with, the cache
+    # starts from its keys/values and only the suffixes are fed:
+    # [prefix | padding | suffix], the padding masked out.
+    # Returns (last logits, cache, attention mask, next positions).
+    # Timed as the 'tokenize' and 'prefill' stages (see telemetry.py).
+    # ------------------------------------------------------------
+    with METRICS.timer("tokenize"):
+        ids = tokenizer(prompts, add_special_tokens=False)["input_ids"]
+    if prefix is not None and all(prefix.matches(row) for row in ids):
+        cache, past = prefix.expand(len(ids)), len(prefix)
+        ids = [row[past:] for row in ids]
+    else:
+        cache, past = DynamicCache(), 0
+    width = max(len(row) for row in ids)
+    input_ids = torch.tensor([[tokenizer.pad_token_id] * (width - len(row)) + row for row in ids], device=model.device)
+    attention_mask = torch.tensor([[1] * past + [0] * (width - len(row)) + [1] * len(row) for row in ids],
+                                  device=model.device)
+    position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, past:]
+    with METRICS.timer("prefill"):
+        logits = model(input_ids=input_ids, attention_mask=attention_mask, position_ids=position_ids,
+                       past_key_values=cache, use_cache=True).logits[:, -1]
+    METRICS.inc("prompt_tokens", sum(len(row) for row in ids) + past * len(ids))
+    METRICS.inc("prefix_cached_tokens", past * len(ids))
+    return logits, cache, attention_mask, position_ids[:, -1:] + 1
+
+
+@torch.no_grad()
+def generate_batch(model, tokenizer, prompts, max_new_tokens=MAX_NEW_TOKENS, stop_ids=None, prefix=None):
+    # ------------------------------------------------------------
+    # Greedy decoding of several prompts at once. Prompts are
+    # left-padded so they all end at the last column (see prefill).
+    # A row leaves the batch as soon as it produces a stop token
+    # (or reaches its own max_new_tokens): its KV cache rows are
+    # dropped, so short scripts stop costing compute instead of
+    # padding along until the longest one finishes, as
+    # model.generate does.
+    # max_new_tokens may be one int or one per prompt.
+    # Returns the new token ids of each prompt, stop token excluded.
+    # ------------------------------------------------------------
+    stop_ids = stop_token_ids(tokenizer) if stop_ids is None else set(stop_ids)
+    limits = max_new_tokens if isinstance(max_new_tokens, list) else [max_new_tokens] * len(prompts)
+    logits, cache, attention_mask, next_positions = prefill(model, tokenizer, prompts, prefix)
+
+    rows = list(range(len(prompts)))     # prompt index of each live batch row
+    outputs = [[] for _ in prompts]
+    while rows:
+        next_tokens = logits.argmax(-1)
+        keep = []
+        for i, (row, token) in enumerate(zip(rows, next_tokens.tolist())):
+            if token in stop_ids:
+                continue
+            outputs[row].append(token)
+            if len(outputs[row]) < limits[row]:
+                keep.append(i)
+        if not keep:
+            break
+        if len(keep) < len(rows):
+            # Drop finished rows everywhere, including the KV cache
+            index = torch.tensor(keep, device=next_tokens.device)
+            cache.batch_select_indices(index)
+            next_tokens, attention_mask, next_positions = next_tokens[index], attention_mask[index], next_positions[index]
+            rows = [rows[i] for i in keep]
+        attention_mask = torch.cat([attention_mask, attention_mask.new_ones((len(rows), 1))], dim=1)
+        with METRICS.timer("decode"):
+            logits = model(input_ids=next_tokens[:, None], attention_mask=attention_mask, position_ids=next_positions,
+                           past_key_values=cache, use_cache=True).logits[:, -1]
+        next_positions = next_positions + 1
+    METRICS.inc("generated_tokens", sum(len(ids) for ids in outputs))
+    return outputs
+
+
+def generate_scripts(model, tokenizer, news_summaries, max_new_tokens=MAX_NEW_TOKENS,
+                     token_budget=TOKEN_BUDGET, max_batch=MAX_BATCH, prefix=None):
+    # ------------------------------------------------------------
+    # Batch mode: scripts for many summaries, in input order.
+    # Prompts are grouped by plan_batches and decoded with
+    # generate_batch. max_new_tokens may be one int or one per
+    # summary; prefix is an optional PromptPrefix.
+    # ------------------------------------------------------------
+    prompts = [build_prompt(tokenizer, s) for s in news_summaries]
+    limits = max_new_tokens if isinstance(max_new_tokens, list) else [max_new_tokens] * len(prompts)
+    lengths = [len(ids) for ids in tokenizer(prompts, add_special_tokens=False)["input_ids"]]
+    scripts = [None] * len(prompts)
+    for batch in plan_batches(lengths, max(limits, default=0), token_budget, max_batch):
+        tokens = generate_batch(model, tokenizer, [prompts[i] for i in batch], [limits[i] for i in batch],
+                                prefix=prefix)
+        for i, ids in zip(batch, tokens):
+            scripts[i] = tokenizer.decode(ids, skip_special_tokens=True).strip()
+    return scripts
+
+
+@torch.no_grad()
+def stream_tokens(model, tokenizer, news_summary, max_new_tokens=MAX_NEW_TOKENS, prefix=None, stop_ids=None):
+    # Greedy decoding of one script, yielding each new token id as soon as it is chosen
+    stop_ids = stop_token_ids(tokenizer) if stop_ids is None else set(stop_ids)
+    logits, cache, attention_mask, next_positions = prefill(
+        model, tokenizer, [build_prompt(tokenizer, news_summary)], prefix)
+    for step in range(max_new_tokens):
+        token = logits.argmax(-1)
+        if token.item() in stop_ids:
+            return
+        METRICS.inc("generated_tokens")
+        yield token.item()
+        if step + 1 == max_new_tokens:
+            return
+        attention_mask = torch.cat([attention_mask, attention_mask.new_ones((1, 1))], dim=1)
+        with METRICS.timer("decode"):
+            logits = model(input_ids=token[:, None], attention_mask=attention_mask, position_ids=next_positions,
+                           past_key_values=cache, use_cache=True).logits[:, -1]
+        next_positions = next_positions + 1
+
+
+def complete_sentences(text, start=0):
+    # Sentences of text[start:] that are finished (see SENTENCE_END).
+    # Returns (sentences, where the unfinished rest starts).
+    sentences = []
+    for match in SENTENCE_END.finditer(text, start):
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, start
+
+
+def stream_script(model, tokenizer, news_summary, max_new_tokens=MAX_NEW_TOKENS, prefix=None):
+    # ------------------------------------------------------------
+    # Streaming mode: yields events while the script decodes, so
+    # TTS can start on the first sentence instead of waiting for
+    # the whole script.
+    #   {"event": "token", "text"}         new text since the last token event
+    #   {"event": "sentence", "index", "text", "seconds"}
+    #                                      a finished sentence, ready for TTS
+    #   {"event": "done", "script", "sentences", "tokens",
+    #    "time_to_first_token", "time_to_first_sentence", "seconds"}
+    # Times are seconds since the call. The script is the same
+    # greedy script generate_script returns.
+    # ------------------------------------------------------------
+    start = time.perf_counter()
+    ids, text, sentence_start, sentences = [], "", 0, 0
+    first_token = first_sentence = None
+
+    def sentence_event(sentence):
+        nonlocal sentences, first_sentence
+        seconds = time.perf_counter() - start
+        if first_sentence is None:
+            first_sentence = seconds
+        sentences += 1
+        return {"event": "sentence", "index": sentences - 1, "text": sentence, "seconds": round(seconds, 4)}
+
+    for token in stream_tokens(model, tokenizer, news_summary, max_new_tokens, prefix):
+        ids.append(token)
+        decoded = tokenizer.decode(ids, skip_special_tokens=True)
+        if decoded.endswith("\ufffd"):
+            continue   # a multi-byte character (emoji) split across tokens; wait for the rest
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        yield {"event": "token", "text": decoded[len(text):]}
+        text = decoded
+        finished, sentence_start = complete_sentences(text, sentence_start)
+        for sentence in finished:
+            yield sentence_event(sentence)
+
+    decoded = tokenizer.decode(ids, skip_special_tokens=True)
+    if decoded != text:
+        yield {"event": "token", "text": decoded[len(text):]}
+        text = decoded
+    if text[sentence_start:].strip():
+        yield sentence_event(text[sentence_start:].strip())
+    yield {
+        "event": "done",
+        "script": text.strip(),
+        "sentences": sentences,
+        "tokens": len(ids),
+        "time_to_first_token": first_token,
+        "time_to_first_sentence": first_sentence,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    news_summary = " ".join(sys.argv[1:]) or sys.stdin.read()
+    if not news_summary.strip():
+        sys.exit("Pass a news summary as arguments or on stdin.")
+    configure_logging("INFO", fmt="text")
+
+    start = time.perf_counter()
+    model, tokenizer = load_model()
+    print(f"Loaded in {time.perf_counter() - start:.1f}s")
+
+    print("\n--- Input Prompt ---")
+    print(build_prompt(tokenizer, news_summary).strip())
+
+    # 4-5. Stream the script as it decodes
+    print("\n--- TikTok Generation ---")
+    for event in stream_script(model, tokenizer, news_summary):
+        if event["event"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["event"] == "done":
+            print(f"\n-------------------------\n"
+                  f"first sentence after {event['time_to_first_sentence'] or 0:.1f}s, "
+                  f"{event['tokens']} tokens in {event['seconds']:.1f}s\n")
+    print(METRICS.format_table())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraping"))
+from stand_in_server import StandInServer
+
+# ============================================================
+# Local mock of the TikTok Research API
+# ------------------------------------------------------------
+# Serves the two endpoints transcripts_generation.py uses:
+#   - POST /v2/oauth/token/                 client_credentials token
+#   - POST /v2/research/video/query/        paginated video query
+#
+# Videos are generated deterministically per (username, day), so
+# a harvest can be checked for completeness and duplicates.
+# Like the real API, queries spanning too many days fail with
+# 500, and queries with an unknown or expired access token get a
+# 401. The mock can also be told to rate limit (429) or to fail
+# every request for a while to simulate an outage.
+#
+# Usage:
+#   with MockResearchAPI(videos_per_day=5) as api:
+#       harvest(..., token_url=api.token_url, query_url=api.query_url)
+# ============================================================
+
+TOKEN_PATH = "/v2/oauth/token/"
+QUERY_PATH = "/v2/research/video/query/"
+
+
+class MockResearchAPI:
+    def __init__(self, videos_per_day=5, max_window_days=10, latency=0.02, rate_limit=None, seed=0,
+                 token_lifetime=7200):
+        self.videos_per_day = videos_per_day
+        self.max_window_days = max_window_days   # longer query windows get a 500
+        self.rate_limit = rate_limit             # requests/second before 429s (None = unlimited)
+        self.seed = seed
+        self.failing = False                     # when True every query gets a 500
+        self.token_lifetime = token_lifetime     # seconds an issued token stays valid
+        self.query_count = 0
+        self.token_count = 0
+        self.rejected = 0
+        self.unauthorized = 0
+        self._tokens = {}                        # access token -> expiry (monotonic)
+        self._lock = threading.Lock()
+        self._next_allowed = 0.0
+        self._searches = {}                      # search_id -> full result list
+        self.server = StandInServer(
+            {TOKEN_PATH: self._token, QUERY_PATH: self._query},
+            latency=latency,
+        )
+
+    # ---- lifecycle ----
+
+    def __enter__(self):
+        self.server.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.stop()
+
+    @property
+    def token_url(self):
+        return self.server.url(TOKEN_PATH)
+
+    @property
+    def query_url(self):
+        return self.server.url(QUERY_PATH)
+
+    # ---- data ----
+
+    def videos_for(self, username, day):
+        # Same videos for the same (username, day) on every call
+        rng = random.Random(f"{self.seed}:{username}:{day.isoformat()}")
+        return [
+            {
+                "id": f"{username}-{day.strftime('%Y%m%d')}-{i}",
+                "username": username,
+                "video_description": f"Story time part {i} #reddit",
+                "like_count": rng.randint(0, 50000),
+                "view_count": rng.randint(1000, 2000000),
+                "voice_to_text": f"So this happened to me on {day.isoformat()} and honestly {rng.random():.6f}",
+                "create_time": int(datetime(day.year, day.month, day.day, 12, i % 60, tzinfo=timezone.utc).timestamp()),
+            }
+            for i in range(self.videos_per_day)
+        ]
+
+    def expected_ids(self, usernames, start_date, end_date):
+        ids = set()
+        day = start_date
+        while day <= end_date:
+            for username in usernames:
+                ids.update(v["id"] for v in self.videos_for(username, day))
+            day += timedelta(days=1)
+        return ids
+
+    # ---- routes ----
+
+    def _json(self, status, body, headers=None):
+        return status, dict({"Content-Type": "application/json"}, **(headers or {})), json.dumps(body).encode()
+
+    def _token(self, handler):
+        with self._lock:
+            self.token_count += 1
+            token = f"mock-token-{self.token_count}"
+            self._tokens[token] = time.monotonic() + self.token_lifetime
+        return self._json(200, {"access_token": token, "expires_in": self.token_lifetime, "token_type": "Bearer"})
+
+    def _query(self, handler):
+        with self._lock:
+            self.query_count += 1
+            now = time.monotonic()
+            if self.rate_limit and now < self._next_allowed:
+                self.rejected += 1
+                return self._json(429, {"error": {"code": "rate_limit_exceeded"}}, {"Retry-After": "1"})
+            if self.rate_limit:
+                self._next_allowed = now + 1 / self.rate_limit
+            if self.failing:
+                return self._json(500, {"error": {"code": "internal_error", "message": "outage"}})
+            token = handler.headers.get("Authorization", "").replace("Bearer ", "", 1)
+            if self._tokens.get(token, 0) <= now:
+                self.unauthorized += 1
+                return self._json(401, {"error": {"code": "access_token_invalid"}})
+
+        body = json.loads(handler.request_body or b"{}")
+        start = datetime.strptime(body["start_date"], "%Y%m%d").date()
+        end = datetime.strptime(body["end_date"], "%Y%m%d").date()
+        if (end - start).days + 1 > self.max_window_days:
+            # The real API tends to time out on long windows
+            return self._json(500, {"error": {"code": "internal_error", "message": "search timed out"}})
+
+        max_count = min(int(body.get("max_count", 20)), 100)
+        cursor = int(body.get("cursor") or 0)
+        search_id = body.get("search_id")
+
+        with self._lock:
+            results = self._searches.get(search_id)
+        if results is None:
+            username = body["query"]["and"][0]["field_values"][0]
+            results = []
+            day = start
+            while day <= end:
+                results.extend(self.videos_for(username, day))
+                day += timedelta(days=1)
+            search_id = f"search-{random.getrandbits(48):x}"
+            with self._lock:
+                self._searches[search_id] = results
+
+        page = results[cursor:cursor + max_count]
+        next_cursor = cursor + len(page)
+        return self._json(200, {
+            "data": {
+                "videos": page,
+                "cursor": next_cursor,
+                "has_more": next_cursor < len(results),
+                "search_id": search_id,
+            },
+            "error": {"code": "ok"},
+        })
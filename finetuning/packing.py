@@ -0,0 +1,194 @@
+import bisect
+import random
+
+import torch
+from datasets import Dataset
+from torch.utils.data import Sampler
+
+# ============================================================
+# Sequence packing + length-bucketed batching for fine-tuning
+# ------------------------------------------------------------
+# TikTok scripts are a few hundred tokens, far below MAX_LENGTH.
+# Trained one per step (or padded to the longest in a batch),
+# most of every step is spent on padding. Two ways around it:
+#
+#   packed:   formatted examples are concatenated (best-fit
+#             decreasing) into rows of up to max_length tokens.
+#             position_ids restart at 0 for every example and no
+#             attention_mask is passed, so the model builds a
+#             block-diagonal causal mask from them: no attention
+#             across examples (transformers >= 4.53 for sdpa/eager,
+#             or flash_attention_2). Needs model.config.use_cache =
+#             False, as in train.py: with a cache, transformers does
+#             not look for packed sequences.
+#   bucketed: examples stay separate, but each batch is drawn from
+#             examples of similar length (LengthBucketSampler) and
+#             padded only to its own longest example.
+#
+# Either way, loss is computed on the assistant turn only: labels
+# are -100 for the chat template and the instruction.
+#
+# Usage:
+#   train_dataset = pack_dataset(train_dataset, tokenizer, MAX_LENGTH)
+#   trainer = SFTTrainer(..., train_dataset=train_dataset,
+#                        data_collator=PackedCollator(tokenizer.pad_token_id))
+# ============================================================
+
+IGNORE_INDEX = -100
+ASSISTANT_HEADER = "<|start_header_id|>assistant<|end_header_id|>\n"
+BUCKET_BATCHES = 50          # batches per sorted chunk in LengthBucketSampler
+
+
+def tokenize_with_labels(texts, tokenizer, max_length=None):
+    # ------------------------------------------------------------
+    # Tokenizes formatted examples (formatting_function's "text")
+    # and returns (input_ids, labels) lists. Tokens before the end
+    # of the assistant header get IGNORE_INDEX labels, found through
+    # the fast tokenizer's character offsets.
+    # ------------------------------------------------------------
+    encoded = tokenizer(
+        texts,
+        add_special_tokens=False,        # the template already starts with <|begin_of_text|>
+        return_offsets_mapping=True,
+        truncation=max_length is not None,
+        max_length=max_length,
+    )
+    all_ids, all_labels = [], []
+    for text, ids, offsets in zip(texts, encoded["input_ids"], encoded["offset_mapping"]):
+        header = text.find(ASSISTANT_HEADER)
+        response_start = header + len(ASSISTANT_HEADER) if header >= 0 else 0
+        all_ids.append(ids)
+        all_labels.append([
+            token if start >= response_start else IGNORE_INDEX
+            for token, (start, _) in zip(ids, offsets)
+        ])
+    return all_ids, all_labels
+
+
+def pack_examples(lengths, max_length):
+    # ------------------------------------------------------------
+    # Best-fit decreasing bin packing: returns a list of rows, each
+    # a list of example indices whose lengths sum to <= max_length.
+    # Longest examples are placed first, each into the row it fills
+    # most tightly.
+    # ------------------------------------------------------------
+    rows = []
+    free = []                # sorted (space left, row index)
+    for i in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+        length = lengths[i]
+        slot = bisect.bisect_left(free, (length, -1))
+        if slot < len(free):
+            space, row = free.pop(slot)
+            rows[row].append(i)
+            space -= length
+        else:
+            rows.append([i])
+            row, space = len(rows) - 1, max_length - length
+        if space > 0:
+            bisect.insort(free, (space, row))
+    return rows
+
+
+def pack_dataset(dataset, tokenizer, max_length, text_column="text", seed=0):
+    # Formatted dataset -> packed rows of input_ids, labels, position_ids
+    ids, labels = tokenize_with_labels(list(dataset[text_column]), tokenizer, max_length)
+    rows = pack_examples([len(x) for x in ids], max_length)
+    random.Random(seed).shuffle(rows)
+    packed = {"input_ids": [], "labels": [], "position_ids": []}
+    for row in rows:
+        packed["input_ids"].append([t for i in row for t in ids[i]])
+        packed["labels"].append([t for i in row for t in labels[i]])
+        packed["position_ids"].append([p for i in row for p in range(len(ids[i]))])
+    return Dataset.from_dict(packed)
+
+
+def tokenize_dataset(dataset, tokenizer, max_length, text_column="text"):
+    # Formatted dataset -> unpacked input_ids, labels, length (for bucketing)
+    ids, labels = tokenize_with_labels(list(dataset[text_column]), tokenizer, max_length)
+    return Dataset.from_dict({"input_ids": ids, "labels": labels, "length": [len(x) for x in ids]})
+
+
+class PackedCollator:
+    # ------------------------------------------------------------
+    # Batches packed rows. No attention_mask on purpose: the model
+    # derives the per-example mask from position_ids. Padding gets
+    # its own position_ids run (so it is a separate "example") and
+    # IGNORE_INDEX labels.
+    # ------------------------------------------------------------
+    def __init__(self, pad_token_id):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, features):
+        width = max(len(f["input_ids"]) for f in features)
+        batch = {"input_ids": [], "labels": [], "position_ids": []}
+        for f in features:
+            pad = width - len(f["input_ids"])
+            batch["input_ids"].append(list(f["input_ids"]) + [self.pad_token_id] * pad)
+            batch["labels"].append(list(f["labels"]) + [IGNORE_INDEX] * pad)
+            batch["position_ids"].append(list(f["position_ids"]) + list(range(pad)))
+        return {name: torch.tensor(values, dtype=torch.long) for name, values in batch.items()}
+
+
+class PaddedCollator:
+    # Right-pads each batch to its own longest example
+    def __init__(self, pad_token_id):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, features):
+        width = max(len(f["input_ids"]) for f in features)
+        batch = {"input_ids": [], "labels": [], "attention_mask": []}
+        for f in features:
+            n = len(f["input_ids"])
+            batch["input_ids"].append(list(f["input_ids"]) + [self.pad_token_id] * (width - n))
+            batch["labels"].append(list(f["labels"]) + [IGNORE_INDEX] * (width - n))
+            batch["attention_mask"].append([1] * n + [0] * (width - n))
+        return {name: torch.tensor(values, dtype=torch.long) for name, values in batch.items()}
+
+
+class LengthBucketSampler(Sampler):
+    # ------------------------------------------------------------
+    # Yields indices so that every run of batch_size consecutive
+    # indices (one batch) holds examples of similar length, while
+    # the epoch order stays random: shuffle, cut into chunks of
+    # BUCKET_BATCHES batches, sort each chunk by length, then
+    # shuffle the resulting batches.
+    # ------------------------------------------------------------
+    def __init__(self, lengths, batch_size, bucket_batches=BUCKET_BATCHES, seed=0):
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.chunk = batch_size * bucket_batches
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __iter__(self):
+        rng = random.Random(self.seed + self.epoch)
+        self.epoch += 1
+        order = list(range(len(self.lengths)))
+        rng.shuffle(order)
+        batches = []
+        for i in range(0, len(order), self.chunk):
+            chunk = sorted(order[i:i + self.chunk], key=lambda j: -self.lengths[j])
+            batches.extend(chunk[k:k + self.batch_size] for k in range(0, len(chunk), self.batch_size))
+        rng.shuffle(batches)
+        return iter([i for batch in batches for i in batch])
+
+
+class LengthBucketMixin:
+    # ------------------------------------------------------------
+    # Mix into a Trainer class to draw training batches from
+    # LengthBucketSampler, using the dataset's "length" column
+    # (tokenize_dataset adds it):
+    #   class BucketedSFTTrainer(LengthBucketMixin, SFTTrainer): pass
+    # ------------------------------------------------------------
+    def _get_train_sampler(self, *args, **kwargs):
+        # "length" from self.train_dataset: the dataloader's copy may have
+        # unused columns removed; row order is the same
+        return LengthBucketSampler(
+            self.train_dataset["length"], self.args.per_device_train_batch_size, seed=self.args.seed,
+        )
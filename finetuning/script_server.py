@@ -0,0 +1,458 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from generate import (
+    ADAPTER_PATH, MAX_BATCH, MAX_NEW_TOKENS, MODEL_PATH, TOKEN_BUDGET, PromptPrefix, generate_scripts, load_model,
+    stream_script,
+)
+from telemetry import DEFAULT_LOG_LEVEL, METRICS, configure_logging
+
+# ============================================================
+# Long-lived TikTok script generation service
+# ------------------------------------------------------------
+# generate.py loads the 4-bit model and adapter (tens of seconds)
+# to write a single script. This server loads them once and then
+# turns news summaries into scripts for as long as it runs:
+#
+#   POST /generate   {"summary": "..."}, or a scraper record
+#                    ({"title", "article_text", ...}), or a list
+#                    of either -> {"script", "latency", ...} (list)
+#   POST /stream     one summary or record -> NDJSON events as the
+#                    script decodes: "token", "sentence" (ready
+#                    for TTS, see generate.stream_script), then
+#                    "done" with the script and timings
+#   GET  /stats      load time, queue depth, request counts,
+#                    latency and time-to-first-sentence percentiles
+#   GET  /metrics    tokenize/prefill/decode timers and token
+#                    counters, Prometheus text format (telemetry.py)
+#   GET  /health
+#
+# Requests wait in a bounded queue for the generation worker (one
+# model, one GPU). The worker batches dynamically: it takes every
+# request already waiting (up to --max-batch) and generates them
+# together (generate.generate_scripts: length-sorted batches under
+# a token budget, each script stopping at its own <|eot_id|>).
+# The system prompt's KV cache is computed once at startup and
+# reused by every batch, so only the article part is prefilled
+# (--no-prefix-cache turns this off). Streamed requests are
+# decoded one at a time, ahead of the batch they were taken with:
+# they trade throughput for time-to-first-sentence.
+# When the queue is full, POST /generate answers 503 so callers
+# back off.
+#
+# --stdin turns it into a JSONL worker instead: scraper records
+# in on stdin (e.g. batch_scraper.py output), the same records
+# with a "script" field out on stdout.
+#
+# Usage:
+#   python script_server.py --port 8765
+#   curl -d '{"summary": "..."}' localhost:8765/generate
+#   python script_server.py --stdin < scraped_articles.jsonl > scripts.jsonl
+# ============================================================
+
+DEFAULT_PORT = 8765
+MAX_QUEUE = 64               # pending generations before 503
+MAX_SUMMARY_CHARS = 4000     # article text used when a record has no summary
+LATENCY_WINDOW = 1000        # recent requests kept for the percentiles
+
+
+class QueueFull(Exception):
+    pass
+
+
+def summary_of(record):
+    # ------------------------------------------------------------
+    # The text to turn into a script: a "summary" field if the
+    # record has one, otherwise the scraped title + article text.
+    # ------------------------------------------------------------
+    if isinstance(record, str):
+        return record
+    if record.get("summary"):
+        return record["summary"]
+    title = record.get("title") or ""
+    text = (record.get("article_text") or "")[:MAX_SUMMARY_CHARS]
+    return f"{title}\n\n{text}".strip()
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ScriptServer:
+    def __init__(self, model, tokenizer, load_seconds=0.0, max_new_tokens=MAX_NEW_TOKENS,
+                 host="127.0.0.1", port=DEFAULT_PORT, max_queue=MAX_QUEUE, max_batch=MAX_BATCH,
+                 token_budget=TOKEN_BUDGET, generate=generate_scripts, stream=stream_script, prefix_cache=True):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.load_seconds = load_seconds
+        self.max_new_tokens = max_new_tokens
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.token_budget = token_budget
+        self.prefix = PromptPrefix(model, tokenizer) if prefix_cache else None
+        # generate(model, tokenizer, summaries, max_new_tokens=[...], ...) -> scripts
+        self._generate = generate
+        # stream(model, tokenizer, summary, max_new_tokens=..., prefix=...) -> events
+        self._stream = stream
+        self._jobs = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._generation = deque(maxlen=LATENCY_WINDOW)
+        self._first_sentence = deque(maxlen=LATENCY_WINDOW)
+        self._counts = {"requests": 0, "completed": 0, "errors": 0, "rejected": 0, "batches": 0, "streamed": 0}
+        self._in_flight = 0
+        self._started = time.time()
+        self._worker = None
+        self._httpd = None
+        self._http_thread = None
+
+    # ---- lifecycle ----
+
+    def start(self, http=True):
+        # Safe to call again (e.g. `with server.start(http=False):`)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+        if http and self._httpd is None:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler())
+            self._httpd.daemon_threads = True
+            self.port = self._httpd.server_address[1]
+            self._http_thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+            self._http_thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._worker is not None:
+            self._jobs.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def __enter__(self):
+        return self.start(http=self._httpd is not None or self._worker is None)
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def url(self, path="/"):
+        return f"http://{self.host}:{self.port}{path}"
+
+    # ---- generation ----
+
+    def submit(self, summary, max_new_tokens=None, block=False, events=None):
+        # Queues one summary; the Future resolves to the result dict.
+        # With an events queue, the script is streamed into it (see stream()).
+        # max_new_tokens must be an int from 1 to the server's own limit:
+        # it is shared with the rest of the batch, so a bad value would
+        # fail (or stretch) every request generated alongside it.
+        if max_new_tokens is not None and not (
+            type(max_new_tokens) is int and 1 <= max_new_tokens <= self.max_new_tokens
+        ):
+            raise ValueError(f"max_new_tokens must be an integer from 1 to {self.max_new_tokens}")
+        future = Future()
+        job = (summary, max_new_tokens or self.max_new_tokens, time.perf_counter(), future, events)
+        with self._lock:
+            self._counts["requests"] += 1
+        try:
+            self._jobs.put(job, block=block)
+        except queue.Full:
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise QueueFull(f"{self._jobs.maxsize} generations already queued")
+        return future
+
+    def stream(self, summary, max_new_tokens=None):
+        # Queues one summary for streaming. Returns (future, events): the
+        # events queue receives stream_script's events, then None.
+        events = queue.Queue()
+        return self.submit(summary, max_new_tokens, events=events), events
+
+    def _next_batch(self):
+        # Blocks for one job, then takes the jobs already waiting, up to max_batch.
+        # Returns (jobs, stop); stop is set once the shutdown sentinel is seen.
+        job = self._jobs.get()
+        if job is None:
+            return [], True
+        jobs = [job]
+        while len(jobs) < self.max_batch:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return jobs, True
+            jobs.append(job)
+        return jobs, False
+
+    def _run(self):
+        while True:
+            jobs, stop = self._next_batch()
+            jobs = [job for job in jobs if job[3].set_running_or_notify_cancel()]
+            for job in jobs:
+                if job[4] is not None:
+                    self._run_stream(job)
+            jobs = [job for job in jobs if job[4] is None]
+            if jobs:
+                self._run_batch(jobs)
+            if stop:
+                return
+
+    def _run_batch(self, jobs):
+        summaries = [job[0] for job in jobs]
+        limits = [job[1] for job in jobs]
+        with self._lock:
+            self._in_flight += len(jobs)
+            self._counts["batches"] += 1
+        started = time.perf_counter()
+        try:
+            scripts = self._generate(self.model, self.tokenizer, summaries, max_new_tokens=limits,
+                                     token_budget=self.token_budget, max_batch=self.max_batch, prefix=self.prefix)
+        except Exception as e:
+            with self._lock:
+                self._counts["errors"] += len(jobs)
+                self._in_flight -= len(jobs)
+            for job in jobs:
+                job[3].set_exception(e)
+            return
+        done = time.perf_counter()
+        with self._lock:
+            self._counts["completed"] += len(jobs)
+            self._in_flight -= len(jobs)
+            self._generation.append(done - started)
+            for job in jobs:
+                self._latencies.append(done - job[2])
+        for (_, _, queued_at, future, _), script in zip(jobs, scripts):
+            future.set_result({
+                "script": script,
+                "latency": round(done - queued_at, 4),
+                "queue_wait": round(started - queued_at, 4),
+                "generation_seconds": round(done - started, 4),
+                "batch_size": len(jobs),
+            })
+
+    def _run_stream(self, job):
+        summary, limit, queued_at, future, events = job
+        with self._lock:
+            self._in_flight += 1
+            self._counts["streamed"] += 1
+        started = time.perf_counter()
+        try:
+            for event in self._stream(self.model, self.tokenizer, summary, max_new_tokens=limit, prefix=self.prefix):
+                if event["event"] == "done":
+                    done = time.perf_counter()
+                    event = dict(event, latency=round(done - queued_at, 4), queue_wait=round(started - queued_at, 4))
+                events.put(event)
+        except Exception as e:
+            with self._lock:
+                self._counts["errors"] += 1
+                self._in_flight -= 1
+            events.put({"event": "error", "error": str(e)})
+            events.put(None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._counts["completed"] += 1
+            self._in_flight -= 1
+            self._latencies.append(done - queued_at)
+            if event["time_to_first_sentence"] is not None:
+                self._first_sentence.append(started - queued_at + event["time_to_first_sentence"])
+        events.put(None)
+        future.set_result(event)
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            generation = list(self._generation)
+            first_sentence = list(self._first_sentence)
+            stats = dict(self._counts, in_flight=self._in_flight)
+        stats.update({
+            "load_seconds": round(self.load_seconds, 3),
+            "prefix_tokens": len(self.prefix) if self.prefix is not None else 0,
+            "uptime_seconds": round(time.time() - self._started, 1),
+            "queue_depth": self._jobs.qsize(),
+            "latency_p50": percentile(latencies, 0.5),
+            "latency_p95": percentile(latencies, 0.95),
+            "latency_max": max(latencies) if latencies else None,
+            "batch_generation_mean": sum(generation) / len(generation) if generation else None,
+            "mean_batch_size": (stats["completed"] - stats["streamed"]) / stats["batches"] if stats["batches"] else None,
+            "first_sentence_p50": percentile(first_sentence, 0.5),
+            "first_sentence_p95": percentile(first_sentence, 0.95),
+        })
+        return stats
+
+    # ---- HTTP ----
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self._send(200, server.stats())
+                elif self.path == "/metrics":
+                    data = METRICS.to_prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                elif self.path == "/health":
+                    self._send(200, {"ok": True})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path not in ("/generate", "/stream"):
+                    self._send(404, {"error": "not found"})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"null")
+                except ValueError:
+                    self._send(400, {"error": "body must be JSON"})
+                    return
+                records = body if isinstance(body, list) else [body]
+                if not records or not all(isinstance(r, (dict, str)) and summary_of(r) for r in records):
+                    self._send(400, {"error": "expected a summary, a scraper record or a list of them"})
+                    return
+                max_new_tokens = body.get("max_new_tokens") if isinstance(body, dict) else None
+                if self.path == "/stream":
+                    self._send_stream(body, max_new_tokens)
+                    return
+                try:
+                    futures = [server.submit(summary_of(r), max_new_tokens) for r in records]
+                except ValueError as e:
+                    self._send(400, {"error": str(e)})
+                    return
+                except QueueFull as e:
+                    self._send(503, {"error": str(e)})
+                    return
+                try:
+                    results = [f.result() for f in futures]
+                except Exception as e:
+                    self._send(500, {"error": f"generation failed: {e}"})
+                    return
+                self._send(200, results if isinstance(body, list) else results[0])
+
+            def _send_stream(self, body, max_new_tokens):
+                if isinstance(body, list):
+                    self._send(400, {"error": "/stream takes one summary or record"})
+                    return
+                try:
+                    _, events = server.stream(summary_of(body), max_new_tokens)
+                except ValueError as e:
+                    self._send(400, {"error": str(e)})
+                    return
+                except QueueFull as e:
+                    self._send(503, {"error": str(e)})
+                    return
+                # NDJSON, one event per line, flushed as it comes (the connection closes at the end)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for event in iter(events.get, None):
+                    self.wfile.write(json.dumps(event, ensure_ascii=False).encode() + b"\n")
+                    self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def run_jsonl(server, lines, out):
+    # ------------------------------------------------------------
+    # JSONL worker: each input line is a scraper record (or
+    # {"summary": ...}); the record is written back with "script"
+    # added, in input order. Everything is queued up front, so the
+    # worker never waits on I/O between generations.
+    # ------------------------------------------------------------
+    pending = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            record = json.loads(line)
+            pending.append((record, server.submit(summary_of(record), block=True)))
+        # Write finished results as soon as their turn comes, keeping memory flat
+        while pending and pending[0][1].done():
+            write_result(*pending.pop(0), out)
+    for record, future in pending:
+        write_result(record, future, out)
+
+
+def write_result(record, future, out):
+    try:
+        record = dict(record, **future.result())
+    except Exception as e:
+        record = dict(record, error=str(e))
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve TikTok script generation from a model loaded once.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--adapter", default=ADAPTER_PATH, help="LoRA adapter directory ('' for the base model)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-new-tokens", type=int, default=MAX_NEW_TOKENS,
+                        help="Default and upper limit for a request's max_new_tokens")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Requests generated together (1 = one at a time)")
+    parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET,
+                        help="Max rows x (prompt + new tokens) per generation batch")
+    parser.add_argument("--no-prefix-cache", action="store_true",
+                        help="Prefill the system prompt with every batch instead of reusing its KV cache")
+    parser.add_argument("--stdin", action="store_true", help="Read JSONL records from stdin, write scripts to stdout")
+    parser.add_argument("--log-level", default=DEFAULT_LOG_LEVEL, help="DEBUG, INFO, WARNING or ERROR")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    start = time.perf_counter()
+    model, tokenizer = load_model(args.model, args.adapter or None)
+    load_seconds = time.perf_counter() - start
+    print(f"Model loaded in {load_seconds:.1f}s", file=sys.stderr)
+
+    server = ScriptServer(model, tokenizer, load_seconds=load_seconds, max_new_tokens=args.max_new_tokens,
+                          host=args.host, port=args.port, max_queue=args.max_queue, max_batch=args.max_batch,
+                          token_budget=args.token_budget, prefix_cache=not args.no_prefix_cache)
+    if args.stdin:
+        with server.start(http=False):
+            run_jsonl(server, sys.stdin, sys.stdout)
+        print(json.dumps(server.stats()), file=sys.stderr)
+        return
+
+    server.start()
+    print(f"Serving on {server.url()} (POST /generate, GET /stats, GET /metrics)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+# Imported first: it puts ../scraping on sys.path for the shared HTTP modules
+from transcripts_generation import (
+    CSV_FILE,
+    MAX_RESULTS_PER_QUERY,
+    TOKEN_URL,
+    USERNAMES,
+    VIDEO_QUERY_URL,
+    build_video_query,
+    TOKEN_CACHE_FILE,
+    get_token_manager,
+    query_video_page,
+    save_to_csv,
+)
+from http_session import get_shared_session
+from politeness import host_of
+from transcript_store import TranscriptStore
+
+# ============================================================
+# Parallel, paginated, resumable TikTok Research API harvester
+# ------------------------------------------------------------
+# Builds on transcripts_generation.py:
+#   1. Splits the date range into small windows per username
+#      (long windows make the API time out with 500s)
+#   2. Follows cursor / has_more / search_id pagination
+#   3. Runs windows concurrently; the shared politeness scheduler
+#      keeps the API host within its rate budget
+#   4. Checkpoints every page in SQLite, so a crash or an
+#      outage resumes from the last saved cursor on the next run
+#   5. Shares one cached, proactively refreshed access token
+#      between workers (see token_manager.py)
+#   6. Writes to the Parquet store with --store (upserts on video
+#      id, see transcript_store.py), or appends to the CSV
+#
+# Each page's videos are written before its cursor is
+# checkpointed: after a crash a page may be fetched again, but
+# video ids already written are skipped, so the output stays free
+# of duplicates.
+#
+# Usage:
+#   python tiktok_harvester.py --start 2025-10-01 --end 2025-11-09 --workers 4
+#   python tiktok_harvester.py user1 user2 --window-days 3   (re-run to resume)
+#   python tiktok_harvester.py --store transcripts
+# ============================================================
+
+CHECKPOINT_FILE = "harvest_checkpoint.sqlite3"
+WINDOW_DAYS = 3           # days per query window
+DEFAULT_WORKERS = 4
+API_RATE = 2.0            # requests/second to the API host, shared by all workers
+
+
+def split_windows(start_date, end_date, window_days=WINDOW_DAYS):
+    # ------------------------------------------------------------
+    # Splits [start_date, end_date] (inclusive) into consecutive
+    # windows of at most window_days days.
+    # ------------------------------------------------------------
+    windows = []
+    current = start_date
+    while current <= end_date:
+        window_end = min(current + timedelta(days=window_days - 1), end_date)
+        windows.append((current, window_end))
+        current = window_end + timedelta(days=1)
+    return windows
+
+
+class HarvestCheckpoint:
+    # ------------------------------------------------------------
+    # SQLite progress store, safe to share between worker threads.
+    #   windows: one row per (username, start, end) with the saved
+    #            cursor/search_id and whether it is finished
+    #   seen:    ids of videos already written to the CSV
+    # ------------------------------------------------------------
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS windows (
+                username TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                cursor INTEGER,
+                search_id TEXT,
+                pages INTEGER NOT NULL DEFAULT 0,
+                videos INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                PRIMARY KEY (username, start_date, end_date)
+            )
+        """)
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)")
+        self._db.commit()
+
+    def plan(self, usernames, windows):
+        # Adds windows not planned yet; existing rows (and their progress) are kept
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO windows (username, start_date, end_date) VALUES (?, ?, ?)",
+                [(u, s.isoformat(), e.isoformat()) for u in usernames for s, e in windows],
+            )
+            self._db.commit()
+
+    def pending(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT username, start_date, end_date, cursor, search_id FROM windows WHERE done = 0 "
+                "ORDER BY start_date, username"
+            ).fetchall()
+        return [
+            {"username": u, "start": date.fromisoformat(s), "end": date.fromisoformat(e),
+             "cursor": c, "search_id": sid}
+            for u, s, e, c, sid in rows
+        ]
+
+    def unseen(self, videos):
+        # Videos whose id hasn't been written yet
+        ids = [str(v.get("id")) for v in videos]
+        with self._lock:
+            seen = set()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                seen.update(row[0] for row in self._db.execute(
+                    f"SELECT id FROM seen WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+        return [v for v in videos if str(v.get("id")) not in seen]
+
+    def save_page(self, window, videos, cursor, search_id, done):
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", [(str(v.get("id")),) for v in videos])
+            self._db.execute(
+                "UPDATE windows SET cursor = ?, search_id = ?, pages = pages + 1, videos = videos + ?, "
+                "done = ?, error = NULL WHERE username = ? AND start_date = ? AND end_date = ?",
+                (cursor, search_id, len(videos), int(done), window["username"],
+                 window["start"].isoformat(), window["end"].isoformat()),
+            )
+            self._db.commit()
+
+    def split(self, window):
+        # Replaces a failing window with its two halves
+        middle = window["start"] + (window["end"] - window["start"]) // 2
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM windows WHERE username = ? AND start_date = ? AND end_date = ?",
+                (window["username"], window["start"].isoformat(), window["end"].isoformat()),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO windows (username, start_date, end_date) VALUES (?, ?, ?)",
+                [(window["username"], window["start"].isoformat(), middle.isoformat()),
+                 (window["username"], (middle + timedelta(days=1)).isoformat(), window["end"].isoformat())],
+            )
+            self._db.commit()
+
+    def fail(self, window, error):
+        with self._lock:
+            self._db.execute(
+                "UPDATE windows SET error = ? WHERE username = ? AND start_date = ? AND end_date = ?",
+                (error, window["username"], window["start"].isoformat(), window["end"].isoformat()),
+            )
+            self._db.commit()
+
+    def summary(self):
+        with self._lock:
+            done, pending, pages, videos = self._db.execute(
+                "SELECT COALESCE(SUM(done), 0), COALESCE(SUM(1 - done), 0), "
+                "COALESCE(SUM(pages), 0), COALESCE(SUM(videos), 0) FROM windows"
+            ).fetchone()
+        return {"windows_done": done, "windows_pending": pending, "pages": pages, "videos": videos}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TikTokHarvester:
+    # ------------------------------------------------------------
+    # Harvests every planned window with a pool of workers. Windows
+    # that still fail after the scheduler's retries are split in
+    # half (if not started and longer than min_window_days, so an
+    # outage doesn't shred the plan), or left pending with their
+    # error for the next run.
+    # ------------------------------------------------------------
+
+    def __init__(self, checkpoint, tokens, output=CSV_FILE, workers=DEFAULT_WORKERS,
+                 query_url=VIDEO_QUERY_URL, max_count=MAX_RESULTS_PER_QUERY, session=None,
+                 min_window_days=WINDOW_DAYS, store=None):
+        self.checkpoint = checkpoint
+        # Shared TokenManager: cached, refreshed before expiry
+        self.tokens = tokens
+        self.output = output
+        self.workers = workers
+        self.query_url = query_url
+        self.max_count = max_count
+        self.min_window_days = min_window_days
+        # TranscriptStore, or None to append to the CSV at `output`
+        self.store = store
+        self.session = session or get_shared_session()
+        self._csv_lock = threading.Lock()
+
+    def run(self):
+        # Keeps going until no window is pending, or a round makes no progress
+        while True:
+            windows = self.checkpoint.pending()
+            if not windows:
+                return True
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                progressed = list(pool.map(self.harvest_window, windows))
+            if not any(progressed):
+                return False
+
+    def harvest_window(self, window):
+        # Returns True if the window finished or was split, False if it failed
+        cursor, search_id = window["cursor"], window["search_id"]
+        while True:
+            payload = build_video_query(window["username"], window["start"], window["end"],
+                                        self.max_count, cursor=cursor, search_id=search_id)
+            try:
+                token = self.tokens.get()
+                resp = query_video_page(token, payload, session=self.session, query_url=self.query_url)
+                if resp.status_code == 401:
+                    # Token revoked or expired early: one refresh shared by all workers, then retry
+                    resp = query_video_page(self.tokens.invalidate(token), payload,
+                                            session=self.session, query_url=self.query_url)
+            except Exception as e:
+                self.checkpoint.fail(window, str(e))
+                return False
+
+            if resp.status_code != 200:
+                # Still failing after the scheduler's retries
+                days = (window["end"] - window["start"]).days + 1
+                if resp.status_code >= 500 and cursor is None and days > self.min_window_days:
+                    self.checkpoint.split(window)
+                    return True
+                self.checkpoint.fail(window, f"{resp.status_code}: {resp.text[:200]}")
+                return False
+
+            data = resp.json().get("data", {})
+            videos = self.checkpoint.unseen(data.get("videos", []))
+            if videos:
+                self.save(videos)
+
+            cursor, search_id = data.get("cursor"), data.get("search_id")
+            done = not data.get("has_more")
+            self.checkpoint.save_page(window, videos, cursor, search_id, done)
+            if done:
+                return True
+
+    def save(self, videos):
+        if self.store is not None:
+            # Flushed per page so the checkpoint never runs ahead of the data
+            self.store.upsert(videos)
+            self.store.flush()
+        else:
+            with self._csv_lock:
+                save_to_csv(videos, filename=self.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harvest TikTok videos + transcripts with pagination and resume.")
+    parser.add_argument("usernames", nargs="*", help="Usernames to harvest (default: USERNAMES)")
+    parser.add_argument("--start", default="2025-11-01", help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", default="2025-11-09", help="Last day, YYYY-MM-DD")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS, help="Days per query window")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent windows")
+    parser.add_argument("--rate", type=float, default=API_RATE, help="API requests per second (all workers)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="Progress file; re-run to resume")
+    parser.add_argument("-o", "--output", default=CSV_FILE, help="CSV to append videos to")
+    parser.add_argument("--store", help="Write to this Parquet store directory instead of the CSV")
+    parser.add_argument("--token-url", default=TOKEN_URL)
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_FILE, help="Where the access token is cached between runs")
+    parser.add_argument("--query-url", default=VIDEO_QUERY_URL)
+    args = parser.parse_args()
+
+    usernames = [u for u in (args.usernames or USERNAMES) if u]
+    if not usernames:
+        print("Error: No usernames given.", file=sys.stderr)
+        return 1
+
+    start_date = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end_date = datetime.strptime(args.end, "%Y-%m-%d").date()
+
+    session = get_shared_session()
+    session.scheduler.set_rate(host_of(args.query_url), args.rate)
+
+    checkpoint = HarvestCheckpoint(args.checkpoint)
+    checkpoint.plan(usernames, split_windows(start_date, end_date, args.window_days))
+
+    started = time.perf_counter()
+    tokens = get_token_manager(session=session, token_url=args.token_url, cache_file=args.token_cache).start()
+    harvester = TikTokHarvester(checkpoint, tokens, output=args.output, workers=args.workers,
+                                query_url=args.query_url, session=session,
+                                min_window_days=min(args.window_days, WINDOW_DAYS),
+                                store=TranscriptStore(args.store) if args.store else None)
+    complete = harvester.run()
+    elapsed = time.perf_counter() - started
+    tokens.stop()
+
+    summary = checkpoint.summary()
+    checkpoint.close()
+    print(f"{summary['videos']} videos in {summary['pages']} pages, {summary['windows_done']} windows done, "
+          f"{summary['windows_pending']} pending ({elapsed:.1f}s)")
+    if not complete:
+        print("Some windows failed; re-run with the same --checkpoint to resume.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
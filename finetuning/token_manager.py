@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import threading
+import time
+
+# ============================================================
+# OAuth client-credentials token cache with proactive refresh
+# ------------------------------------------------------------
+#   - Caches the token with its expiry (from expires_in)
+#   - Persists it to a small JSON file, so a short run reuses the
+#     previous run's token instead of paying a token round trip
+#   - Refreshes it before it expires: from a background thread
+#     (start()), or lazily from get() once inside the refresh
+#     margin, while the current token is still handed out
+#   - Only one refresh is ever in flight: concurrent workers that
+#     find the token missing or expired wait for that one refresh
+#     instead of each requesting their own (no thundering herd)
+#
+# Usage:
+#   tokens = TokenManager(lambda: request_access_token(), cache_file=".tiktok_token.json")
+#   tokens.start()              # optional background refresher
+#   headers = {"Authorization": f"Bearer {tokens.get()}"}
+#   tokens.invalidate(token)    # after a 401 with that token
+# ============================================================
+
+log = logging.getLogger(__name__)
+
+REFRESH_MARGIN = 300        # seconds before expiry to refresh
+DEFAULT_EXPIRES_IN = 7200   # used if the token response has no expires_in
+
+
+class TokenManager:
+    def __init__(self, fetch, cache_file=None, cache_key="default", refresh_margin=REFRESH_MARGIN,
+                 clock=time.time):
+        # fetch() returns the token endpoint's JSON: access_token, expires_in
+        self._fetch = fetch
+        self.cache_file = cache_file
+        self.cache_key = cache_key
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self.refreshes = 0
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        # Held for the duration of a refresh: the single-flight guard
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._load()
+
+    # ---- public API ----
+
+    def get(self):
+        # Returns a valid token, refreshing first only if there is none
+        token, expires_at, refresh_at = self._token, self._expires_at, self._refresh_at
+        now = self.clock()
+        if token and now < refresh_at:
+            return token
+        if token and now < expires_at:
+            # Still valid: hand it out and refresh in the background
+            self._refresh_in_background()
+            return token
+        return self._refresh_now(stale=token)
+
+    def invalidate(self, token):
+        # Call after the API rejects `token` (401). Refreshes once, however
+        # many workers report the same token, and returns the new token.
+        return self._refresh_now(stale=token, force=True)
+
+    def start(self):
+        # Background thread that refreshes each token at its refresh time
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---- refreshing ----
+
+    def _refresh_now(self, stale=None, force=False):
+        with self._refresh_lock:
+            # Someone else refreshed while we waited for the lock
+            if self._token and self._token != stale and self.clock() < self._expires_at:
+                return self._token
+            if force or not self._token or self.clock() >= self._refresh_at:
+                self._refresh()
+            return self._token
+
+    def _refresh_in_background(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # a refresh is already running
+
+        def refresh():
+            try:
+                if self.clock() >= self._refresh_at:
+                    self._refresh()
+            except Exception as e:
+                # The current token is still valid; get() retries later
+                log.warning("Background token refresh failed: %s", e)
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self._refresh_at - self.clock() if self._token else 0
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            try:
+                self._refresh_now(stale=self._token)
+            except Exception as e:
+                log.warning("Background token refresh failed: %s", e)
+                self._stop.wait(5)
+
+    def _refresh(self):
+        # Caller holds _refresh_lock
+        body = self._fetch()
+        expires_in = float(body.get("expires_in") or DEFAULT_EXPIRES_IN)
+        now = self.clock()
+        # Never wait past half the lifetime, so short-lived tokens refresh in time too
+        margin = min(self.refresh_margin, expires_in / 2)
+        self._token = body["access_token"]
+        self._expires_at = now + expires_in
+        self._refresh_at = self._expires_at - margin
+        self.refreshes += 1
+        self._save()
+
+    # ---- persistence ----
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                entry = json.load(f).get(self.cache_key)
+        except (OSError, ValueError):
+            return
+        if entry and self.clock() < entry["expires_at"]:
+            self._token = entry["access_token"]
+            self._expires_at = entry["expires_at"]
+            self._refresh_at = entry["refresh_at"]
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        entries[self.cache_key] = {
+            "access_token": self._token,
+            "expires_at": self._expires_at,
+            "refresh_at": self._refresh_at,
+        }
+        # Write-then-rename so a crash never leaves a half-written file;
+        # owner-only permissions since the file holds a credential
+        tmp = f"{self.cache_file}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.cache_file)
@@ -1,7 +1,7 @@
 import torch
 import json
 import os
-from datasets import load_dataset
+from datasets import Dataset, load_dataset
 from transformers import (
     AutoModelForCausalLM,
     AutoTokenizer,
@@ -12,6 +12,11 @@ from transformers import (
 from peft import LoraConfig, prepare_model_for_kbit_training
 from trl import SFTTrainer
 
+from curate_transcripts import (MIN_ASCII_RATIO, MIN_STOPWORD_RATIO, MIN_WORDS, NEAR_DUP_THRESHOLD, curate,
+                                format_report)
+from dataset_cache import CACHE_DIR, cache_key, data_files, load_or_build, prepare_splits
+from packing import LengthBucketMixin, PackedCollator, PaddedCollator
+
 logging.set_verbosity_warning()
 
 # ----------------------------
@@ -27,6 +32,8 @@ MODEL_PATH = "meta-llama/Llama-3.1-8B-Instruct" # can also use meta-llama 3 7b i
 
 # Ensure this file is in the same directory as the script
 DATA_PATH = "./data/reddit_transcripts.csv" # or you can copy the path
+# Or point DATA_PATH at a Parquet transcript store directory (see transcript_store.py),
+# e.g. DATA_PATH = "./transcripts" -- its files are memory-mapped, no CSV parsing
 OUTPUT_DIR = "/opt/ml/model" # automatic path created by sagemaker
 
 # QLoRA Parameters
@@ -36,11 +43,31 @@ LORA_DROPOUT = 0.1
 
 # Training Parameters
 MAX_LENGTH = 512
-BATCH_SIZE = 1           # Small batch size for QLoRA memory efficiency
-GRAD_ACCUM = 8           # Accumulate gradients over 8 steps for an effective batch size of 8
+# How examples are batched (see packing.py):
+#   "packed":   scripts concatenated into MAX_LENGTH rows, no attention across them
+#   "bucketed": batches of similar-length scripts, padded per batch
+#   "padded":   one script per step
+BATCHING = "packed"
+BATCH_SIZE = 8 if BATCHING == "bucketed" else 1   # Small batch size for QLoRA memory efficiency
+GRAD_ACCUM = 1 if BATCHING == "bucketed" else 8   # Effective batch of 8 rows (packed: 8 full rows)
 EPOCHS = 3               # Run for 3 full epochs on the small dataset
 LEARNING_RATE = 2e-4     # Standard QLoRA learning rate
 
+SEED = 42                # train/eval split and packing order
+TEST_SIZE = 0.1          # share of the examples held out for evaluation
+
+# Curation (see curate_transcripts.py)
+CURATE = True
+TOP_K = None             # e.g. 5000 to train only on the most viewed transcripts
+# Passed to curate(); every one of them is also part of the tokenized dataset cache key
+CURATE_SETTINGS = {
+    "min_words": MIN_WORDS,
+    "near_dup_threshold": NEAR_DUP_THRESHOLD,
+    "english_only": True,
+    "top_k": TOP_K,
+    "top_by": ["view_count", "like_count"],
+}
+
 # ----------------------------
 # 4-bit Quantization Configuration (QLoRA)
 # ----------------------------
@@ -53,6 +80,9 @@ bnb_config = BitsAndBytesConfig(
 
 # format data 
 
+# Bump when the template in formatting_function changes: invalidates the tokenized cache
+TEMPLATE_VERSION = 1
+
 def formatting_function(examples):
     """
     Formats the raw 'tiktok_script' into the Llama-3.1 instruction template.
@@ -105,20 +135,68 @@ peft_config = LoraConfig(
 
 # Data Loading and Preprocessing
 
-print(f"Loading and formatting dataset: {DATA_PATH}...")
-
-# Load the local JSON file (assuming it contains a list of objects with 'tiktok_script')
-raw_dataset = load_dataset("json", data_files=DATA_PATH, split="train") 
-
-# Split the small dataset into train/test
-dataset = raw_dataset.train_test_split(test_size=0.1) 
-train_dataset = dataset["train"]
-eval_dataset = dataset["test"]
-
-# Apply the formatting function to prepare the data for training
-# This creates the new 'text' column that SFTTrainer uses
-train_dataset = train_dataset.map(formatting_function, batched=True, remove_columns=list(raw_dataset.column_names))
-eval_dataset = eval_dataset.map(formatting_function, batched=True, remove_columns=list(raw_dataset.column_names))
+def load_raw_dataset():
+    print(f"Loading dataset: {DATA_PATH}...")
+    if os.path.isdir(DATA_PATH):
+        # Parquet transcript store: <DATA_PATH>/<username>/<YYYY-MM>.parquet
+        raw_dataset = load_dataset("parquet", data_files=data_files(DATA_PATH), split="train")
+        raw_dataset = raw_dataset.filter(lambda batch: [t is not None for t in batch["transcript"]], batched=True)
+        raw_dataset = raw_dataset.rename_column("transcript", "tiktok_script")
+    else:
+        # Load the local JSON file (assuming it contains a list of objects with 'tiktok_script')
+        raw_dataset = load_dataset("json", data_files=DATA_PATH, split="train") 
+
+    if CURATE:
+        # Drop empty, too short, non-English, duplicate and over-length transcripts before
+        # they cost training steps. Length is measured against what is left of MAX_LENGTH
+        # once the chat template is added.
+        template_tokens = len(tokenizer(formatting_function({"tiktok_script": [""]})["text"][0],
+                                        add_special_tokens=False)["input_ids"])
+        curated, report = curate(
+            raw_dataset.with_format("arrow")[:],  # (respects the filter above, unlike .data)
+            column="tiktok_script",
+            max_tokens=MAX_LENGTH - template_tokens,
+            tokenizer=tokenizer,
+            **CURATE_SETTINGS,
+        )
+        print(format_report(report))
+        raw_dataset = Dataset(curated)
+    return raw_dataset
+
+
+def build_splits():
+    # Split into train/test, apply formatting_function (the chat template) and tokenize;
+    # labels cover the assistant turn only. Packed mode concatenates examples into rows.
+    return prepare_splits(load_raw_dataset(), formatting_function, tokenizer, MAX_LENGTH,
+                          batching=BATCHING, test_size=TEST_SIZE, seed=SEED)
+
+
+# Tokenized splits are cached (memory-mapped Arrow, see dataset_cache.py): later runs with
+# the same data, tokenizer, template and settings skip all of the above. The settings are
+# every argument of the curate() and prepare_splits() calls, plus the English-detection
+# thresholds curate_transcripts.py reads as module constants
+key = cache_key(
+    data_files=data_files(DATA_PATH), tokenizer=tokenizer, template_version=TEMPLATE_VERSION,
+    max_length=MAX_LENGTH, batching=BATCHING, test_size=TEST_SIZE, seed=SEED,
+    curate=CURATE,
+    curation=dict(CURATE_SETTINGS, min_ascii_ratio=MIN_ASCII_RATIO, min_stopword_ratio=MIN_STOPWORD_RATIO)
+    if CURATE else None,
+)
+splits = load_or_build(CACHE_DIR, key, build_splits)
+train_dataset = splits["train"]
+eval_dataset = splits["eval"]
+
+trainer_class = SFTTrainer
+if BATCHING == "packed":
+    data_collator = PackedCollator(tokenizer.pad_token_id)
+else:
+    data_collator = PaddedCollator(tokenizer.pad_token_id)
+if BATCHING == "bucketed":
+    class BucketedSFTTrainer(LengthBucketMixin, SFTTrainer):
+        pass
+
+    trainer_class = BucketedSFTTrainer
+print(f"{BATCHING}: {len(train_dataset)} training rows")
 
 #training arguments 
 training_args = TrainingArguments(
@@ -135,7 +213,10 @@ training_args = TrainingArguments(
     optim="paged_adamw_8bit", # Optimizer optimized for QLoRA
     warmup_ratio=0.03,
     bf16=True, # Use bfloat16 for fast and stable training
-    group_by_length=False, 
+    group_by_length=False, # bucketing is BATCHING = "bucketed" instead
+    # Keep every column for the collators in packing.py: SFTTrainer's default column
+    # filter would drop position_ids, which PackedCollator needs
+    remove_unused_columns=False,
     lr_scheduler_type="constant",
     report_to="none" 
 )
@@ -143,12 +224,13 @@ training_args = TrainingArguments(
 # initialize qlora 
 
 print("Initializing SFT Trainer...")
-trainer = SFTTrainer(
+trainer = trainer_class(
     model=model,
     train_dataset=train_dataset,
     eval_dataset=eval_dataset,
     peft_config=peft_config,
     args=training_args, 
+    data_collator=data_collator,
 )
 
 # begin fine-tuning
@@ -0,0 +1,225 @@
+import argparse
+import csv
+import os
+import threading
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# ============================================================
+# Columnar Parquet store for harvested videos + transcripts
+# ------------------------------------------------------------
+# Replaces the append-only CSV:
+#   - Rows are buffered and written in batches as zstd-compressed
+#     Parquet with typed columns (like_count/view_count are int64)
+#   - Partitioned by username and month of create_time:
+#       <root>/<username>/<YYYY-MM>.parquet
+#     (monthly rather than daily files: most accounts post a few
+#     videos a day, and daily files would be tiny)
+#   - Upserts on video id: a flush rewrites only the partitions it
+#     touches, replacing rows whose id is already stored (in any of
+#     the account's partitions, via an id -> month index), so re-runs
+#     never duplicate videos
+#   - train.py (via datasets) and load_table() memory-map the files
+#     directly, no CSV parsing
+#
+# Usage:
+#   store = TranscriptStore("transcripts")
+#   store.upsert(videos)      # raw Research API video dicts
+#   store.flush()
+#   python transcript_store.py import tiktok_user_videos_and_transcripts3.csv --root transcripts
+# ============================================================
+
+STORE_DIR = "transcripts"
+BATCH_ROWS = 5000            # buffered rows before an automatic flush
+COMPRESSION = "zstd"
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("username", pa.string()),
+    ("caption", pa.string()),
+    ("like_count", pa.int64()),
+    ("view_count", pa.int64()),
+    ("transcript", pa.string()),
+    ("create_time", pa.timestamp("s", tz="UTC")),
+])
+
+
+def _to_int(value):
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def video_row(video):
+    # ------------------------------------------------------------
+    # Maps a Research API video (or a row from the old CSV) onto
+    # the store's columns, same names as the CSV.
+    # ------------------------------------------------------------
+    created = video.get("create_time")
+    if isinstance(created, (int, float)) or (isinstance(created, str) and created.isdigit()):
+        created = datetime.fromtimestamp(int(created), tz=timezone.utc)
+    elif not isinstance(created, datetime):
+        created = None
+    return {
+        "id": str(video.get("id")),
+        "username": video.get("username") or "",
+        "caption": video.get("video_description") or video.get("description") or video.get("caption"),
+        "like_count": _to_int(video.get("like_count")),
+        "view_count": _to_int(video.get("view_count")),
+        "transcript": video.get("voice_to_text") or video.get("transcript"),
+        "create_time": created,
+    }
+
+
+def partition_of(row):
+    month = row["create_time"].strftime("%Y-%m") if row["create_time"] else "undated"
+    # Usernames are [A-Za-z0-9._]; anything else can't escape the root
+    username = "".join(c for c in row["username"] if c.isalnum() or c in "._") or "_unknown"
+    return username, month
+
+
+class TranscriptStore:
+    def __init__(self, root=STORE_DIR, batch_rows=BATCH_ROWS):
+        self.root = root
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        self._buffer = {}            # id -> row (last write wins within a batch)
+        self._index = {}             # username -> {id: month partition}
+        self.stats = {"upserted": 0, "replaced": 0, "files_written": 0}
+
+    def upsert(self, videos):
+        rows = [video_row(v) for v in videos]
+        with self._lock:
+            for row in rows:
+                self._buffer[row["id"]] = row
+            if len(self._buffer) >= self.batch_rows:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _flush(self):
+        # Caller holds the lock
+        if not self._buffer:
+            return
+        by_user = {}
+        for row in self._buffer.values():
+            username, month = partition_of(row)
+            by_user.setdefault(username, {}).setdefault(month, []).append(row)
+        self._buffer = {}
+
+        for username, months in by_user.items():
+            index = self._id_index(username)
+            incoming = [row["id"] for rows in months.values() for row in rows]
+            # Rewrite the target months and every month already holding one
+            # of these ids, so a video whose create_time changed (or was
+            # missing before) moves instead of being stored twice
+            touched = set(months) | {index[i] for i in incoming if i in index}
+            incoming_ids = pa.array(incoming, type=pa.string())
+            for month in sorted(touched):
+                path = os.path.join(self.root, username, f"{month}.parquet")
+                rows = months.get(month, [])
+                new = pa.Table.from_pylist(rows, schema=SCHEMA)
+                if os.path.exists(path):
+                    existing = pq.read_table(path, schema=SCHEMA)
+                    keep = pc.invert(pc.is_in(existing["id"], value_set=incoming_ids))
+                    self.stats["replaced"] += existing.num_rows - pc.sum(keep.cast(pa.int64())).as_py()
+                    new = pa.concat_tables([existing.filter(keep), new])
+                if new.num_rows == 0:
+                    os.remove(path)
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write-then-rename so readers never see a half-written file
+                tmp = f"{path}.tmp"
+                pq.write_table(new, tmp, compression=COMPRESSION)
+                os.replace(tmp, path)
+                self.stats["files_written"] += 1
+            for month, rows in months.items():
+                index.update((row["id"], month) for row in rows)
+                self.stats["upserted"] += len(rows)
+
+    def _id_index(self, username):
+        # id -> month partition for one account, read from its files'
+        # id column the first time the account is flushed
+        if username not in self._index:
+            index = {}
+            directory = os.path.join(self.root, username)
+            if os.path.isdir(directory):
+                for name in sorted(os.listdir(directory)):
+                    if name.endswith(".parquet"):
+                        ids = pq.read_table(os.path.join(directory, name), columns=["id"])["id"]
+                        index.update((i, name[:-len(".parquet")]) for i in ids.to_pylist())
+            self._index[username] = index
+        return self._index[username]
+
+
+def parquet_files(root=STORE_DIR):
+    return sorted(
+        os.path.join(directory, name)
+        for directory, _, names in os.walk(root)
+        for name in names
+        if name.endswith(".parquet")
+    )
+
+
+def load_table(root=STORE_DIR, columns=None):
+    # ------------------------------------------------------------
+    # Reads the whole store as one Arrow table (memory-mapped).
+    # For training, datasets can load the same files directly:
+    #   load_dataset("parquet", data_files=parquet_files(root))
+    # ------------------------------------------------------------
+    files = parquet_files(root)
+    if not files:
+        return SCHEMA.empty_table() if columns is None else SCHEMA.empty_table().select(columns)
+    tables = [pq.read_table(path, columns=columns, memory_map=True) for path in files]
+    return pa.concat_tables(tables)
+
+
+def import_csv(path, store):
+    # Loads the old CSV output into the store (duplicate ids collapse)
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            store.upsert([row])
+    store.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet store for harvested TikTok transcripts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Import a CSV written by save_to_csv")
+    imp.add_argument("csv")
+    imp.add_argument("--root", default=STORE_DIR)
+    info = sub.add_parser("info", help="Show row and file counts")
+    info.add_argument("--root", default=STORE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        with TranscriptStore(args.root) as store:
+            import_csv(args.csv, store)
+        print(f"Imported {store.stats['upserted']} rows into {args.root} ({store.stats['replaced']} duplicates replaced)")
+    else:
+        files = parquet_files(args.root)
+        table = load_table(args.root, columns=["id", "username"])
+        size = sum(os.path.getsize(path) for path in files)
+        print(f"{table.num_rows} videos from {len(pc.unique(table['username']))} accounts "
+              f"in {len(files)} files ({size / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
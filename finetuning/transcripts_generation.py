@@ -1,8 +1,19 @@
 import requests
 import csv
-import time
+import logging
+import os
+import sys
 from datetime import datetime, timedelta, date
 
+# Shared pooled HTTP session lives next to the article scraper
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scraping"))
+from http_session import get_shared_session
+from politeness import get_shared_scheduler, polite_request
+from telemetry import METRICS, configure_logging
+from token_manager import TokenManager
+
+log = logging.getLogger(__name__)
+
 # ============================================================
 # TikTok Video Transcript Scraper for Preselected Accounts
 # ------------------------------------------------------------
@@ -23,15 +34,20 @@ CLIENT_SECRET = "Gvbz9rvgTzVKDR8wbKalrLkVcQI3xgHP"
 # Token endpoint (note the trailing slash)
 TOKEN_URL = "https://open.tiktokapis.com/v2/oauth/token/"
 
+# Access tokens are cached here between runs (see token_manager.py)
+TOKEN_CACHE_FILE = ".tiktok_token.json"
+
 # Ask TikTok for these fields for each video
 # voice_to_text = TikTok's own transcript field (when available)
+# create_time = upload time (unix seconds), used to partition the Parquet store
 VIDEO_FIELDS = (
-    "id,username,video_description,like_count,view_count,voice_to_text"
+    "id,username,video_description,like_count,view_count,voice_to_text,create_time"
 )
 
 VIDEO_QUERY_URL = (
     f"https://open.tiktokapis.com/v2/research/video/query/?fields={VIDEO_FIELDS}"
 )
+TIKTOK_API_HOST = "open.tiktokapis.com"
 
 # === List of TikTok usernames to scrape transcripts from ===
 # These are creators posting Reddit-style gameplay/story videos
@@ -46,14 +62,41 @@ USERNAMES = [""]
 CSV_FILE = "tiktok_user_videos_and_transcripts3.csv"
 
 MAX_RESULTS_PER_QUERY = 100   # up to 100 allowed
-DELAY_BETWEEN_QUERIES = 2    # seconds
+DELAY_BETWEEN_QUERIES = 2    # seconds; paces the API host's token bucket (see politeness.py)
+
+# One request per DELAY_BETWEEN_QUERIES to the API host by default
+get_shared_scheduler().set_rate(TIKTOK_API_HOST, 1 / DELAY_BETWEEN_QUERIES)
+
+
+def api_post(session, url, **kwargs):
+    # ------------------------------------------------------------
+    # POST through the session's politeness scheduler: requests are
+    # paced per host, and 429/5xx responses are retried after
+    # Retry-After or a jittered backoff. Sessions without a
+    # scheduler just post directly.
+    # ------------------------------------------------------------
+    scheduler = getattr(session, "scheduler", None)
+    if scheduler is None:
+        return session.post(url, **kwargs)
+    return polite_request(session, scheduler, "POST", url, **kwargs)
 
 
-def get_access_token():
+def get_access_token(session=None, token_url=TOKEN_URL):
     # ------------------------------------------------------------
     # Request an OAuth "client_credentials" access token.
     # This token is needed for all subsequent API requests.
+    # Uses the shared keep-alive session unless one is passed in.
+    # (get_token_manager() caches and refreshes it instead.)
+    # ------------------------------------------------------------
+    return request_access_token(session=session, token_url=token_url)["access_token"]
+
+
+def request_access_token(session=None, token_url=TOKEN_URL):
+    # ------------------------------------------------------------
+    # Sends the client_credentials token request and returns the
+    # whole response body: access_token, expires_in, token_type.
     # ------------------------------------------------------------
+    session = session or get_shared_session()
 
     data = {
         "client_key": CLIENT_KEY,
@@ -64,22 +107,34 @@ def get_access_token():
         "Content-Type": "application/x-www-form-urlencoded",
     }
 
-    resp = requests.post(TOKEN_URL, headers=headers, data=data)
+    resp = api_post(session, token_url, headers=headers, data=data)
 
     try:
         resp.raise_for_status()
     except requests.HTTPError:
-        # Prints error details if authentication fails
-        print("Error getting token:", resp.status_code)
-        print("Response body:", resp.text)
+        # Logs error details if authentication fails
+        log.error("Error getting token: %s", resp.status_code, extra={"body": resp.text})
         raise
 
-    token = resp.json()["access_token"]
-    print("Access token obtained.")
-    return token
+    body = resp.json()
+    log.info("Access token obtained")
+    return body
 
 
-def query_videos_by_username(token, username, max_count=MAX_RESULTS_PER_QUERY):
+def get_token_manager(session=None, token_url=TOKEN_URL, cache_file=TOKEN_CACHE_FILE):
+    # ------------------------------------------------------------
+    # Token manager for long runs and concurrent workers: caches
+    # the token on disk between runs and refreshes it before it
+    # expires (see token_manager.py).
+    # ------------------------------------------------------------
+    return TokenManager(
+        lambda: request_access_token(session=session, token_url=token_url),
+        cache_file=cache_file,
+        cache_key=f"{CLIENT_KEY}@{token_url}",
+    )
+
+
+def query_videos_by_username(token, username, max_count=MAX_RESULTS_PER_QUERY, session=None):
     # ------------------------------------------------------------
     # Queries TikTok’s Research API for videos posted by a specific
     # username within a specific date range.
@@ -93,18 +148,38 @@ def query_videos_by_username(token, username, max_count=MAX_RESULTS_PER_QUERY):
     Query TikTok Research API for videos posted by a specific username,
     and request TikTok's voice_to_text transcript field.
     """
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
-
-    
     # Date window for filtering videos (adjustable)
     # These dates currently sample a 1-week range, due to common 500 errors
+    # (tiktok_harvester.py splits longer ranges into small windows instead)
 
     start_date = date(2025, 11, 1)
     end_date = date(2025, 11, 9)
 
+    payload = build_video_query(username, start_date, end_date, max_count)
+    resp = query_video_page(token, payload, session=session)
+
+    if resp.status_code != 200:
+        # Log any errors so we know which account failed
+        log.error("Failed for username '%s': %s", username, resp.status_code,
+                  extra={"username": username, "body": resp.text})
+        METRICS.inc("query_errors")
+        return []
+
+    data = resp.json()
+    # Extract list of videos (empty list if none found)
+    videos = data.get("data", {}).get("videos", [])
+    log.info("Retrieved %d videos for '%s'", len(videos), username, extra={"username": username})
+    METRICS.inc("videos_retrieved", len(videos))
+    return videos
+
+
+def build_video_query(username, start_date, end_date, max_count=MAX_RESULTS_PER_QUERY,
+                      cursor=None, search_id=None):
+    # ------------------------------------------------------------
+    # Builds the Research API video query body for one username
+    # and date window. cursor/search_id continue a paginated
+    # query where the previous page's response left off.
+    # ------------------------------------------------------------
     payload = {
         "query": {
             "and": [
@@ -127,23 +202,26 @@ def query_videos_by_username(token, username, max_count=MAX_RESULTS_PER_QUERY):
         "end_date": end_date.strftime("%Y%m%d"),
         "max_count": max_count,
     }
+    if cursor is not None:
+        payload["cursor"] = cursor
+    if search_id:
+        payload["search_id"] = search_id
+    return payload
 
-    resp = requests.post(VIDEO_QUERY_URL, headers=headers, json=payload)
-
-    if resp.status_code != 200:
-        # Print any errors so we know which account failed
-        print(f"Failed for username '{username}': {resp.status_code}")
-        try:
-            print("Response JSON:", resp.json())
-        except ValueError:
-            print("Response body:", resp.text)
-        return []
 
-    data = resp.json()
-    # Extract list of videos (empty list if none found)
-    videos = data.get("data", {}).get("videos", [])
-    print(f"Retrieved {len(videos)} videos for '{username}'")
-    return videos
+def query_video_page(token, payload, session=None, query_url=VIDEO_QUERY_URL):
+    # ------------------------------------------------------------
+    # Sends one video query (one page of results) and returns the
+    # raw response. Pagination fields come back in
+    # response.json()["data"]: cursor, has_more, search_id.
+    # ------------------------------------------------------------
+    session = session or get_shared_session()
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
+    with METRICS.timer("video_query"):
+        return api_post(session, query_url, headers=headers, json=payload)
 
 
 def save_to_csv(videos, filename=CSV_FILE):
@@ -189,23 +267,27 @@ def save_to_csv(videos, filename=CSV_FILE):
 def main():
     # ------------------------------------------------------------
     # Main function:
-    #   1. Authenticate with TikTok API
+    #   1. Authenticate with TikTok API (cached token if still valid)
     #   2. Loop through each selected username
     #   3. Fetch their videos + transcripts
     #   4. Save all data to CSV
     # ------------------------------------------------------------
-    token = get_access_token()
+    configure_logging("INFO", fmt="text")
+    tokens = get_token_manager()
 
     for username in USERNAMES:
-        videos = query_videos_by_username(token, username)
+        videos = query_videos_by_username(tokens.get(), username)
         if videos:
             save_to_csv(videos)
-        # Delay helps prevent hitting TikTok API rate limits
-        time.sleep(DELAY_BETWEEN_QUERIES)
-        
+        # No fixed sleep: api_post paces requests to the API host
 
     print(f"Captions + transcripts saved to {CSV_FILE}")
 
+    # Every query after the first should reuse the token request's connection
+    stats = get_shared_session().stats.snapshot()
+    print(f"HTTP requests: {stats['requests']}, connections opened: {stats['connections']}, "
+          f"reused: {stats['reused']}")
+
 
 if __name__ == "__main__":
     # Call main
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Batch mode for ArticleScraper.
+
+Takes a list of article URLs (from a file or the command line) and scrapes
+them concurrently on a bounded thread pool. Concurrency is limited both
+globally (max requests in flight) and per host, so one slow or strict
+publisher can't hog every worker. Results are streamed out as JSONL, one
+line per article, in the order they finish.
+
+With --extract-workers, the fetch threads only download HTML and the
+CPU-bound extraction runs on a process pool (see extraction_pool.py).
+
+Usage:
+python batch_scraper.py urls.txt -o scraped_articles.jsonl --max-in-flight 32 --per-host 4
+python batch_scraper.py urls.txt --extract-workers 8
+python batch_scraper.py urls.txt --cache-dir .scrape_cache --cache-only
+python batch_scraper.py urls.txt --index crawl_index.sqlite3 --recheck-after 86400
+python batch_scraper.py urls.txt --probe-images
+python batch_scraper.py urls.txt --max-age-days 2
+
+With --index, URLs already in the crawl index are skipped and re-fetched
+articles whose content hasn't changed are left out of the output, so only
+new or changed articles flow downstream (see crawl_index.py).
+
+With --dedup, near-duplicate articles (the same wire story on several
+sites) are clustered and only the first of each cluster is written, so the
+generation step sees each story once (see dedup.py).
+
+Requests are paced per host (--rate, --host-rate) with Retry-After and
+jittered backoff on 429/5xx; a throttled host's URLs wait while other
+hosts keep going (see politeness.py).
+
+With --probe-images, each written article's candidate images are probed
+for their real size (a few KB each, concurrently) and additional_images
+becomes the largest usable ones (see image_probe.py).
+
+With --max-age-days, each page's <head> is scanned as it streams in and
+articles published longer ago are dropped before their body is downloaded
+or parsed (see head_metadata.py).
+"""
+
+import argparse
+import functools
+import json
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+from urllib.parse import urlparse
+
+from crawl_index import DEFAULT_INDEX_PATH, CrawlIndex
+from dedup import DEFAULT_THRESHOLD, Deduplicator, drop_near_duplicates
+from extraction_pool import ExtractionPool
+from head_metadata import max_age_filter
+from http_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, HttpCache
+from http_session import PooledSession
+from image_probe import DEFAULT_PROBE_WORKERS, ImageProber
+from politeness import DEFAULT_MAX_RETRIES, DEFAULT_RATE, RETRYABLE_STATUSES, HostScheduler, host_of
+from python_scraper import MAX_ADDITIONAL_IMAGES, MAX_IMAGE_CANDIDATES, ArticleScraper
+from telemetry import DEFAULT_LOG_LEVEL, METRICS, configure_logging
+
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_PER_HOST = 4
+
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """Returns the non-empty, non-comment URLs from an iterable of lines."""
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+
+def scrape_one(url: str, timeout: int = 15, session: Optional[PooledSession] = None,
+               cache: Optional[HttpCache] = None, max_images: int = MAX_ADDITIONAL_IMAGES,
+               head_filter: Optional[Callable[[Dict[str, Optional[str]]], Optional[str]]] = None) -> Dict[str, Any]:
+    """Scrapes a single URL and returns a JSON-serializable record."""
+    started = time.perf_counter()
+    scraper = ArticleScraper(url, timeout=timeout, session=session, cache=cache, max_images=max_images,
+                             head_filter=head_filter)
+    try:
+        result = scraper.fetch_article()
+        record = {'url': url, 'ok': True}
+        record.update(result.to_dict())
+    except Exception as e:
+        record = {'url': url, 'ok': False, 'error': str(e), 'status': scraper.status_code}
+    record['elapsed'] = round(time.perf_counter() - started, 4)
+    return record
+
+
+def fetch_one(url: str, timeout: int = 15, session: Optional[PooledSession] = None,
+              cache: Optional[HttpCache] = None,
+              head_filter: Optional[Callable[[Dict[str, Optional[str]]], Optional[str]]] = None) -> Dict[str, Any]:
+    """Fetches a single URL's HTML only, leaving extraction to an ExtractionPool."""
+    started = time.perf_counter()
+    scraper = ArticleScraper(url, timeout=timeout, session=session, cache=cache, head_filter=head_filter)
+    try:
+        html = scraper.fetch_html()
+        record = {'url': url, 'ok': True, 'html': html}
+    except Exception as e:
+        record = {'url': url, 'ok': False, 'error': str(e), 'status': scraper.status_code}
+    record['elapsed'] = round(time.perf_counter() - started, 4)
+    return record
+
+
+class BatchScraper:
+    """
+    Scrapes many URLs concurrently with a global and a per-host cap.
+
+    URLs are queued per host and only dispatched to the pool when both the
+    global in-flight count and that host's in-flight count have room. Workers
+    never sit blocked waiting on a busy host, so a slow site only delays its
+    own URLs and the rest of the batch keeps moving.
+
+    With a HostScheduler, a host is also skipped while its token bucket is
+    empty or it is backing off after a 429/5xx, and URLs that failed with a
+    retryable status are queued again (up to max_retries) for when the host
+    is ready. Other hosts' URLs are dispatched in the meantime.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        per_host: int = DEFAULT_PER_HOST,
+        timeout: int = 15,
+        scrape_fn: Optional[Callable[..., Dict[str, Any]]] = None,
+        cache: Optional[HttpCache] = None,
+        scheduler: Optional[HostScheduler] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        if max_in_flight < 1 or per_host < 1:
+            raise ValueError("max_in_flight and per_host must both be at least 1.")
+        self.max_in_flight = max_in_flight
+        self.per_host = per_host
+        self.timeout = timeout
+        self.scrape_fn = scrape_fn or scrape_one
+        # One keep-alive connection per allowed in-flight request to a host
+        self.session = PooledSession(pool_maxsize=per_host, scheduler=scheduler)
+        self.cache = cache
+        self.scheduler = scheduler
+        self.max_retries = max_retries
+        self.retries = 0
+
+    def run(self, urls: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Scrapes every URL and yields one record per URL as soon as it finishes.
+
+        Records are yielded in completion order, not input order.
+        """
+        # Host -> queue of pending URLs; OrderedDict keeps hosts round-robin fair
+        pending: "OrderedDict[str, deque]" = OrderedDict()
+        for url in urls:
+            pending.setdefault(host_of(url), deque()).append(url)
+
+        host_in_flight: Dict[str, int] = {}
+        attempts: Dict[str, int] = {}
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            while pending or futures:
+                # Seconds until the next throttled host may go again (None if none are waiting)
+                next_ready = self._dispatch(pool, pending, host_in_flight, futures)
+                if not futures:
+                    time.sleep(next_ready or 0)
+                    continue
+
+                done, _ = wait(futures, timeout=next_ready, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, url = futures.pop(future)
+                    host_in_flight[host] -= 1
+                    record = future.result()
+                    if self._should_retry(record, attempts):
+                        # Back at the front of its host's queue; the scheduler
+                        # holds the host until its backoff has passed
+                        pending.setdefault(host, deque()).appendleft(url)
+                        self.retries += 1
+                        continue
+                    yield record
+
+    def _should_retry(self, record: Dict[str, Any], attempts: Dict[str, int]) -> bool:
+        if self.scheduler is None or record['ok'] or record.get('status') not in RETRYABLE_STATUSES:
+            return False
+        url = record['url']
+        attempts[url] = attempts.get(url, 0) + 1
+        return attempts[url] <= self.max_retries
+
+    def _dispatch(self, pool, pending, host_in_flight, futures) -> Optional[float]:
+        """
+        Submits queued URLs while the global and per-host caps (and the
+        scheduler) allow. Returns the shortest wait among hosts held back by
+        the scheduler, or None.
+        """
+        next_ready = None
+        for host in list(pending):
+            if len(futures) >= self.max_in_flight:
+                break
+            queue = pending[host]
+            while queue and host_in_flight.get(host, 0) < self.per_host and len(futures) < self.max_in_flight:
+                if self.scheduler is not None:
+                    wait_for = self.scheduler.try_acquire(host)
+                    if wait_for > 0:
+                        next_ready = wait_for if next_ready is None else min(next_ready, wait_for)
+                        break
+                url = queue.popleft()
+                futures[pool.submit(self.scrape_fn, url, self.timeout, self.session, self.cache)] = (host, url)
+                host_in_flight[host] = host_in_flight.get(host, 0) + 1
+            if not queue:
+                del pending[host]
+            else:
+                # Move this host to the back so the next dispatch starts elsewhere
+                pending.move_to_end(host)
+        return next_ready
+
+
+def only_changed(records: Iterable[Dict[str, Any]], index: CrawlIndex) -> Iterator[Dict[str, Any]]:
+    """
+    Records each successful result in the crawl index and yields only new or
+    changed articles. Failures pass through and are not indexed, so they are
+    retried on the next run.
+    """
+    for record in records:
+        if not record['ok']:
+            yield record
+        elif index.record(record) != 'unchanged':
+            yield record
+
+
+def write_jsonl(records: Iterable[Dict[str, Any]], out: TextIO) -> Dict[str, int]:
+    """Writes records to `out` as JSONL, flushing after each line. Returns counts."""
+    counts = {'ok': 0, 'failed': 0}
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        counts['ok' if record['ok'] else 'failed'] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape many article URLs concurrently into JSONL.")
+    parser.add_argument('inputs', nargs='*', help="URL list files ('-' for stdin) or URLs")
+    parser.add_argument('-o', '--output', default='scraped_articles.jsonl', help="JSONL output file ('-' for stdout)")
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help="Maximum requests in flight across all hosts")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help="Maximum requests in flight per host")
+    parser.add_argument('--timeout', type=int, default=15, help="Per-request timeout in seconds")
+    parser.add_argument('--extract-workers', type=int, default=0,
+                        help="Extract on this many processes (0 = extract on the fetch threads)")
+    parser.add_argument('--ordered', action='store_true',
+                        help="With --extract-workers, write results in fetch-completion order")
+    parser.add_argument('--cache-dir', help=f"Cache pages on disk here (e.g. {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL,
+                        help="Seconds before a cached page is revalidated")
+    parser.add_argument('--cache-max-mb', type=int, default=512, help="Cache size cap in MB (LRU eviction)")
+    parser.add_argument('--cache-only', action='store_true', help="Serve from the cache only, never fetch")
+    parser.add_argument('--index', nargs='?', const=DEFAULT_INDEX_PATH,
+                        help=f"Incremental mode: skip already-indexed URLs (default file: {DEFAULT_INDEX_PATH})")
+    parser.add_argument('--recheck-after', type=float,
+                        help="With --index, re-fetch indexed URLs last fetched more than this many seconds ago")
+    parser.add_argument('--compact-after', type=float,
+                        help="With --index, drop entries not fetched for this many seconds after the run")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help="Requests per second per host, with 429/5xx backoff and retries (0 = unpaced)")
+    parser.add_argument('--host-rate', action='append', default=[], metavar='HOST=RATE',
+                        help="Per-host override of --rate, e.g. www.nytimes.com=0.5 (repeatable)")
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Retries per URL after a 429/5xx response")
+    parser.add_argument('--dedup', action='store_true', help="Only write one article per near-duplicate cluster")
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated text similarity (Jaccard) at which two articles count as duplicates")
+    parser.add_argument('--probe-images', action='store_true',
+                        help="Probe candidate images for their real size and keep the largest usable ones")
+    parser.add_argument('--probe-workers', type=int, default=DEFAULT_PROBE_WORKERS,
+                        help="Image probes in flight (with --probe-images)")
+    parser.add_argument('--max-age-days', type=float,
+                        help="Drop articles published more than this many days ago, judged from <head> before the body is read")
+    parser.add_argument('--log-level', default=DEFAULT_LOG_LEVEL, help="DEBUG, INFO, WARNING or ERROR (JSON lines on stderr)")
+    parser.add_argument('--metrics-out', help="Write per-stage timers and counters here (.prom for Prometheus text, else JSON)")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    urls = []
+    for item in args.inputs or ['-']:
+        if item == '-':
+            urls.extend(read_urls(sys.stdin))
+        elif urlparse(item).scheme in ('http', 'https'):
+            urls.append(item)
+        else:
+            with open(item, encoding='utf-8') as f:
+                urls.extend(read_urls(f))
+
+    if not urls:
+        print("Error: No URLs provided.", file=sys.stderr)
+        return
+
+    index = None
+    if args.index is not None:
+        index = CrawlIndex(args.index)
+        submitted = len(urls)
+        urls = index.filter_unseen(urls, max_age=args.recheck_after)
+        print(f"Index: skipping {submitted - len(urls)} already-processed URLs, {len(urls)} to fetch",
+              file=sys.stderr)
+
+    cache = None
+    if args.cache_dir or args.cache_only:
+        cache = HttpCache(
+            args.cache_dir or DEFAULT_CACHE_DIR,
+            ttl=args.cache_ttl,
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+            offline=args.cache_only,
+        )
+
+    scheduler = None
+    if args.rate > 0:
+        host_rates = {}
+        for item in args.host_rate:
+            host, _, rate = item.partition('=')
+            host_rates[host] = float(rate)
+        scheduler = HostScheduler(default_rate=args.rate, host_rates=host_rates)
+
+    # With --probe-images, extraction keeps more candidates for the prober to rank
+    max_images = MAX_IMAGE_CANDIDATES if args.probe_images else MAX_ADDITIONAL_IMAGES
+    prober = ImageProber(workers=args.probe_workers) if args.probe_images else None
+    head_filter = max_age_filter(args.max_age_days) if args.max_age_days else None
+
+    scraper = BatchScraper(
+        max_in_flight=args.max_in_flight,
+        per_host=args.per_host,
+        timeout=args.timeout,
+        scrape_fn=(functools.partial(fetch_one, head_filter=head_filter) if args.extract_workers
+                   else functools.partial(scrape_one, max_images=max_images, head_filter=head_filter)),
+        cache=cache,
+        scheduler=scheduler,
+        max_retries=args.max_retries,
+    )
+    started = time.perf_counter()
+
+    dedup = Deduplicator(threshold=args.dedup_threshold) if args.dedup else None
+
+    def downstream(records):
+        if index is not None:
+            records = only_changed(records, index)
+        if dedup is not None:
+            records = drop_near_duplicates(records, dedup)
+        if prober is not None:
+            # After index and dedup, so dropped articles' images are never probed
+            records = prober.probe_records(records)
+        return records
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        if args.extract_workers:
+            with ExtractionPool(workers=args.extract_workers, ordered=args.ordered, max_images=max_images) as pool:
+                counts = write_jsonl(downstream(pool.map(scraper.run(urls))), out)
+        else:
+            counts = write_jsonl(downstream(scraper.run(urls)), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if index is not None:
+            index.flush()
+        if prober is not None:
+            prober.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Scraped {counts['ok']} articles ({counts['failed']} failed) in {elapsed:.1f}s "
+        f"({len(urls) / elapsed if elapsed else 0:.1f} URLs/s)",
+        file=sys.stderr,
+    )
+    if index is not None:
+        print(
+            f"Index: {index.counts['new']} new, {index.counts['changed']} changed, "
+            f"{index.counts['unchanged']} unchanged (not written)",
+            file=sys.stderr,
+        )
+        if args.compact_after is not None:
+            print(f"Index: compacted {index.compact(args.compact_after)} stale entries", file=sys.stderr)
+        index.close()
+    if dedup is not None:
+        dedup_stats = dedup.stats()
+        print(f"Dedup: {dedup_stats['clusters']} clusters, {dedup_stats['duplicates']} near-duplicates not written",
+              file=sys.stderr)
+    stats = scraper.session.stats.snapshot()
+    print(
+        f"HTTP requests: {stats['requests']}, connections opened: {stats['connections']}, "
+        f"reuse ratio: {stats['reuse_ratio']:.0%}",
+        file=sys.stderr,
+    )
+    if scheduler is not None:
+        host_stats = scheduler.stats().values()
+        print(
+            f"Politeness: {sum(h['throttled'] for h in host_stats)} throttled (429), "
+            f"{sum(h['errors'] for h in host_stats)} server errors, {scraper.retries} retries",
+            file=sys.stderr,
+        )
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(
+            f"Cache: {cache_stats['hits']} hits ({cache_stats['revalidated']} revalidated), "
+            f"{cache_stats['misses']} misses, hit ratio {cache_stats['hit_ratio']:.0%}, "
+            f"{cache_stats['bytes_saved'] / 1024:.0f} KB not re-downloaded",
+            file=sys.stderr,
+        )
+        cache.close()
+    if prober is not None:
+        probe_stats = prober.stats()
+        print(f"Images: {probe_stats['probed']} probed, {probe_stats['cache_hits']} cache hits, "
+              f"{METRICS.snapshot()['counters'].get('image_probe_bytes', 0) / 1024:.0f} KB read",
+              file=sys.stderr)
+    if args.metrics_out:
+        METRICS.write(args.metrics_out)
+        print(f"Metrics: wrote per-stage timings to {args.metrics_out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
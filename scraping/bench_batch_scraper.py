@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batch_scraper.BatchScraper.
+
+Starts two local stand-in "publishers": a fast one and a slow one. Then it
+scrapes a mixed URL list at increasing global concurrency. Throughput should
+grow with concurrency, and the fast site's articles should not queue behind
+the slow site's.
+
+Usage:
+python bench_batch_scraper.py --urls 200 --fast-latency 0.05 --slow-latency 1.0
+"""
+
+import argparse
+import time
+
+from batch_scraper import BatchScraper
+from stand_in_server import StandInServer, article_page
+
+
+def run_once(urls, max_in_flight, per_host):
+    scraper = BatchScraper(max_in_flight=max_in_flight, per_host=per_host)
+    started = time.perf_counter()
+    finish_times = {}
+    failed = 0
+    for record in scraper.run(urls):
+        finish_times[record['url']] = time.perf_counter() - started
+        if not record['ok']:
+            failed += 1
+    return time.perf_counter() - started, finish_times, failed, scraper.session.stats.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent batch scraping against local servers.")
+    parser.add_argument('--urls', type=int, default=200, help="Total URLs to scrape per run")
+    parser.add_argument('--slow-share', type=float, default=0.1, help="Fraction of URLs on the slow host")
+    parser.add_argument('--fast-latency', type=float, default=0.05, help="Fast host latency (s)")
+    parser.add_argument('--slow-latency', type=float, default=1.0, help="Slow host latency (s)")
+    parser.add_argument('--per-host', type=int, default=16, help="Per-host concurrency cap")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 32, 64],
+                        help="Global in-flight caps to try")
+    args = parser.parse_args()
+
+    routes = {f'/article/{i}': article_page(f"Article {i}") for i in range(args.urls)}
+    with StandInServer(routes, latency=args.fast_latency) as fast, \
+            StandInServer(routes, latency=args.slow_latency) as slow:
+        slow_count = int(args.urls * args.slow_share)
+        urls = [slow.url(f'/article/{i}') for i in range(slow_count)]
+        urls += [fast.url(f'/article/{i}') for i in range(slow_count, args.urls)]
+        fast_urls = [u for u in urls if u.startswith(fast.url(''))]
+
+        print(f"{len(urls)} URLs ({slow_count} slow @ {args.slow_latency}s, "
+              f"{len(fast_urls)} fast @ {args.fast_latency}s), per-host cap {args.per_host}")
+        print(f"{'in-flight':>10} {'total s':>9} {'URLs/s':>8} {'fast done s':>12} {'failed':>7} {'conns':>6} {'reuse':>6}")
+        for max_in_flight in args.concurrency:
+            elapsed, finish_times, failed, stats = run_once(urls, max_in_flight, args.per_host)
+            fast_done = max(finish_times[u] for u in fast_urls) if fast_urls else 0.0
+            print(f"{max_in_flight:>10} {elapsed:>9.2f} {len(urls) / elapsed:>8.1f} {fast_done:>12.2f} {failed:>7} "
+                  f"{stats['connections']:>6} {stats['reuse_ratio']:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
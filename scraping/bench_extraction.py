@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for ArticleScraper extraction over an offline HTML corpus.
+
+Compares the old multi-parse path (BeautifulSoup + Readability on the raw
+string + two more BeautifulSoup parses of the summary) against the
+single-parse pipeline with each parser backend. Reports per-stage time,
+peak Python heap per page (tracemalloc) and peak RSS growth.
+
+Each mode runs in its own subprocess so peak RSS numbers don't bleed
+into each other. tracemalloc only sees Python-level allocations; lxml/libxml2
+memory shows up in the RSS column instead.
+
+Usage:
+python bench_extraction.py                      # synthetic corpus
+python bench_extraction.py --corpus fixtures/   # saved news pages
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict
+
+from bs4 import BeautifulSoup
+from readability import Document
+
+from html_corpus import get_corpus
+from python_scraper import ArticleScraper
+
+MODES = ['legacy', 'lxml', 'html.parser']
+STAGES = ['parse', 'metadata', 'readability', 'images']
+BENCH_URL = 'https://news.example.com/story'
+
+
+def legacy_extract(html: str) -> Dict[str, float]:
+    """The pre-pipeline fetch_article extraction path, timed per stage."""
+    timings = {}
+
+    started = time.perf_counter()
+    soup = BeautifulSoup(html, 'html.parser')
+    timings['parse'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    soup.find('meta', property='og:image')
+    (soup.find('meta', property='article:published_time') or
+     soup.find('meta', attrs={'name': 'date'}) or
+     soup.find('meta', attrs={'name': 'pubdate'}) or
+     soup.find('meta', attrs={'name': 'timestamp'}) or
+     soup.find('time', attrs={'datetime': True}))
+    (soup.find('meta', attrs={'name': 'author'}) or
+     soup.find('meta', property='article:author') or
+     soup.find('meta', attrs={'name': 'article:author'}) or
+     soup.find('meta', property='book:author'))
+    timings['metadata'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    doc = Document(html)
+    article_html = doc.summary()
+    BeautifulSoup(article_html, 'html.parser').get_text()
+    doc.title()
+    timings['readability'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    BeautifulSoup(article_html, 'html.parser').find_all('img')
+    timings['images'] = time.perf_counter() - started
+
+    return timings
+
+
+def extract_once(mode: str, html: str) -> Dict[str, float]:
+    if mode == 'legacy':
+        return legacy_extract(html)
+    scraper = ArticleScraper(BENCH_URL, parser=mode)
+    scraper.extract(html)
+    return scraper.stage_timings
+
+
+def run_worker(mode: str, corpus_dir: str, count: int) -> Dict:
+    """Runs one mode over the corpus and returns its measurements."""
+    pages = get_corpus(corpus_dir, count)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    times = {stage: 0.0 for stage in STAGES}
+    peak_heap = 0
+
+    # Timing pass (no tracemalloc overhead)
+    for _, html in pages:
+        for stage, seconds in extract_once(mode, html).items():
+            times[stage] += seconds
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Memory pass: worst-case peak Python heap while extracting one page
+    tracemalloc.start()
+    for _, html in pages:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        extract_once(mode, html)
+        peak_heap = max(peak_heap, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    total = sum(times.values())
+    return {
+        'mode': mode,
+        'pages': len(pages),
+        'seconds': {stage: round(t, 4) for stage, t in times.items()},
+        'total_seconds': round(total, 4),
+        'pages_per_second': round(len(pages) / total, 2) if total else 0.0,
+        'peak_python_heap_kb': round(peak_heap / 1024, 1),
+        'peak_rss_growth_kb': rss_after - rss_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-parse vs legacy article extraction.")
+    parser.add_argument('--corpus', help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument('--count', type=int, default=50, help="Synthetic corpus size")
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.corpus, args.count)))
+        return
+
+    results = []
+    for mode in args.modes:
+        cmd = [sys.executable, __file__, '--worker', mode, '--count', str(args.count)]
+        if args.corpus:
+            cmd += ['--corpus', args.corpus]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{results[0]['pages']} pages")
+    header = f"{'mode':<12}" + "".join(f"{stage + ' s':>14}" for stage in STAGES)
+    header += f"{'total s':>10}{'pages/s':>9}{'heap KB':>10}{'RSS+ KB':>10}"
+    print(header)
+    for r in results:
+        row = f"{r['mode']:<12}" + "".join(f"{r['seconds'].get(stage, 0):>14.3f}" for stage in STAGES)
+        row += (f"{r['total_seconds']:>10.3f}{r['pages_per_second']:>9.1f}"
+                f"{r['peak_python_heap_kb']:>10.1f}{r['peak_rss_growth_kb']:>10}")
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for extraction_pool.ExtractionPool.
+
+Runs extraction over an offline HTML corpus in-process (the old behaviour:
+extraction on the calling thread) and on process pools of 1/2/4/8 workers,
+reporting pages/s and speedup over the in-process baseline.
+
+Usage:
+python bench_extraction_pool.py                          # synthetic corpus
+python bench_extraction_pool.py --corpus fixtures/ --repeat 5
+"""
+
+import argparse
+import os
+import time
+
+from extraction_pool import ExtractionPool, extract_record
+from html_corpus import get_corpus
+
+BENCH_URL = 'https://news.example.com/story'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process-pool extraction scaling.")
+    parser.add_argument('--corpus', help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument('--count', type=int, default=50, help="Synthetic corpus size")
+    parser.add_argument('--repeat', type=int, default=4, help="Times to run through the corpus")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--ordered', action='store_true', help="Yield results in input order")
+    args = parser.parse_args()
+
+    pages = get_corpus(args.corpus, args.count)
+    records = [{'url': BENCH_URL, 'html': html} for _, html in pages] * args.repeat
+    print(f"{len(records)} pages, {os.cpu_count()} CPUs, ordered={args.ordered}")
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8} {'failed':>7}")
+
+    started = time.perf_counter()
+    failed = sum(not extract_record(r)['ok'] for r in records)
+    baseline = time.perf_counter() - started
+    print(f"{'inline':>8} {baseline:>9.2f} {len(records) / baseline:>9.1f} {1.0:>8.2f} {failed:>7}")
+
+    for workers in args.workers:
+        with ExtractionPool(workers=workers, ordered=args.ordered) as pool:
+            started = time.perf_counter()
+            failed = sum(not r['ok'] for r in pool.map(iter(records)))
+            elapsed = time.perf_counter() - started
+        print(f"{workers:>8} {elapsed:>9.2f} {len(records) / elapsed:>9.1f} {baseline / elapsed:>8.2f} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark of metadata extraction (primary image, date, author) on an
+offline corpus, old against new:
+
+- legacy:      the previous ArticleScraper._extract_metadata, one XPath
+               query per selector (up to ten walks of the parsed page)
+- single-pass: head_metadata.extract_metadata on the same parsed page,
+               one walk over meta/time/JSON-LD elements
+- head-scan:   head_metadata.HeadScanner on the raw bytes, stopping at the
+               end of <head>; no full parse at all, which is what the
+               --max-age-days prefilter pays per page
+- full-parse:  lxml parse of the whole page, for scale (what a prefilter
+               has to beat to be worth running)
+
+and, per field, how the new extractors' results compare with legacy:
+same value, filled (legacy found nothing), changed, or lost (new found
+nothing where legacy did). single-pass should lose nothing; head-scan
+loses dates that only a <time> in the body carries. On the synthetic
+corpus, single-pass 'changed' dates are JSON-LD pages, where legacy fell
+through to the body's <time>.
+
+Usage:
+python bench_metadata.py
+python bench_metadata.py --corpus fixtures/ --repeat 5
+"""
+
+import argparse
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+import lxml.html
+from lxml.html import HtmlElement
+
+from head_metadata import FIELDS, extract_metadata, finalize, scan_head
+from html_corpus import get_corpus
+
+BENCH_URL = 'https://news.example.com/story'
+
+# Selectors of the previous implementation, in its priority order
+LEGACY_DATE_XPATHS = [
+    '//meta[@property="article:published_time"]',
+    '//meta[@name="date"]',
+    '//meta[@name="pubdate"]',
+    '//meta[@name="timestamp"]',
+    '//time[@datetime]',
+]
+LEGACY_AUTHOR_XPATHS = [
+    '//meta[@name="author"]',
+    '//meta[@property="article:author"]',
+    '//meta[@name="article:author"]',
+    '//meta[@property="book:author"]',
+]
+
+
+def _first_match(tree: HtmlElement, xpaths: List[str]) -> Optional[HtmlElement]:
+    for xpath in xpaths:
+        matches = tree.xpath(xpath)
+        if matches:
+            return matches[0]
+    return None
+
+
+def legacy_metadata(tree: HtmlElement, base_url: str) -> Dict[str, Optional[str]]:
+    """The XPath-per-selector extractor head_metadata replaced (logging and error guards dropped)."""
+    metadata: Dict[str, Optional[str]] = {'primary_image': None, 'date': None, 'author': None}
+
+    og_image = _first_match(tree, ['//meta[@property="og:image"]'])
+    if og_image is not None and og_image.get('content'):
+        absolute_url = urljoin(base_url, og_image.get('content'))
+        if urlparse(absolute_url).scheme in ['http', 'https']:
+            metadata['primary_image'] = absolute_url
+
+    date_tag = _first_match(tree, LEGACY_DATE_XPATHS)
+    if date_tag is not None:
+        date_str = date_tag.get('content') or date_tag.get('datetime')
+        if date_str:
+            try:
+                metadata['date'] = datetime.fromisoformat(date_str.replace('Z', '+00:00')).strftime('%B %d, %Y')
+            except ValueError:
+                metadata['date'] = date_str
+
+    author_tag = _first_match(tree, LEGACY_AUTHOR_XPATHS)
+    if author_tag is not None and author_tag.get('content'):
+        author = author_tag.get('content').strip()
+        if author.lower().startswith('by '):
+            author = author[3:].strip()
+        metadata['author'] = author
+    return metadata
+
+
+def head_scan_metadata(data: bytes, base_url: str) -> Dict[str, Optional[str]]:
+    return finalize(scan_head(data), base_url)
+
+
+def time_per_page(fn: Callable, inputs: list, repeat: int) -> float:
+    """Best-of-repeat seconds per call of fn over inputs."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        best = min(best, time.perf_counter() - started)
+    return best / len(inputs)
+
+
+def agreement(legacy: List[Dict[str, Optional[str]]], new: List[Dict[str, Optional[str]]]) -> Dict[str, Dict[str, int]]:
+    """Per field: pages where new matches legacy, fills a gap, changes or loses a value."""
+    counts = {field: {'same': 0, 'filled': 0, 'changed': 0, 'lost': 0} for field in FIELDS}
+    for old, current in zip(legacy, new):
+        for field in FIELDS:
+            if old[field] == current[field]:
+                kind = 'same'
+            elif old[field] is None:
+                kind = 'filled'
+            elif current[field] is None:
+                kind = 'lost'
+            else:
+                kind = 'changed'
+            counts[field][kind] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metadata extraction, legacy XPath against single-pass.")
+    parser.add_argument('--corpus', help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument('--count', type=int, default=200, help="Synthetic corpus size")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per extractor (best is reported)")
+    args = parser.parse_args()
+
+    pages = get_corpus(args.corpus, args.count)
+    raw = [html.encode('utf-8') for _, html in pages]
+    trees = [lxml.html.fromstring(data) for data in raw]
+
+    extractors = [
+        ('legacy', lambda tree: legacy_metadata(tree, BENCH_URL), trees),
+        ('single-pass', lambda tree: extract_metadata(tree, BENCH_URL), trees),
+        ('head-scan', lambda data: head_scan_metadata(data, BENCH_URL), raw),
+        ('full-parse', lxml.html.fromstring, raw),
+    ]
+    print(f"{len(pages)} pages, {sum(map(len, raw)) / len(raw) / 1024:.0f} KB average")
+    print(f"{'extractor':<12} {'us/page':>9} {'vs legacy':>10}")
+    per_page = {}
+    for name, fn, inputs in extractors:
+        fn(inputs[0])   # warm up
+        per_page[name] = time_per_page(fn, inputs, args.repeat)
+        print(f"{name:<12} {per_page[name] * 1e6:>9.1f} {per_page['legacy'] / per_page[name]:>9.2f}x")
+
+    legacy = [legacy_metadata(tree, BENCH_URL) for tree in trees]
+    results = {
+        'single-pass': [extract_metadata(tree, BENCH_URL) for tree in trees],
+        'head-scan': [head_scan_metadata(data, BENCH_URL) for data in raw],
+    }
+    print(f"\n{'extractor':<12} {'field':<14} {'same':>6} {'filled':>7} {'changed':>8} {'lost':>5}")
+    for name, metadata in results.items():
+        for field, counts in agreement(legacy, metadata).items():
+            print(f"{name:<12} {field:<14} {counts['same']:>6} {counts['filled']:>7} "
+                  f"{counts['changed']:>8} {counts['lost']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for holding a batch of scrape results.
+
+Builds N results from one extracted synthetic page (each with its own
+copies of the strings, as real results would have) in three shapes and
+reports the Python heap they occupy:
+
+- legacy dict:   the old fetch_article() dict, raw HTML always included
+- ArticleResult: slotted result, raw HTML dropped
+- with html_ref: slotted result pointing at a cache blob path instead
+
+Usage:
+python bench_result_memory.py --count 10000
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from html_corpus import synthetic_corpus
+from python_scraper import ArticleResult, ArticleScraper
+
+BENCH_URL = 'https://news.example.com/story'
+
+
+def unique(text: str, i: int) -> str:
+    # Fresh string objects per result so nothing is shared between them
+    return f"{text}{i}"
+
+
+def build_legacy(template: ArticleResult, html: str, count: int):
+    return [
+        {
+            'article_text': unique(template.article_text, i),
+            'title': unique(template.title, i),
+            'source': template.source,
+            'author': template.author,
+            'date': template.date,
+            'primary_image': unique(template.primary_image, i),
+            'additional_images': [unique(u, i) for u in template.additional_images],
+            'html': unique(html, i),
+        }
+        for i in range(count)
+    ]
+
+
+def build_compact(template: ArticleResult, count: int, with_ref: bool):
+    return [
+        ArticleResult(
+            url=unique(BENCH_URL, i),
+            title=unique(template.title, i),
+            source=template.source,
+            author=template.author,
+            date=template.date,
+            primary_image=unique(template.primary_image, i),
+            additional_images=[unique(u, i) for u in template.additional_images],
+            article_text=unique(template.article_text, i),
+            html_ref=unique('.scrape_cache/blobs/ab/abcdef0123456789', i) if with_ref else None,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    results = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory held by batches of scrape results.")
+    parser.add_argument('--count', type=int, default=10000, help="Results per batch")
+    args = parser.parse_args()
+
+    _, html = synthetic_corpus(1)[0]
+    template = ArticleScraper(BENCH_URL).extract(html)
+
+    rows = [
+        ('legacy dict (with html)', measure(lambda: build_legacy(template, html, args.count))),
+        ('ArticleResult', measure(lambda: build_compact(template, args.count, with_ref=False))),
+        ('ArticleResult + html_ref', measure(lambda: build_compact(template, args.count, with_ref=True))),
+    ]
+
+    print(f"{args.count} results, page HTML {len(html)} chars, article text {len(template.article_text)} chars")
+    print(f"{'shape':<26}{'total MB':>10}{'per result KB':>15}{'vs legacy':>11}")
+    legacy = rows[0][1]
+    for name, size in rows:
+        print(f"{name:<26}{size / 2**20:>10.1f}{size / args.count / 1024:>15.2f}{size / legacy:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark of logging and metrics overhead on the extraction hot path.
+
+Extracts an offline corpus with logging set up three ways:
+
+- debug-sync:  every DEBUG line formatted and written to a file on the
+               calling thread, the way the old unconditional DEBUG prints
+               behaved
+- debug-async: DEBUG lines as JSON, written by the background listener
+- default:     WARNING level, so debug calls cost a level check only
+
+and reports pages/s and log lines per mode, the cost of one METRICS
+observation, and the per-stage profile METRICS collected (the same one
+batch_scraper.py --metrics-out writes).
+
+The background listener pays off when the log stream is slow (a terminal,
+a pipe to a collector); with a fast local file on a single core its thread
+competes for the GIL and debug-async can come out behind debug-sync.
+
+Usage:
+python bench_telemetry.py
+python bench_telemetry.py --corpus fixtures/ --metrics-out metrics.prom
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from html_corpus import get_corpus
+from python_scraper import ArticleScraper
+from telemetry import METRICS, Metrics, configure_logging
+
+BENCH_URL = 'https://news.example.com/story'
+MODES = [
+    ('debug-sync', 'DEBUG', 'text', False),
+    ('debug-async', 'DEBUG', 'json', True),
+    ('default', 'WARNING', 'json', True),
+]
+
+
+def run_mode(pages, level: str, fmt: str, background: bool, log_path: str) -> float:
+    """Extracts every page with logging configured as given; returns seconds."""
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        configure_logging(level, fmt=fmt, stream=log_file, background=background)
+        started = time.perf_counter()
+        for _, html in pages:
+            ArticleScraper(BENCH_URL).extract(html)
+        elapsed = time.perf_counter() - started
+        configure_logging('WARNING', background=False)   # flushes and stops the listener
+    return elapsed
+
+
+def observe_cost(count: int = 100_000) -> float:
+    """Seconds per METRICS.observe() call, on a private registry."""
+    metrics = Metrics()
+    started = time.perf_counter()
+    for i in range(count):
+        metrics.observe('parse', 0.001)
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging and metrics overhead during extraction.")
+    parser.add_argument('--corpus', help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument('--count', type=int, default=50, help="Synthetic corpus size")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per mode (best is reported)")
+    parser.add_argument('--metrics-out', help="Also write the collected metrics here (.prom or .json)")
+    args = parser.parse_args()
+
+    pages = get_corpus(args.corpus, args.count)
+    # Warm up imports and parser caches outside the measurements
+    ArticleScraper(BENCH_URL).extract(pages[0][1])
+
+    print(f"{len(pages)} pages")
+    print(f"{'mode':<12} {'pages/s':>9} {'log lines':>10} {'vs default':>11}")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, level, fmt, background in MODES:
+            log_path = os.path.join(tmp, f"{name}.log")
+            METRICS.reset()
+            best = min(run_mode(pages, level, fmt, background, log_path) for _ in range(args.repeat))
+            with open(log_path, encoding='utf-8') as f:
+                lines = sum(1 for _ in f)
+            results[name] = (best, lines)   # lines of the last run
+    baseline = results['default'][0]
+    for name, (seconds, lines) in results.items():
+        print(f"{name:<12} {len(pages) / seconds:>9.1f} {lines:>10} {seconds / baseline:>10.2f}x")
+
+    print(f"\nMETRICS.observe: {observe_cost() * 1e9:.0f} ns per call")
+    # METRICS now holds the default mode's runs
+    print(f"\n{METRICS.format_table()}")
+    if args.metrics_out:
+        METRICS.write(args.metrics_out)
+        print(f"\nWrote {args.metrics_out}")
+    logging.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Check of crawl_index.py:
+
+- record() reports a first sighting as 'new', the same title and text as
+  'unchanged' (also when only whitespace differs) and an edit as
+  'changed'; get() returns the last result, also under a
+  tracking-parameter variant of the URL
+- filter_unseen() keeps input order, returns normalized duplicates once,
+  skips indexed URLs, and with max_age returns them again once they are
+  older than that
+- compact() deletes only entries not fetched recently
+- A new CrawlIndex on the same file sees the stored entries
+- Against the stand-in server, batch_scraper.only_changed() passes on
+  every article on the first run and only the edited one on the second;
+  failures pass through and are not indexed
+
+Usage:
+python check_crawl_index.py
+"""
+
+import os
+import tempfile
+import time
+
+from batch_scraper import only_changed, scrape_one
+from crawl_index import CrawlIndex
+from stand_in_server import StandInServer, article_page
+
+URL = 'https://news.example.com/2025/transit?id=7'
+MAX_AGE = 0.3
+
+
+def article(url: str, title: str, text: str) -> dict:
+    return {'url': url, 'ok': True, 'title': title, 'article_text': text}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'crawl_index.sqlite3')
+        index = CrawlIndex(path)
+
+        first = article(URL, "Transit line opens", "The new line runs every ten minutes.")
+        assert index.record(first) == 'new'
+        relaid = article(URL, "  Transit line\nopens ", "The new line  runs\n\nevery ten minutes.")
+        assert index.record(relaid) == 'unchanged'
+        assert index.get(URL + '&utm_source=newsletter#comments') == first
+        edited = article(URL, "Transit line opens early", "The new line runs every ten minutes.")
+        assert index.record(edited) == 'changed'
+        assert index.get(URL)['title'] == "Transit line opens early"
+        assert index.get('https://news.example.com/2025/other') is None
+        assert index.counts == {'new': 1, 'changed': 1, 'unchanged': 1, 'skipped': 0}, index.counts
+
+        other = 'https://news.example.com/2025/budget'
+        index.record(article(other, "Budget passes", "The council voted seven to two."))
+        urls = ['https://news.example.com/a', URL + '&fbclid=xyz', 'https://news.example.com/b',
+                'https://news.example.com/a#top', other, 'https://news.example.com/b?utm_medium=email']
+        assert index.filter_unseen(urls) == ['https://news.example.com/a', 'https://news.example.com/b']
+        assert index.counts['skipped'] == 4, index.counts
+
+        # Once older than max_age, indexed URLs are due again; a re-record makes one fresh
+        assert index.filter_unseen([URL, other], max_age=MAX_AGE) == []
+        time.sleep(MAX_AGE + 0.05)
+        assert index.record(edited) == 'unchanged'
+        assert index.filter_unseen([URL, other], max_age=MAX_AGE) == [other]
+
+        # Only the entry not fetched within older_than goes
+        assert len(index) == 2
+        assert index.compact(older_than=MAX_AGE) == 1
+        assert len(index) == 1 and index.get(other) is None and index.get(URL) == edited
+        index.close()
+
+        reopened = CrawlIndex(path)
+        assert len(reopened) == 1 and reopened.get(URL) == edited
+        assert reopened.record(edited) == 'unchanged'
+        reopened.close()
+
+    routes = {f'/news/{i}': article_page(f"Story {i}", images=0) for i in range(3)}
+    with StandInServer(routes) as server, tempfile.TemporaryDirectory() as directory:
+        index = CrawlIndex(os.path.join(directory, 'crawl_index.sqlite3'))
+        urls = [server.url(f'/news/{i}') for i in range(3)] + [server.url('/missing')]
+
+        def run():
+            return [record['url'] for record in only_changed((scrape_one(url) for url in urls), index)]
+
+        assert run() == urls
+        routes['/news/1'] = article_page("Story 1, updated", images=0)
+        assert run() == [server.url('/news/1'), server.url('/missing')]
+        assert len(index) == 3 and index.get(server.url('/missing')) is None
+        assert index.counts == {'new': 3, 'changed': 1, 'unchanged': 2, 'skipped': 0}, index.counts
+        index.close()
+
+    print("new / unchanged / changed, filter_unseen with and without max_age, compact, reopen")
+    print("Second run over the stand-in server passed on only the edited article and the failure")
+    print("All crawl index checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Check of extraction_pool.py against a local stand-in server: the same
+URLs fetched and extracted in-process (scrape_one) and with extraction on
+worker processes (fetch_one + ExtractionPool) give the same articles and
+the same METRICS counts. Forked workers start with a copy of the parent's
+registry, which must not be sent back and counted a second time.
+
+Usage:
+python check_extraction_pool.py
+"""
+
+from batch_scraper import BatchScraper, fetch_one, scrape_one
+from extraction_pool import ExtractionPool
+from stand_in_server import StandInServer, article_page
+from telemetry import METRICS
+
+PAGES = 20
+WORKERS = 4
+
+
+def profile() -> dict:
+    """Per-stage counts and counters recorded since the last reset, without timings."""
+    snapshot = METRICS.snapshot()
+    counts = {stage: t['count'] for stage, t in snapshot['timers'].items()}
+    return {'timers': counts, 'counters': snapshot['counters']}
+
+
+def main():
+    routes = {f'/news/{i}': article_page(f"Story {i}", images=0) for i in range(PAGES)}
+    with StandInServer(routes) as server:
+        urls = [server.url(f'/news/{i}') for i in range(PAGES)]
+
+        METRICS.reset()
+        inline = {r['url']: r for r in BatchScraper(max_in_flight=8, scrape_fn=scrape_one).run(urls)}
+        inline_profile = profile()
+
+        METRICS.reset()
+        with ExtractionPool(workers=WORKERS) as pool:
+            pooled = {r['url']: r for r in pool.map(BatchScraper(max_in_flight=8, scrape_fn=fetch_one).run(urls))}
+        pooled_profile = profile()
+
+    assert all(r['ok'] for r in pooled.values()) and len(pooled) == PAGES
+    assert {url: r['title'] for url, r in pooled.items()} == {url: r['title'] for url, r in inline.items()}
+    assert inline_profile['timers']['fetch'] == inline_profile['counters']['pages_fetched'] == PAGES, inline_profile
+    assert pooled_profile['timers']['fetch'] == pooled_profile['counters']['pages_fetched'] == PAGES, pooled_profile
+    assert pooled_profile == inline_profile, (pooled_profile, inline_profile)
+    print(f"{PAGES} pages, extraction inline and on {WORKERS} workers: "
+          f"{pooled_profile['counters']['pages_fetched']:g} fetched, "
+          f"{pooled_profile['counters']['articles_extracted']:g} extracted either way")
+    print("All extraction pool checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Check of head_metadata.py:
+
+- Selector priority matches the old XPath chains (article:published_time
+  before name=date before <time>, name=author before article:author), and
+  JSON-LD (in a @graph, with image objects and author lists) fills fields
+  no meta tag has
+- A publisher-specific selector added to a SelectorTable is picked up
+  without another pass
+- HeadScanner gives the same result however the bytes are chunked, and
+  agrees with extract_metadata on every synthetic corpus page's <head>
+- ArticleScraper with a max_age_filter rejects a stale page from its
+  <head>, before the megabyte of body behind it is read, and lets a fresh
+  one through; a stale page is rejected just the same when it comes from
+  the HttpCache (fresh hit or 304 revalidation) or with stream=False
+
+Usage:
+python check_head_metadata.py
+"""
+
+import tempfile
+from datetime import datetime, timezone
+
+import lxml.html
+
+from head_metadata import (SELECTORS, MetadataCollector, SelectorTable, extract_metadata, finalize, max_age_filter,
+                           scan_head)
+from html_corpus import synthetic_corpus
+from http_cache import HttpCache
+from python_scraper import STREAM_CHUNK_SIZE, ArticleScraper, PageRejected
+from stand_in_server import PARAGRAPH, StandInServer
+
+BASE_URL = 'https://news.example.com/2025/story'
+NOW = datetime(2025, 11, 10, tzinfo=timezone.utc)
+
+PRIORITY_PAGE = b"""<!DOCTYPE html><html><head>
+<meta name="date" content="2025-10-01">
+<meta name="author" content="  By Sam Writer ">
+<meta property="article:author" content="https://example.com/sam">
+<meta property="article:published_time" content="2025-11-04T09:30:00Z">
+<meta property="og:image" content="">
+<meta property="og:image" content="/lead.jpg">
+</head><body><time datetime="2020-01-01">Jan 1</time></body></html>"""
+
+JSON_LD_PAGE = b"""<!DOCTYPE html><html><head>
+<script type="application/ld+json">{"@context": "https://schema.org", "@graph": [
+  {"@type": "WebPage", "datePublished": "1999-01-01"},
+  {"@type": ["NewsArticle", "Article"], "datePublished": "2025-11-05T06:00:00+01:00",
+   "image": [{"@type": "ImageObject", "url": "https://cdn.example.com/a.jpg"}],
+   "author": [{"@type": "Person", "name": "Ana Ruiz"}, {"@type": "Person", "name": "Lee Chan"}]}]}</script>
+<script type="application/ld+json">{not json</script>
+<meta name="sailthru.date" content="2025-11-06">
+</head><body><time datetime="2020-01-01">Jan 1</time></body></html>"""
+
+
+def article(published: str) -> bytes:
+    body = "".join(f"<p>{PARAGRAPH}</p>\n" for _ in range(4000))
+    return (f'<!DOCTYPE html><html><head><title>Transit line opens early</title>'
+            f'<meta property="article:published_time" content="{published}"></head>'
+            f'<body><article><h1>Transit line opens early</h1>{body}</article></body></html>').encode('utf-8')
+
+
+def etag_route(body: bytes, etag: str = '"v1"'):
+    def route(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag}, body
+    return route
+
+
+def assert_rejected(scraper: ArticleScraper) -> None:
+    try:
+        scraper.fetch_html()
+    except PageRejected as e:
+        assert 'more than 30 days ago' in str(e), e
+    else:
+        raise AssertionError(f"stale page {scraper.url} was not rejected")
+
+
+def main():
+    tree = lxml.html.fromstring(PRIORITY_PAGE)
+    expected = {'primary_image': 'https://news.example.com/lead.jpg', 'date': 'November 04, 2025',
+                'author': 'Sam Writer'}
+    assert extract_metadata(tree, BASE_URL) == expected, extract_metadata(tree, BASE_URL)
+
+    tree = lxml.html.fromstring(JSON_LD_PAGE)
+    expected = {'primary_image': 'https://cdn.example.com/a.jpg', 'date': 'November 05, 2025',
+                'author': 'Ana Ruiz, Lee Chan'}
+    assert extract_metadata(tree, BASE_URL) == expected, extract_metadata(tree, BASE_URL)
+
+    # A publisher's own date tag, ranked ahead of everything else
+    table = SelectorTable([('date', 'meta', 'name', 'sailthru.date', 'content')] + SELECTORS)
+    assert extract_metadata(tree, BASE_URL, table)['date'] == 'November 06, 2025'
+    collector = MetadataCollector(table)
+    collector.element('meta', {'name': 'Sailthru.Date', 'content': '2025-11-07'})
+    assert collector.raw()['date'] == '2025-11-07'
+
+    for page in (PRIORITY_PAGE, JSON_LD_PAGE):
+        whole = scan_head(page)
+        for chunk_size in (1, 5, 64, 4096):
+            assert scan_head(page, chunk_size) == whole, (chunk_size, scan_head(page, chunk_size), whole)
+
+    pages = synthetic_corpus(40)
+    for name, html in pages:
+        data = html.encode('utf-8')
+        head_only = data[:data.index(b'</head>')] + b'</head><body></body></html>'
+        from_tree = extract_metadata(lxml.html.fromstring(head_only), BASE_URL)
+        assert finalize(scan_head(data, 1024), BASE_URL) == from_tree, name
+
+    stale, fresh = article('2025-09-01T08:00:00Z'), article('2025-11-09T08:00:00Z')
+    routes = {
+        '/stale': (200, {'Content-Type': 'text/html; charset=utf-8'}, stale),
+        '/fresh': (200, {'Content-Type': 'text/html; charset=utf-8'}, fresh),
+    }
+    routes['/stale-etag'] = etag_route(stale)
+    stale_filter = max_age_filter(30, now=NOW)
+    with StandInServer(routes) as server:
+        scraper = ArticleScraper(server.url('/stale'), head_filter=stale_filter)
+        assert_rejected(scraper)
+        assert scraper.head_metadata['date'] == '2025-09-01T08:00:00Z'
+        # Only the first chunk is read, not the megabyte behind it
+        assert scraper.bytes_read <= STREAM_CHUNK_SIZE, scraper.bytes_read
+
+        scraper = ArticleScraper(server.url('/fresh'), head_filter=stale_filter)
+        result = scraper.fetch_article()
+        assert result.date == 'November 09, 2025' and scraper.bytes_read > 1024 * 1024, scraper.bytes_read
+
+        assert_rejected(ArticleScraper(server.url('/stale'), head_filter=stale_filter, stream=False))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # Cached by an unfiltered run, then served from disk (fresh hit) ...
+            cache = HttpCache(cache_dir)
+            ArticleScraper(server.url('/stale'), cache=cache).fetch_html()
+            requests_before = server.request_count
+            assert_rejected(ArticleScraper(server.url('/stale'), cache=cache, head_filter=stale_filter))
+            assert server.request_count == requests_before, "expected a cache hit"
+
+            # ... or revalidated with a 304
+            cache = HttpCache(cache_dir, ttl=0)
+            ArticleScraper(server.url('/stale-etag'), cache=cache).fetch_html()
+            assert_rejected(ArticleScraper(server.url('/stale-etag'), cache=cache, head_filter=stale_filter))
+            assert server.request_count == requests_before + 2
+
+    print(f"Stale page rejected after {len(stale[:stale.index(b'</head>')]) + 7} bytes of {len(stale)}; "
+          f"{len(pages)} synthetic heads agree with the tree extractor")
+    print("All head metadata checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Check of http_cache.py against a local stand-in server:
+
+- A miss goes to the network and is stored; a fresh hit is served from
+  disk without a request, also under a tracking-parameter variant of the
+  URL
+- Once the TTL has passed, entries with an ETag or Last-Modified are
+  revalidated with a conditional GET and a 304 reuses the stored body;
+  entries without validators are fetched again
+- no-store responses, errors and non-HTML bodies are not stored, streamed
+  or not
+- Identical bodies under two URLs share one blob; blob_ref/read_blob and
+  ArticleResult.html load it lazily
+- The size cap evicts the least recently used entries first
+- Cache-only mode serves hits without the network and raises CacheMiss
+  for anything else
+- A new HttpCache on the same directory sees the stored entries
+
+Usage:
+python check_http_cache.py
+"""
+
+import os
+import random
+import tempfile
+import time
+
+import requests
+
+from http_cache import CacheMiss, HttpCache, read_blob
+from python_scraper import ArticleScraper
+from stand_in_server import StandInServer, article_page
+
+TTL = 0.3
+HTML = 'text/html; charset=utf-8'
+LAST_MODIFIED = 'Tue, 04 Nov 2025 09:30:00 GMT'
+
+
+def validated(body: bytes, etag: str = None, last_modified: str = None, seen: list = None):
+    """Route with an ETag and/or Last-Modified that answers conditional GETs with 304."""
+    def route(handler):
+        conditional = (etag and handler.headers.get('If-None-Match') == etag) or \
+            (last_modified and handler.headers.get('If-Modified-Since') == last_modified)
+        status = 304 if conditional else 200
+        if seen is not None:
+            seen.append(status)
+        headers = {'Content-Type': HTML}
+        if etag:
+            headers['ETag'] = etag
+        if last_modified:
+            headers['Last-Modified'] = last_modified
+        return status, headers, b'' if status == 304 else body
+    return route
+
+
+def filler(size: int, seed: int) -> bytes:
+    # Random bytes compress hardly at all, so stored sizes are close to body sizes
+    return random.Random(seed).randbytes(size)
+
+
+def main():
+    _, _, page = article_page("Cached article")
+    etag_statuses, modified_statuses = [], []
+    routes = {
+        '/etag': validated(page, etag='"v1"', seen=etag_statuses),
+        '/modified': validated(page.replace(b'Cached', b'Dated'), last_modified=LAST_MODIFIED,
+                               seen=modified_statuses),
+        '/plain': (200, {'Content-Type': HTML}, page.replace(b'Cached', b'Plain')),
+        '/nostore': (200, {'Content-Type': HTML, 'Cache-Control': 'private, no-store'}, page),
+        '/copy-a': (200, {'Content-Type': HTML}, page),
+        '/copy-b': (200, {'Content-Type': HTML}, page),
+        '/error': (500, {'Content-Type': HTML}, b'oops'),
+        '/report.pdf': (200, {'Content-Type': 'application/pdf'}, b'%PDF-1.7' + bytes(50_000)),
+    }
+    for i in range(4):
+        routes[f'/big/{i}'] = (200, {'Content-Type': HTML}, filler(40_000, i))
+
+    session = requests.Session()
+    with StandInServer(routes) as server, tempfile.TemporaryDirectory() as cache_dir:
+        cache = HttpCache(cache_dir, ttl=TTL)
+
+        def get(path, query=''):
+            return cache.fetch(session, server.url(path) + query)
+
+        # Miss, then fresh hits (tracking parameters don't make a new key)
+        for path in ('/etag', '/modified', '/plain', '/nostore', '/error'):
+            get(path)
+        requests_before = server.request_count
+        hit = get('/etag', '?utm_source=newsletter&fbclid=abc')
+        assert server.request_count == requests_before, "fresh entry went to the network"
+        assert hit.headers['X-Cache'] == 'HIT' and hit.content == page and hit.status_code == 200
+        stats = cache.stats()
+        assert (stats['misses'], stats['hits'], stats['entries']) == (5, 1, 3), stats
+
+        # Not stored: no-store, errors and non-HTML bodies go to the network every time
+        get('/nostore')
+        assert get('/error').status_code == 500
+        assert server.request_count == requests_before + 2
+        for _ in range(2):
+            assert get('/report.pdf').content.startswith(b'%PDF')
+            assert ArticleScraper(server.url('/report.pdf'), cache=cache, stream=False).fetch_html()
+        assert server.request_count == requests_before + 6
+        assert cache.blob_ref(server.url('/report.pdf')) is None and cache.stats()['entries'] == 3
+
+        # Stale: conditional GETs, 304 reuses the body; no validators means a full fetch
+        time.sleep(TTL + 0.05)
+        requests_before = server.request_count
+        revalidated = get('/etag')
+        dated = get('/modified')
+        plain = get('/plain')
+        assert etag_statuses == [200, 304] and modified_statuses == [200, 304], (etag_statuses, modified_statuses)
+        assert revalidated.content == page and revalidated.headers['X-Cache'] == 'HIT'
+        assert b'Dated' in dated.content and 'X-Cache' not in plain.headers
+        assert server.request_count == requests_before + 3
+        assert cache.stats()['revalidated'] == 2
+        # Revalidation refreshed the entry: fresh again
+        get('/etag')
+        assert server.request_count == requests_before + 3
+
+        # Same body under two URLs: one blob, loaded lazily through the scraper
+        scraper_a = ArticleScraper(server.url('/copy-a'), cache=cache)
+        result = scraper_a.fetch_article()
+        scraper_b = ArticleScraper(server.url('/copy-b'), cache=cache)
+        scraper_b.fetch_article()
+        assert scraper_a.html_ref and scraper_a.html_ref == scraper_b.html_ref == cache.blob_ref(server.url('/etag'))
+        assert read_blob(scraper_a.html_ref) == page
+        assert result.raw_html is None and result.html == page.decode('utf-8')
+        assert cache.blob_ref(server.url('/nostore')) is None
+
+        # A new cache on the same directory sees everything stored so far
+        reopened = HttpCache(cache_dir, ttl=TTL)
+        assert reopened.stats()['entries'] == cache.stats()['entries'] == 5
+        assert reopened.stats()['disk_bytes'] == cache.stats()['disk_bytes']
+        blobs = sum(len(names) for _, _, names in os.walk(os.path.join(cache_dir, 'blobs')))
+        assert blobs == 3, blobs   # /etag (= /copy-a = /copy-b), /modified, /plain
+        reopened.close()
+
+        # Cache-only mode: hits without the network, CacheMiss otherwise
+        offline = HttpCache(cache_dir, ttl=0, offline=True)
+        requests_before = server.request_count
+        assert offline.fetch(session, server.url('/plain')).content == plain.content
+        try:
+            offline.fetch(session, server.url('/never-fetched'))
+            raise AssertionError("expected CacheMiss")
+        except CacheMiss:
+            pass
+        assert server.request_count == requests_before
+        offline.close()
+        cache.close()
+
+    with StandInServer(routes) as server, tempfile.TemporaryDirectory() as cache_dir:
+        # Room for two 40 KB bodies but not three: the least recently used one goes first
+        cache = HttpCache(cache_dir, max_bytes=100_000)
+        cache.fetch(session, server.url('/big/0'))
+        time.sleep(0.01)
+        cache.fetch(session, server.url('/big/1'))
+        time.sleep(0.01)
+        cache.fetch(session, server.url('/big/0'))      # hit: /big/0 is now the most recently used
+        time.sleep(0.01)
+        cache.fetch(session, server.url('/big/2'))
+        stats = cache.stats()
+        assert stats['evicted'] == 1 and stats['entries'] == 2 and stats['disk_bytes'] <= 100_000, stats
+        assert cache.blob_ref(server.url('/big/1')) is None
+        assert cache.blob_ref(server.url('/big/0')) and cache.blob_ref(server.url('/big/2'))
+        requests_before = server.request_count
+        cache.fetch(session, server.url('/big/0'))
+        assert server.request_count == requests_before
+        cache.close()
+
+    print("Fresh hits without requests, 304 revalidation (ETag and Last-Modified), no-store, errors and non-HTML skipped")
+    print("Shared blobs for identical bodies, LRU eviction under the size cap, cache-only CacheMiss")
+    print("All HTTP cache checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Check of image_probe.py against a local stand-in server serving sample
+images with Range support (and one route that ignores Range):
+
+- Format and dimensions come out right for PNG, GIF, JPEG (including one
+  whose frame header sits behind a 40 KB EXIF block), WebP (VP8, VP8L,
+  VP8X), BMP and AVIF; SVG, non-images and 404s are reported, not raised
+- Only header bytes are read: one window per image, two for the big-EXIF
+  JPEG, a bounded read when the server ignores Range
+- Probes run concurrently, over a few keep-alive connections
+- A second probe of the same URLs is served from the cache, 404s
+  included; a 503 or a timeout is not cached, and the next probe succeeds
+- rank() drops icons, tracking pixels, banners and vector art and orders
+  the rest by area; ArticleScraper with an ImageProber and probe_record
+  both pick the largest content images out of an article's <img> tags
+
+Usage:
+python check_image_probe.py
+"""
+
+import random
+import re
+import struct
+import time
+import zlib
+
+from image_probe import PROBE_BYTES, ImageProber
+from python_scraper import ArticleScraper
+from stand_in_server import PARAGRAPH, StandInServer
+
+LATENCY = 0.05
+_RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+_rng = random.Random(0)
+
+
+def png(width: int, height: int, payload: int = 0) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    # Incompressible filler stands in for the pixel data of a real photo
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + chunk(b'IDAT', _rng.randbytes(payload))
+            + chunk(b'IEND', b''))
+
+
+def gif(width: int, height: int) -> bytes:
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00\x00\x00' + b'\x2c' + b'\x00' * 9 + b'\x3b'
+
+
+def jpeg(width: int, height: int, exif: int = 0, payload: int = 0) -> bytes:
+    def segment(marker: int, data: bytes) -> bytes:
+        return struct.pack('>BBH', 0xFF, marker, len(data) + 2) + data
+    data = b'\xff\xd8' + segment(0xE0, b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00')
+    # EXIF (with its embedded thumbnail) can be up to 64 KB per APP1 segment
+    while exif > 0:
+        size = min(exif, 65000)
+        data += segment(0xE1, b'Exif\x00\x00' + _rng.randbytes(size))
+        exif -= size
+    data += segment(0xDB, b'\x00' + bytes(64))
+    data += segment(0xC2, struct.pack('>BHHB', 8, height, width, 3) + b'\x01\x22\x00\x02\x11\x01\x03\x11\x01')
+    data += segment(0xDA, b'\x03\x01\x00\x02\x11\x03\x11\x00\x3f\x00') + _rng.randbytes(payload) + b'\xff\xd9'
+    return data
+
+
+def webp(kind: str, width: int, height: int, payload: int = 0) -> bytes:
+    if kind == 'VP8X':
+        body = b'VP8X' + struct.pack('<I', 10) + b'\x00' * 4 + (width - 1).to_bytes(3, 'little') \
+            + (height - 1).to_bytes(3, 'little')
+    elif kind == 'VP8L':
+        bits = (width - 1) | ((height - 1) << 14)
+        body = b'VP8L' + struct.pack('<I', 5) + b'\x2f' + struct.pack('<I', bits)
+    else:
+        body = b'VP8 ' + struct.pack('<I', 10 + payload) + b'\x00\x00\x00\x9d\x01\x2a' \
+            + struct.pack('<HH', width, height)
+    body += _rng.randbytes(payload)
+    return b'RIFF' + struct.pack('<I', 4 + len(body)) + b'WEBP' + body
+
+
+def bmp(width: int, height: int) -> bytes:
+    return b'BM' + struct.pack('<IHHI', 54, 0, 0, 54) + struct.pack('<IiiHH', 40, width, -height, 1, 24) + bytes(24)
+
+
+def avif(width: int, height: int, payload: int = 0) -> bytes:
+    ftyp = struct.pack('>I', 20) + b'ftypavif' + b'\x00\x00\x00\x00' + b'mif1'
+    ispe = struct.pack('>I', 20) + b'ispe' + b'\x00\x00\x00\x00' + struct.pack('>II', width, height)
+    meta = struct.pack('>I', 12 + len(ispe)) + b'meta' + b'\x00\x00\x00\x00' + ispe
+    return ftyp + meta + struct.pack('>I', 8 + payload) + b'mdat' + _rng.randbytes(payload)
+
+
+# name -> (body, content type, expected (format, width, height) or None for an error)
+IMAGES = {
+    'hero.png': (png(1280, 720, payload=400_000), 'image/png', ('png', 1280, 720)),
+    'photo.jpg': (jpeg(1600, 900, exif=40_000, payload=300_000), 'image/jpeg', ('jpeg', 1600, 900)),
+    'chart.webp': (webp('VP8X', 800, 600, payload=80_000), 'image/webp', ('webp', 800, 600)),
+    'map.webp': (webp('VP8L', 640, 480, payload=60_000), 'image/webp', ('webp', 640, 480)),
+    'scene.webp': (webp('VP8 ', 1024, 576, payload=90_000), 'image/webp', ('webp', 1024, 576)),
+    'wide.avif': (avif(1920, 1080, payload=120_000), 'image/avif', ('avif', 1920, 1080)),
+    'square.bmp': (bmp(300, 300), 'image/bmp', ('bmp', 300, 300)),
+    'pixel.gif': (gif(1, 1), 'image/gif', ('gif', 1, 1)),
+    'icon.png': (png(32, 32, payload=500), 'image/png', ('png', 32, 32)),
+    'avatar.jpg': (jpeg(96, 96, payload=4000), 'image/jpeg', ('jpeg', 96, 96)),
+    'banner.jpg': (jpeg(1200, 100, payload=30_000), 'image/jpeg', ('jpeg', 1200, 100)),
+    'logo.svg': (b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"></svg>', 'image/svg+xml',
+                 ('svg', 0, 0)),
+    'page.html': (b'<!DOCTYPE html><html><body>not an image</body></html>', 'text/html', None),
+}
+USABLE_BY_AREA = ['wide.avif', 'photo.jpg', 'hero.png', 'scene.webp', 'chart.webp', 'map.webp', 'square.bmp']
+
+
+def ranged(body: bytes, content_type: str):
+    def route(handler):
+        match = _RANGE_RE.match(handler.headers.get('Range', ''))
+        if not match:
+            return 200, {'Content-Type': content_type}, body
+        start = int(match.group(1))
+        if start >= len(body):
+            return 416, {'Content-Range': f'bytes */{len(body)}'}, b''
+        end = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+        headers = {'Content-Type': content_type, 'Content-Range': f'bytes {start}-{end}/{len(body)}'}
+        return 206, headers, body[start:end + 1]
+    return route
+
+
+def recovering(route, failure):
+    """Route that fails once (failure(handler) answers or stalls the first request), then serves route."""
+    calls = []
+
+    def flaky(handler):
+        calls.append(1)
+        return failure(handler) if len(calls) == 1 else route(handler)
+    return flaky
+
+
+def stall(handler):
+    time.sleep(0.5)
+    return 503, {}, b''
+
+
+def article(image_paths) -> bytes:
+    # Readability keeps images inside the article body; no width/height attributes, as on most pages
+    images = "".join(f'<p><img src="{path}" alt=""></p>\n' for path in image_paths)
+    paragraphs = "".join(f"<p>{PARAGRAPH}</p>\n" for _ in range(6))
+    html = (f"<html><head><title>Transit line opens early</title></head><body><article>"
+            f"<h1>Transit line opens early</h1>\n{paragraphs}{images}{paragraphs}</article></body></html>")
+    return html.encode('utf-8')
+
+
+def main():
+    routes = {f'/img/{name}': ranged(body, ctype) for name, (body, ctype, _) in IMAGES.items()}
+    routes['/plain/hero.png'] = (200, {'Content-Type': 'image/png'}, IMAGES['hero.png'][0])
+    # Small images first, the way icons and avatars come first in page order
+    page_images = ['/img/pixel.gif', '/img/icon.png', '/img/avatar.jpg', '/img/logo.svg', '/img/banner.jpg',
+                   '/img/square.bmp', '/img/map.webp', '/img/chart.webp', '/img/scene.webp', '/img/hero.png',
+                   '/img/photo.jpg', '/img/wide.avif', '/img/missing.jpg']
+    routes['/flaky/hero.png'] = recovering(ranged(*IMAGES['hero.png'][:2]), lambda handler: (503, {}, b''))
+    routes['/slow/hero.png'] = recovering(ranged(*IMAGES['hero.png'][:2]), stall)
+    routes['/article'] = (200, {'Content-Type': 'text/html; charset=utf-8'}, article(page_images))
+
+    with StandInServer(routes, latency=LATENCY) as server:
+        urls = [server.url(f'/img/{name}') for name in IMAGES] + [server.url('/img/missing.jpg')]
+        with ImageProber(workers=8) as prober:
+            started = time.perf_counter()
+            infos = prober.probe_many(urls)
+            elapsed = time.perf_counter() - started
+
+            for info, (name, (body, _, expected)) in zip(infos, IMAGES.items()):
+                if expected is None:
+                    assert info.error, (name, info)
+                    continue
+                assert (info.format, info.width, info.height) == expected, (name, info)
+                windows = 2 if name == 'photo.jpg' else 1
+                assert info.requests == windows and info.bytes_read <= windows * PROBE_BYTES, (name, info)
+            assert infos[-1].error == 'HTTP 404', infos[-1]
+            total = sum(len(body) for body, _, _ in IMAGES.values())
+            read = sum(info.bytes_read for info in infos)
+            assert read < total / 10, (read, total)
+            # 15 requests at LATENCY each, 8 at a time
+            assert elapsed < 15 * LATENCY / 2, elapsed
+            connections = prober.session.stats.snapshot()['connections']
+            assert connections <= 8, connections
+
+            requests_before = server.request_count
+            again = prober.probe_many(urls)
+            assert server.request_count == requests_before and again == infos
+            assert prober.stats()['cache_hits'] == len(urls)
+
+            # Transient failures are retried by the next probe, definitive ones are not
+            assert prober.probe(server.url('/flaky/hero.png')).error == 'HTTP 503'
+            retried = prober.probe(server.url('/flaky/hero.png'))
+            assert retried.error is None and (retried.width, retried.height) == (1280, 720), retried
+            requests_before = server.request_count
+            assert prober.probe(server.url('/flaky/hero.png')) == retried
+            assert prober.probe(server.url('/img/missing.jpg')).error == 'HTTP 404'
+            assert server.request_count == requests_before
+
+            ranked = [info.url.rsplit('/', 1)[1] for info in prober.rank(infos)]
+            assert ranked == USABLE_BY_AREA, ranked
+
+            # Server that ignores Range: read stops soon after the header
+            plain = prober.probe(server.url('/plain/hero.png'))
+            assert (plain.width, plain.height) == (1280, 720) and plain.bytes_read <= PROBE_BYTES + 8192, plain
+
+            # Extraction: attribute-less <img> tags, ranked by real size
+            unprobed = ArticleScraper(server.url('/article')).fetch_article().additional_images
+            probed = ArticleScraper(server.url('/article'), image_prober=prober, max_images=4).fetch_article()
+            assert [u.rsplit('/', 1)[1] for u in unprobed][:3] == ['pixel.gif', 'icon.png', 'avatar.jpg']
+            assert [u.rsplit('/', 1)[1] for u in probed.additional_images] == USABLE_BY_AREA[:4], probed
+
+            record = {'url': server.url('/article'), 'ok': True, 'primary_image': server.url('/img/banner.jpg'),
+                      'additional_images': [server.url(p) for p in page_images]}
+            record = prober.probe_record(record, limit=3)
+            assert [u.rsplit('/', 1)[1] for u in record['additional_images']] == USABLE_BY_AREA[:3]
+            assert record['images'][0] == {'url': record['primary_image'], 'format': 'jpeg',
+                                           'width': 1200, 'height': 100}
+
+        with ImageProber(timeout=0.2) as impatient:
+            assert 'Timeout' in impatient.probe(server.url('/slow/hero.png')).error
+            assert impatient.probe(server.url('/slow/hero.png')).width == 1280
+
+    print(f"{len(urls)} images probed in {elapsed * 1000:.0f} ms ({LATENCY * 1000:.0f} ms latency each) over "
+          f"{connections} connections; read {read / 1024:.0f} KB of {total / 1024:.0f} KB")
+    print(f"Ranked: {', '.join(ranked)}")
+    print("All image probe checks passed.")
+
+
+if __name__ == "__main__":
+    main()
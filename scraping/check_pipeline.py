@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Check of the end-to-end pipeline runner against local stand-ins: articles
+on one stand-in server, and the script server and frontend API routes on
+another (a slow /generate that sometimes answers 503, instant TTS and
+render routes).
+
+- Every distinct story comes out once with a script and a video path,
+  each 404 as a failure, and syndicated copies are dropped by the dedup
+  stage
+- Generation is the bottleneck, so its inbox fills up and fetching blocks:
+  no queue ever exceeds its size, and the records inside the pipeline at
+  any moment stay within the queues' and workers' capacity
+- Extraction runs on worker processes, whose stage timings come back to
+  this process's METRICS once per page
+- 503s from the script server are retried, but only max_busy_retries
+  times: a server that never recovers fails the records and the run ends
+
+Usage:
+python check_pipeline.py
+"""
+
+import contextlib
+import io
+import json
+import random
+import threading
+
+import pipeline
+from batch_scraper import BatchScraper, fetch_one
+from bench_dedup import make_story, make_vocabulary, syndicate
+from pipeline import build_pipeline, run_pipeline
+from stand_in_server import StandInServer
+from telemetry import METRICS
+
+STORIES = 24
+COPIES = 6
+QUEUE_SIZE = 2
+GENERATE_SECONDS = 0.2
+
+
+def page(title: str, text: str):
+    paragraphs = "".join(f"<p>{p}</p>\n" for p in text.split("\n"))
+    html = f"<html><head><title>{title}</title></head><body><article><h1>{title}</h1>\n{paragraphs}</article></body></html>"
+    return 200, {'Content-Type': 'text/html; charset=utf-8'}, html.encode('utf-8')
+
+
+class ScriptRoute:
+    """Stand-in /generate: a script from the title, and a 503 every fifth request."""
+
+    def __init__(self):
+        self.calls = 0
+        self.busy = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, handler):
+        with self._lock:
+            self.calls += 1
+            if self.calls % 5 == 0:
+                self.busy += 1
+                return 503, {'Content-Type': 'application/json'}, b'{"error": "queue full"}'
+        body = json.loads(handler.request_body)
+        answer = {'script': f"No cap, {body['title']} is wild", 'latency': GENERATE_SECONDS}
+        return 200, {'Content-Type': 'application/json'}, json.dumps(answer).encode()
+
+
+def audio_route(handler):
+    text = json.loads(handler.request_body)['text']
+    answer = {'success': True, 'audioPath': f"/audio/{abs(hash(text))}.mp3", 'timings': [], 'duration': 3.0}
+    return 200, {'Content-Type': 'application/json'}, json.dumps(answer).encode()
+
+
+def render_route(handler):
+    audio_path = json.loads(handler.request_body)['audioPath']
+    answer = {'success': True, 'videoPath': audio_path.replace('/audio/', '/videos/').replace('.mp3', '.mp4')}
+    return 200, {'Content-Type': 'application/json'}, json.dumps(answer).encode()
+
+
+def always_busy(handler):
+    return 503, {'Content-Type': 'application/json'}, b'{"error": "queue full"}'
+
+
+def main():
+    pipeline.BUSY_RETRY_DELAY = 0.05
+    METRICS.reset()
+    rng = random.Random(0)
+    vocab = make_vocabulary(rng)
+    stories = [make_story(rng, vocab) for _ in range(STORIES)]
+    routes = {f"/story/{i}": page(f"Story {i}", "\n".join(story)) for i, story in enumerate(stories)}
+    for i in range(COPIES):
+        routes[f"/copy/{i}"] = page(f"Copy {i}", syndicate(rng, vocab, stories[i], edit_rate=0.02))
+    paths = list(routes) + ['/missing/1', '/missing/2']
+    rng.shuffle(paths)
+
+    script_route = ScriptRoute()
+    services = {'/generate': script_route, '/api/generate-audio': audio_route, '/api/render-video': render_route}
+    latency = lambda path: GENERATE_SECONDS if path == '/generate' else 0.005
+
+    with StandInServer(routes, latency=0.005) as articles, StandInServer(services, latency=latency) as service:
+        runner = build_pipeline(service.url(), frontend=service.url(), extract_workers=2, generate_workers=2,
+                                queue_size=QUEUE_SIZE)
+        scraper = BatchScraper(max_in_flight=8, per_host=8, scrape_fn=fetch_one)
+        # Records fetched but not yet out (or dropped) can't exceed what the queues and workers hold
+        capacity = (sum(s.inbox.maxsize + s.workers for s in runner.stages) + runner.outbox.maxsize
+                    + scraper.max_in_flight + 1)
+        records, most_inside = [], 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            for record in run_pipeline(runner, scraper, [articles.url(p) for p in paths]):
+                records.append(record)
+                dropped = sum(s.dropped for s in runner.stages)
+                most_inside = max(most_inside, runner.fed - len(records) - dropped)
+
+    print(runner.report())
+    stats = runner.stats()
+    done = [r for r in records if r.get('ok', True)]
+    failed = [r for r in records if not r.get('ok', True)]
+    assert len(done) == STORIES and len(failed) == 2, (len(done), [r.get('error') for r in failed])
+    assert all(r['script'] == f"No cap, {r['title']} is wild" and r['videoPath'].endswith('.mp4') for r in done)
+    assert stats['dedup']['dropped'] == COPIES
+    assert all(stats[s.name]['max_depth'] <= QUEUE_SIZE for s in runner.stages)
+    assert stats['generate']['max_depth'] == QUEUE_SIZE, "generation should be the bottleneck"
+    assert stats['source']['blocked_seconds'] > 0, "fetching should have been held back"
+    assert most_inside <= capacity, (most_inside, capacity)
+    assert script_route.busy > 0
+    extracted = STORIES + COPIES
+    counters = METRICS.snapshot()['counters']
+    assert counters['articles_extracted'] == extracted and counters['pages_fetched'] == extracted, counters
+
+    # A script server stuck at capacity: each request gives up after max_busy_retries
+    with StandInServer(routes, latency=0.005) as articles, StandInServer({'/generate': always_busy}) as service:
+        runner = build_pipeline(service.url(), extract_workers=2, generate_workers=2, queue_size=QUEUE_SIZE,
+                                image_workers=0, max_busy_retries=2)
+        urls = [articles.url(f"/story/{i}") for i in range(4)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            stuck = list(run_pipeline(runner, BatchScraper(scrape_fn=fetch_one), urls))
+        assert len(stuck) == 4 and all('answered 503' in r['error'] for r in stuck), stuck
+        assert service.request_count == 4 * 3, service.request_count
+    print(f"{len(done)} scripts + videos, {len(failed)} failures, {stats['dedup']['dropped']} duplicates dropped, "
+          f"{script_route.busy} 503s retried; at most {most_inside} records in the pipeline (bound {capacity}), "
+          f"fetching blocked {stats['source']['blocked_seconds']:.1f}s by back-pressure")
+    print("Pipeline checks passed.")
+
+
+if __name__ == "__main__":
+    main()
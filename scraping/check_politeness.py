@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Check of the per-host politeness scheduler against local stand-in servers
+that enforce their own rate limits.
+
+- /limited host: allows LIMIT_RPS requests/second, answers 429 with
+  Retry-After beyond that
+- /flaky host: answers 503 to every third request
+- /fast host: no limits
+
+The batch is run unpaced, paced below the limit, and paced above it (so the
+scheduler has to learn from 429s). Paced runs must finish every URL, and
+the fast host's URLs must not wait behind the throttled one.
+
+A 429 reached through a redirect to another host is fed back to the host
+the request was paced for, not to the redirect target.
+
+Usage:
+python check_politeness.py
+"""
+
+import contextlib
+import io
+import threading
+import time
+
+from batch_scraper import BatchScraper
+from http_session import PooledSession
+from politeness import HostScheduler, host_of
+from stand_in_server import StandInServer, article_page
+
+LIMIT_RPS = 5
+URLS_PER_HOST = 20
+
+
+class RateLimitedRoute:
+    """Route that serves an article, or a 429 when called faster than `rps`."""
+
+    def __init__(self, rps: float):
+        self.interval = 1 / rps
+        self.next_allowed = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, handler):
+        with self._lock:
+            now = time.monotonic()
+            if now < self.next_allowed:
+                self.rejected += 1
+                return 429, {'Content-Type': 'text/plain', 'Retry-After': '1'}, b'Too Many Requests'
+            self.next_allowed = now + self.interval
+        return article_page("Rate limited article")
+
+
+class FlakyRoute:
+    """Route that fails with 503 on every third request."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, handler):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls % 3 == 0
+        if fail:
+            return 503, {'Content-Type': 'text/plain'}, b'Service Unavailable'
+        return article_page("Flaky article")
+
+
+def run_batch(urls, scheduler):
+    scraper = BatchScraper(max_in_flight=16, per_host=4, scheduler=scheduler)
+    started = time.perf_counter()
+    finished = {}
+    ok = 0
+    for record in scraper.run(urls):
+        ok += record['ok']
+        finished[host_of(record['url'])] = time.perf_counter() - started
+    return ok, time.perf_counter() - started, finished, scraper.retries
+
+
+def check_redirect_feedback():
+    throttled = StandInServer({'/article': (429, {'Content-Type': 'text/plain', 'Retry-After': '30'}, b'')})
+    with throttled, StandInServer({}) as origin:
+        origin.routes['/moved'] = (302, {'Location': throttled.url('/article')}, b'')
+        origin_host, target_host = host_of(origin.url()), host_of(throttled.url())
+        scheduler = HostScheduler(default_rate=50, max_backoff=60)
+        session = PooledSession(scheduler=scheduler)
+        scheduler.acquire(origin_host)
+        response = session.get(origin.url('/moved'))
+        assert response.status_code == 429 and len(response.history) == 1
+        stats = scheduler.stats()
+        assert stats[origin_host]['throttled'] == 1, stats
+        assert stats.get(target_host, {}).get('throttled', 0) == 0, stats
+        assert scheduler.try_acquire(origin_host) > 20, "the origin host should be held for Retry-After"
+
+
+def main():
+    check_redirect_feedback()
+    limited = StandInServer({'/article': None})
+    flaky = StandInServer({'/article': FlakyRoute()})
+    fast = StandInServer({'/article': article_page("Fast article")})
+
+    with limited, flaky, fast, contextlib.redirect_stdout(io.StringIO()) as log:
+        urls = [
+            server.url(f'/article?n={i}')
+            for i in range(URLS_PER_HOST)
+            for server in (limited, flaky, fast)
+        ]
+        limited_host, fast_host = host_of(limited.url()), host_of(fast.url())
+
+        results = {}
+        for name, host_rate in [('unpaced', None), ('paced below limit', LIMIT_RPS * 0.8),
+                                ('paced above limit', LIMIT_RPS * 3)]:
+            route = limited.routes['/article'] = RateLimitedRoute(LIMIT_RPS)
+            flaky.routes['/article'] = FlakyRoute()
+            scheduler = None
+            if host_rate is not None:
+                # The stand-in server allows no burst at all
+                scheduler = HostScheduler(default_rate=50, burst=1, host_rates={limited_host: host_rate},
+                                          base_backoff=0.2, max_backoff=2)
+            ok, elapsed, finished, retries = run_batch(urls, scheduler)
+            results[name] = (ok, elapsed, finished, retries, route.rejected)
+
+    total = len(urls)
+    print(f"{'run':<20}{'ok':>8}{'429s':>6}{'retries':>9}{'total s':>9}{'fast host done s':>18}")
+    for name, (ok, elapsed, finished, retries, rejected) in results.items():
+        print(f"{name:<20}{ok:>5}/{total}{rejected:>6}{retries:>9}{elapsed:>9.2f}{finished[fast_host]:>18.2f}")
+
+    unpaced_ok = results['unpaced'][0]
+    for name in ('paced below limit', 'paced above limit'):
+        ok, elapsed, finished, _, rejected = results[name]
+        assert ok == total, f"{name}: only {ok}/{total} succeeded"
+        # Throttling one host must not hold up the others
+        assert finished[fast_host] < finished[limited_host] / 2, finished
+    assert results['paced below limit'][4] == 0, "pacing below the server's limit should never see a 429"
+    assert unpaced_ok < total, "the unpaced run should have been throttled"
+    print("All politeness checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Quick check of ArticleScraper's streaming, size-capped fetch against a
+local stand-in server serving normal, oversized and non-HTML responses.
+
+Usage:
+python check_streaming_fetch.py
+"""
+
+from python_scraper import ArticleScraper, PageRejected
+from stand_in_server import StandInServer, article_page
+
+MAX_BYTES = 256 * 1024
+BODY_BYTES = 32 * 1024
+
+
+def long_article(paragraphs: int) -> bytes:
+    _, _, html = article_page("Long read", paragraphs=paragraphs)
+    return html
+
+
+def main():
+    routes = {
+        '/article': article_page("Normal article"),
+        # Declared bigger than the cap: rejected from headers alone
+        '/huge': (200, {'Content-Type': 'text/html'}, long_article(3000)),
+        # Under the cap but far more body than extraction needs: read is cut short
+        '/long': (200, {'Content-Type': 'text/html'}, long_article(600)),
+        # Mislinked binary download
+        '/report.pdf': (200, {'Content-Type': 'application/pdf'}, b'%PDF-1.7' + b'\0' * 500_000),
+    }
+
+    with StandInServer(routes) as server:
+        def scraper(path):
+            return ArticleScraper(server.url(path), max_bytes=MAX_BYTES, body_bytes=BODY_BYTES)
+
+        normal = scraper('/article')
+        normal_result = normal.fetch_article()
+
+        long = scraper('/long')
+        long_result = long.fetch_article()
+
+        rejected = {}
+        for path in ('/huge', '/report.pdf'):
+            try:
+                scraper(path).fetch_html()
+            except PageRejected as e:
+                rejected[path] = str(e)
+
+    assert not normal.truncated and normal_result.title == "Normal article"
+    assert long.truncated and long.bytes_read < len(routes['/long'][2])
+    assert long_result.article_text, "truncated page should still extract"
+    assert set(rejected) == {'/huge', '/report.pdf'}, rejected
+
+    print(f"/article:    read {normal.bytes_read} bytes, complete")
+    print(f"/long:       read {long.bytes_read} of {len(routes['/long'][2])} bytes, "
+          f"extracted {len(long_result.article_text)} chars")
+    for path, message in rejected.items():
+        print(f"{path + ':':<13}rejected before reading body: {message}")
+    print("All streaming fetch checks passed.")
+
+
+if __name__ == "__main__":
+    main()
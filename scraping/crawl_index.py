@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Persistent crawl index for incremental scraping.
+
+Remembers every article already processed, keyed by a 64-bit fingerprint of
+its normalized URL (see url_normalize.py), together with a hash of the
+extracted content and the last result. Batch runs use it to:
+
+- skip URLs that were scraped recently, without fetching them at all
+- drop re-fetched articles whose content hasn't changed, so only new or
+  changed articles flow on to script generation
+
+The fingerprint is the SQLite INTEGER PRIMARY KEY (the rowid B-tree), which
+keeps point lookups fast and the index small at millions of URLs. The full
+URL is stored too, to guard against fingerprint collisions.
+
+Usage:
+index = CrawlIndex('crawl_index.sqlite3')
+todo = index.filter_unseen(urls, max_age=24 * 3600)
+status = index.record(record)   # 'new', 'changed' or 'unchanged'
+index.compact(older_than=30 * 24 * 3600)
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from url_normalize import normalize_url
+
+DEFAULT_INDEX_PATH = 'crawl_index.sqlite3'
+COMMIT_EVERY = 500          # records per transaction
+LOOKUP_CHUNK = 500          # fingerprints per IN (...) query, below SQLite's variable limit
+
+
+def url_fingerprint(url: str) -> int:
+    """Signed 64-bit fingerprint of the normalized URL (fits a SQLite INTEGER)."""
+    digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Hash of the extracted title and text, whitespace-normalized so layout-only changes don't count."""
+    text = " ".join(record.get('title', '').split()) + "\n" + " ".join(record.get('article_text', '').split())
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CrawlIndex:
+    """SQLite-backed URL fingerprint -> content hash + last result index."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                fingerprint INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_fetched REAL NOT NULL,
+                last_changed REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS articles_last_fetched ON articles (last_fetched)")
+        self._db.commit()
+        self._pending = 0
+        self.counts = {'new': 0, 'changed': 0, 'unchanged': 0, 'skipped': 0}
+
+    def filter_unseen(self, urls: Iterable[str], max_age: Optional[float] = None) -> List[str]:
+        """
+        Returns the URLs that still need fetching, in input order.
+
+        A URL is skipped if it is already indexed and, when max_age is given,
+        was fetched within the last max_age seconds. Duplicate URLs (after
+        normalization) are only returned once.
+        """
+        urls = list(urls)
+        fingerprints = [url_fingerprint(url) for url in urls]
+        cutoff = time.time() - max_age if max_age is not None else None
+
+        fresh = set()
+        unique = list(set(fingerprints))
+        for start in range(0, len(unique), LOOKUP_CHUNK):
+            chunk = unique[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            query = f"SELECT fingerprint, last_fetched FROM articles WHERE fingerprint IN ({placeholders})"
+            for fingerprint, last_fetched in self._db.execute(query, chunk):
+                if cutoff is None or last_fetched >= cutoff:
+                    fresh.add(fingerprint)
+
+        todo = []
+        queued = set()
+        for url, fingerprint in zip(urls, fingerprints):
+            if fingerprint in fresh or fingerprint in queued:
+                continue
+            queued.add(fingerprint)
+            todo.append(url)
+        self.counts['skipped'] += len(urls) - len(todo)
+        return todo
+
+    def get(self, url: str) -> Optional[dict]:
+        """Returns the last stored result for `url`, or None."""
+        row = self._db.execute(
+            "SELECT url, result FROM articles WHERE fingerprint = ?", (url_fingerprint(url),)
+        ).fetchone()
+        if row is None or row[0] != normalize_url(url):
+            return None
+        return json.loads(row[1])
+
+    def record(self, record: Dict[str, Any]) -> str:
+        """
+        Stores a successfully scraped record (as written by batch_scraper.py)
+        and reports whether it is 'new', 'changed' or 'unchanged' compared
+        with the indexed copy.
+        """
+        fingerprint = url_fingerprint(record['url'])
+        normalized = normalize_url(record['url'])
+        digest = content_hash(record)
+        now = time.time()
+
+        row = self._db.execute(
+            "SELECT url, content_hash FROM articles WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+
+        if row is not None and row[0] == normalized and row[1] == digest:
+            status = 'unchanged'
+            self._db.execute("UPDATE articles SET last_fetched = ? WHERE fingerprint = ?", (now, fingerprint))
+        else:
+            status = 'changed' if row is not None and row[0] == normalized else 'new'
+            # A fingerprint collision (different URL) simply replaces the old entry
+            self._db.execute(
+                "INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(fingerprint) DO UPDATE SET url = excluded.url, content_hash = excluded.content_hash, "
+                "result = excluded.result, last_fetched = excluded.last_fetched, last_changed = excluded.last_changed",
+                (fingerprint, normalized, digest, json.dumps(record, ensure_ascii=False), now, now, now),
+            )
+
+        self.counts[status] += 1
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.flush()
+        return status
+
+    def compact(self, older_than: float) -> int:
+        """Deletes entries not fetched in the last `older_than` seconds and reclaims the space."""
+        self.flush()
+        cutoff = time.time() - older_than
+        deleted = self._db.execute("DELETE FROM articles WHERE last_fetched < ?", (cutoff,)).rowcount
+        self._db.commit()
+        self._db.execute("VACUUM")
+        return deleted
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def flush(self) -> None:
+        self._db.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
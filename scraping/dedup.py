@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate article detection with MinHash-LSH.
+
+Wire stories get republished across dozens of sites with only the intro,
+byline or a sentence or two changed. Generating a script for every copy
+wastes GPU time, so scraped records are clustered by the similarity of
+their article_text and only one representative per cluster is forwarded.
+
+- Text is split into overlapping word shingles (5 words by default)
+- Each article gets a (one-permutation) MinHash signature; the fraction of
+  matching slots between two signatures estimates their shingle Jaccard
+  similarity. Syndicated copies typically score 0.6-0.9, unrelated stories
+  close to 0.
+- Signatures are cut into bands and each band is hashed into a bucket, so
+  a new article only gets compared with articles sharing a bucket. Work per
+  article is constant, and the whole pass is roughly linear in corpus size.
+
+Deduplicator is online: the first article of a cluster becomes its
+representative, and a later article joins the cluster of any earlier
+article it nearly duplicates.
+
+Usage:
+dedup = Deduplicator(threshold=0.5)
+for record in records:
+    if dedup.add(record['url'], record['article_text']) is None:
+        forward(record)   # not a near-duplicate of anything seen so far
+"""
+
+import re
+import zlib
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 32
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.5
+
+_MASK64 = (1 << 64) - 1
+_EMPTY = _MASK64
+_BORROWED = 1 << 63
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> set:
+    """Returns the set of 64-bit hashes of the `size`-word shingles in `text`."""
+    # crc32 per word, then the (deterministic) tuple hash per shingle: stable
+    # across processes, and far cheaper than a cryptographic hash per shingle
+    word_hashes = [zlib.crc32(word.encode('utf-8')) for word in _WORD_RE.findall(text.lower())]
+    if len(word_hashes) < size:
+        return {hash(tuple(word_hashes)) & _MASK64} if word_hashes else set()
+    return {hash(tuple(word_hashes[i:i + size])) & _MASK64 for i in range(len(word_hashes) - size + 1)}
+
+
+def minhash_signature(hashes: set, num_perm: int = DEFAULT_NUM_PERM) -> array:
+    """
+    One-permutation MinHash signature of a set of shingle hashes.
+
+    Instead of num_perm separate hash functions, each shingle hash is split
+    into a bin (low bits) and a value (high bits) and each bin keeps its
+    minimum value, so the signature costs one pass over the shingles. Empty
+    bins are filled from the next non-empty bin to the right (rotation
+    densification), which keeps short texts comparable.
+    """
+    if num_perm & (num_perm - 1):
+        raise ValueError("num_perm must be a power of two.")
+    shift = num_perm.bit_length() - 1
+    bins = [_EMPTY] * num_perm
+    for h in hashes:
+        b = h & (num_perm - 1)
+        value = h >> shift
+        if value < bins[b]:
+            bins[b] = value
+    if not hashes:
+        return array('Q', bins)
+
+    minima = list(bins)
+    for j in range(num_perm):
+        if minima[j] == _EMPTY:
+            offset = 1
+            while minima[(j + offset) % num_perm] == _EMPTY:
+                offset += 1
+            # Tag borrowed values (top bit set, so they never equal a real
+            # minimum) with the distance, so they only match bins borrowed
+            # the same way in the other signature
+            source = minima[(j + offset) % num_perm]
+            bins[j] = _BORROWED | (source >> shift << shift) | offset
+    return array('Q', bins)
+
+
+def estimate_jaccard(a: array, b: array) -> float:
+    """Fraction of equal signature slots, an estimate of the Jaccard similarity."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class Deduplicator:
+    """Online near-duplicate clustering over a banded MinHash LSH index."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.bands = bands
+        self.num_perm = num_perm
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # One bucket table per band: band hash -> keys of indexed articles
+        self._buckets: List[Dict[int, List[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, array] = {}
+        self._representative: Dict[Hashable, Hashable] = {}
+        self.clusters: Dict[Hashable, List[Hashable]] = {}
+
+    def add(self, key: Hashable, text: str) -> Optional[Hashable]:
+        """
+        Adds one article. Returns the key of the representative of the
+        cluster it joins, or None if it starts a new cluster (and should be
+        forwarded).
+        """
+        signature = minhash_signature(shingles(text, self.shingle_size), self.num_perm)
+        bands = [hash(tuple(signature[i * self.rows:(i + 1) * self.rows])) for i in range(self.bands)]
+
+        representative = None
+        checked = set()
+        for table, band in zip(self._buckets, bands):
+            for candidate in table.get(band, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if estimate_jaccard(signature, self._signatures[candidate]) >= self.threshold:
+                    representative = self._representative[candidate]
+                    break
+            if representative is not None:
+                break
+
+        # Every article is indexed, not just representatives: a copy of a
+        # copy can drift below the threshold against the first article
+        # while staying close to its sibling
+        self._signatures[key] = signature
+        for table, band in zip(self._buckets, bands):
+            table.setdefault(band, []).append(key)
+
+        if representative is None:
+            self._representative[key] = key
+            self.clusters[key] = [key]
+        else:
+            self._representative[key] = representative
+            self.clusters[representative].append(key)
+        return representative
+
+    def stats(self) -> Dict[str, int]:
+        total = sum(len(members) for members in self.clusters.values())
+        return {'articles': total, 'clusters': len(self.clusters), 'duplicates': total - len(self.clusters)}
+
+
+def drop_near_duplicates(records: Iterable[Dict[str, Any]], dedup: Deduplicator) -> Iterator[Dict[str, Any]]:
+    """
+    Yields successful records that aren't near-duplicates of an earlier one.
+    Failed records pass straight through.
+    """
+    for record in records:
+        if not record.get('ok', True):
+            yield record
+        elif dedup.add(record['url'], record.get('article_text', '')) is None:
+            yield record
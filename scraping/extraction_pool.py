@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Multi-process extraction stage for ArticleScraper.
+
+Readability scoring and tree walking are CPU-bound and hold the GIL, so
+running them on the fetch threads pins a single core. ExtractionPool takes
+already-fetched pages (the I/O layer stays in batch_scraper.py) and runs
+ArticleScraper.extract() on a process pool sized to the machine.
+
+Back-pressure: at most `max_pending` pages are queued or being extracted at
+once. The feeder stops pulling from the input iterator until a result has
+been consumed, so raw HTML never piles up in memory faster than the workers
+can chew through it.
+
+Results come back in input order (ordered=True) or as soon as each page is
+done (ordered=False, the default).
+
+Callers that run their own threads (pipeline.py's extract Stage) can use
+extract() instead of map(): each call blocks its thread on one page while a
+worker process does the parsing, so as many threads as workers keep every
+core busy.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from python_scraper import MAX_ADDITIONAL_IMAGES, ArticleScraper
+from telemetry import METRICS
+
+
+def extract_record(record: Dict[str, Any], parser: str = 'lxml',
+                   max_images: int = MAX_ADDITIONAL_IMAGES) -> Dict[str, Any]:
+    """
+    Runs extraction on one fetched page record ({'url', 'html', ...}).
+
+    Module-level so it can be pickled into worker processes. Returns the
+    record without its HTML, with either the article fields or an error.
+    max_images caps additional_images (raise it to leave candidates for an
+    ImageProber downstream, see image_probe.py).
+    """
+    started = time.perf_counter()
+    out = {k: v for k, v in record.items() if k != 'html'}
+    try:
+        result = ArticleScraper(record['url'], parser=parser, max_images=max_images).extract(record['html'])
+        out['ok'] = True
+        out.update(result.to_dict())
+    except Exception as e:
+        out['ok'] = False
+        out['error'] = f"Error fetching or parsing article: {str(e)}"
+    out['extract_elapsed'] = round(time.perf_counter() - started, 4)
+    return out
+
+
+def _init_worker(initializer: Optional[Callable[..., None]], initargs: tuple) -> None:
+    """
+    Pool worker initializer: a forked worker starts with a copy of the
+    parent's METRICS, so it is cleared before anything is recorded. Otherwise
+    the first drain() would send the parent's own counts back to be merged
+    twice. Then runs the pool's own initializer, if any.
+    """
+    METRICS.reset()
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _extract_in_worker(record: Dict[str, Any], parser: str, max_images: int) -> tuple:
+    """extract_record for pool workers: also hands back the stage timings this process recorded."""
+    result = extract_record(record, parser, max_images)
+    return result, METRICS.drain()
+
+
+class _FeedDone:
+    """Marker put on the results queue once the feeder has submitted everything."""
+
+    def __init__(self, count: int, error: Optional[BaseException] = None):
+        self.count = count
+        self.error = error
+
+
+class ExtractionPool:
+    """Runs ArticleScraper.extract() over fetched pages on a bounded process pool."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        ordered: bool = False,
+        parser: str = 'lxml',
+        max_images: int = MAX_ADDITIONAL_IMAGES,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        # Enough queued work to keep every worker busy between hand-offs
+        self.max_pending = max_pending or self.workers * 2
+        self.ordered = ordered
+        self.parser = parser
+        self.max_images = max_images
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> 'ExtractionPool':
+        """Creates the process pool (workers are forked on first use). Idempotent."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.initializer, self.initargs)
+            )
+        return self
+
+    def __enter__(self) -> 'ExtractionPool':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def extract(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extracts one fetched record on a worker process and waits for it.
+
+        Thread-safe; failed fetches (ok=False) and records without HTML are
+        returned as they are.
+        """
+        if self._executor is None:
+            raise RuntimeError("ExtractionPool must be started (start() or a with block) before extract().")
+        if not record.get('ok', True) or 'html' not in record:
+            return record
+        result, state = self._executor.submit(_extract_in_worker, record, self.parser, self.max_images).result()
+        METRICS.merge(state)
+        return result
+
+    def map(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Extracts every fetched record and yields the results.
+
+        Records with ok=False (failed fetches) are passed straight through.
+        Input is consumed lazily by a feeder thread, so a slow input (e.g. a
+        live fetch stream) doesn't stop finished results from being yielded.
+        """
+        if self._executor is None:
+            raise RuntimeError("ExtractionPool must be used as a context manager (with ExtractionPool() as pool).")
+
+        results: "queue.Queue" = queue.Queue()
+        slots = threading.BoundedSemaphore(self.max_pending)
+
+        def feed():
+            count = 0
+            try:
+                for record in records:
+                    slots.acquire()
+                    if record.get('ok', True) and 'html' in record:
+                        future = self._executor.submit(_extract_in_worker, record, self.parser, self.max_images)
+                    else:
+                        future = Future()
+                        future.set_result(record)
+                    # Ordered: queue futures in submission order and wait on each.
+                    # Unordered: queue each future only once it has finished.
+                    if self.ordered:
+                        results.put(future)
+                    else:
+                        future.add_done_callback(results.put)
+                    count += 1
+            except BaseException as e:
+                results.put(_FeedDone(count, e))
+                return
+            results.put(_FeedDone(count))
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+        done: Optional[_FeedDone] = None
+        yielded = 0
+        while done is None or yielded < done.count:
+            item = results.get()
+            if isinstance(item, _FeedDone):
+                done = item
+                continue
+            result = item.result()
+            if isinstance(result, tuple):
+                # Timings recorded in the worker process go to this process's METRICS
+                result, state = result
+                METRICS.merge(state)
+            slots.release()
+            yielded += 1
+            yield result
+
+        if done.error:
+            raise done.error
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Single-pass article metadata: primary image, publication date and author.
+
+The old extractor ran up to ten XPath queries (og:image, four date and four
+author selectors, <time>), each a walk over the whole parsed document. Here
+every selector lives in one compiled table keyed by (tag, attribute, value),
+so a single walk over the candidate elements (meta, time and JSON-LD
+scripts) fills every field, keeping the best-ranked match per field. A new
+publisher's tag is one more row in SELECTORS (or SelectorTable.add), not
+one more pass.
+
+JSON-LD (NewsArticle, Article, BlogPosting, ... anywhere in a @graph or
+list) is used when no meta tag has the field, ahead of a bare <time>.
+
+Two ways in:
+- extract_metadata(tree, url): from an already-parsed lxml tree
+  (ArticleScraper.extract)
+- HeadScanner: fed raw bytes as they arrive, done once </head> (or <body>)
+  is seen, so a page can be judged from its <head> before its body is
+  downloaded or parsed (ArticleScraper's head_filter, batch_scraper.py
+  --max-age-days)
+
+Usage:
+metadata = extract_metadata(tree, url)          # {'primary_image', 'date', 'author'}
+scanner = HeadScanner()
+for chunk in response.iter_content(16384):
+    if scanner.feed(chunk):
+        break
+raw = scanner.metadata()                        # raw values, e.g. ISO date
+python head_metadata.py page.html [page2.html ...]
+"""
+
+import json
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree
+from lxml.html import HtmlElement
+
+FIELDS = ('primary_image', 'date', 'author')
+
+# (field, tag, attribute, attribute value, attribute holding the field's value),
+# best first within each field. attribute None matches any such tag.
+SELECTORS: List[Tuple[str, str, Optional[str], Optional[str], str]] = [
+    ('primary_image', 'meta', 'property', 'og:image', 'content'),
+    ('primary_image', 'meta', 'property', 'og:image:url', 'content'),
+    ('primary_image', 'meta', 'name', 'twitter:image', 'content'),
+    ('date', 'meta', 'property', 'article:published_time', 'content'),
+    ('date', 'meta', 'name', 'date', 'content'),
+    ('date', 'meta', 'name', 'pubdate', 'content'),
+    ('date', 'meta', 'name', 'timestamp', 'content'),
+    ('date', 'meta', 'itemprop', 'datePublished', 'content'),
+    ('date', 'time', None, None, 'datetime'),
+    ('author', 'meta', 'name', 'author', 'content'),
+    ('author', 'meta', 'property', 'article:author', 'content'),
+    ('author', 'meta', 'name', 'article:author', 'content'),
+    ('author', 'meta', 'property', 'book:author', 'content'),
+]
+
+# JSON-LD types that describe the article itself
+ARTICLE_TYPES = {
+    'NewsArticle', 'Article', 'ReportageNews', 'AnalysisNewsArticle', 'OpinionNewsArticle',
+    'BackgroundNewsArticle', 'ReviewNewsArticle', 'LiveBlogPosting', 'BlogPosting', 'Report',
+}
+# JSON-LD ranks after every meta selector but ahead of a bare <time>
+_JSONLD_RANK = 50
+_LOOSE_RANK = 100
+# Where the head ends in the raw bytes; parsing stops there, since the
+# parser would otherwise work through the rest of every chunk it's fed
+HEAD_END_RE = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+
+
+class SelectorTable:
+    """
+    SELECTORS compiled into a dict, so matching an element is one lookup per
+    attribute it has rather than one query per selector.
+    """
+
+    def __init__(self, selectors: Iterable[Tuple[str, str, Optional[str], Optional[str], str]] = SELECTORS):
+        self._exact: Dict[Tuple[str, str, str], List[Tuple[str, int, str]]] = {}
+        self._loose: Dict[str, List[Tuple[str, int, str]]] = {}
+        self._ranks: Dict[str, int] = {}
+        self.attributes: Dict[str, set] = {}
+        for selector in selectors:
+            self.add(*selector)
+
+    def add(self, field: str, tag: str, attribute: Optional[str], value: Optional[str], source: str) -> None:
+        """Adds a selector ranked after the field's existing ones."""
+        rank = self._ranks.get(field, 0)
+        self._ranks[field] = rank + 1
+        if attribute is None:
+            self._loose.setdefault(tag, []).append((field, _LOOSE_RANK + rank, source))
+        else:
+            self._exact.setdefault((tag, attribute, value.lower()), []).append((field, rank, source))
+            self.attributes.setdefault(tag, set()).add(attribute)
+
+    @property
+    def tags(self) -> List[str]:
+        return sorted({tag for tag, _, _ in self._exact} | set(self._loose))
+
+    def match(self, tag: str, attrib) -> Iterable[Tuple[str, int, Optional[str]]]:
+        """(field, rank, value) for every selector the element matches."""
+        for attribute in self.attributes.get(tag, ()):
+            key = attrib.get(attribute)
+            if key is not None:
+                for field, rank, source in self._exact.get((tag, attribute, key.strip().lower()), ()):
+                    yield field, rank, attrib.get(source)
+        for field, rank, source in self._loose.get(tag, ()):
+            yield field, rank, attrib.get(source)
+
+
+DEFAULT_TABLE = SelectorTable()
+
+
+class MetadataCollector:
+    """Keeps the best-ranked non-empty value seen for each field."""
+
+    def __init__(self, table: SelectorTable = DEFAULT_TABLE):
+        self.table = table
+        self._best: Dict[str, Tuple[int, str]] = {}
+
+    def offer(self, field: str, rank: int, value: Any) -> None:
+        if not isinstance(value, str) or not value.strip():
+            return
+        current = self._best.get(field)
+        if current is None or rank < current[0]:
+            self._best[field] = (rank, value.strip())
+
+    def element(self, tag: str, attrib, text: Optional[str] = None) -> None:
+        if tag == 'script':
+            if (attrib.get('type') or '').strip().lower() == 'application/ld+json' and text:
+                self.json_ld(text)
+            return
+        for field, rank, value in self.table.match(tag, attrib):
+            self.offer(field, rank, value)
+
+    def json_ld(self, text: str) -> None:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        for item in _json_ld_items(data):
+            self.offer('primary_image', _JSONLD_RANK, _json_ld_url(item.get('image') or item.get('thumbnailUrl')))
+            self.offer('date', _JSONLD_RANK, item.get('datePublished') or item.get('dateCreated'))
+            self.offer('author', _JSONLD_RANK, _json_ld_names(item.get('author') or item.get('creator')))
+
+    def raw(self) -> Dict[str, Optional[str]]:
+        """Best value per field as found in the page (None if none)."""
+        return {field: self._best[field][1] if field in self._best else None for field in FIELDS}
+
+
+def _json_ld_items(data: Any) -> Iterable[Dict[str, Any]]:
+    # Article objects at the top level, in lists or in a @graph
+    if isinstance(data, list):
+        for item in data:
+            yield from _json_ld_items(item)
+    elif isinstance(data, dict):
+        types = data.get('@type')
+        types = types if isinstance(types, list) else [types]
+        if any(t in ARTICLE_TYPES for t in types if isinstance(t, str)):
+            yield data
+        if '@graph' in data:
+            yield from _json_ld_items(data['@graph'])
+
+
+def _json_ld_url(value: Any) -> Optional[str]:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get('url') or value.get('contentUrl')
+    return value if isinstance(value, str) else None
+
+
+def _json_ld_names(value: Any) -> Optional[str]:
+    values = value if isinstance(value, list) else [value]
+    names = [v.get('name') if isinstance(v, dict) else v for v in values]
+    names = [n.strip() for n in names if isinstance(n, str) and n.strip()]
+    return ", ".join(names) or None
+
+
+def finalize(raw: Dict[str, Optional[str]], base_url: str) -> Dict[str, Optional[str]]:
+    """
+    Raw values as ArticleResult carries them: image URL absolute (http(s)
+    only), date as 'November 01, 2025' when it parses as ISO 8601, author
+    without a leading 'By '.
+    """
+    metadata: Dict[str, Optional[str]] = {'primary_image': None, 'date': None, 'author': None}
+
+    if raw.get('primary_image'):
+        try:
+            absolute_url = urljoin(base_url, raw['primary_image'])
+            if urlparse(absolute_url).scheme in ('http', 'https'):
+                metadata['primary_image'] = absolute_url
+        except ValueError:
+            pass
+
+    date_str = raw.get('date')
+    if date_str:
+        parsed = parse_date(date_str)
+        metadata['date'] = parsed.strftime('%B %d, %Y') if parsed else date_str
+
+    author = raw.get('author')
+    if author:
+        if author.lower().startswith('by '):
+            author = author[3:].strip()
+        metadata['author'] = author
+    return metadata
+
+
+def parse_date(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def extract_metadata(tree: HtmlElement, base_url: str, table: SelectorTable = DEFAULT_TABLE
+                     ) -> Dict[str, Optional[str]]:
+    """primary_image, date and author from a parsed page, in one walk over its meta/time/script elements."""
+    collector = MetadataCollector(table)
+    for element in tree.iter(*table.tags, 'script'):
+        collector.element(element.tag, element.attrib, element.text if element.tag == 'script' else None)
+    return finalize(collector.raw(), base_url)
+
+
+class HeadScanner:
+    """
+    Incremental <head> metadata scan over raw bytes.
+
+    feed() returns True once the head is over (</head>, or a <body> or
+    other body content start), after which metadata() is final. Bytes past
+    the end of the head are never parsed.
+    """
+
+    def __init__(self, table: SelectorTable = DEFAULT_TABLE):
+        self.collector = MetadataCollector(table)
+        self._parser = etree.HTMLPullParser(events=('start', 'end'))
+        self._tail = b''
+        self.bytes_fed = 0
+        self.done = False
+
+    def feed(self, data: bytes) -> bool:
+        if self.done:
+            return True
+        # Search with the previous chunk's last bytes in case the tag is split
+        match = HEAD_END_RE.search(self._tail + data)
+        if match:
+            data = data[:max(match.end() - len(self._tail), 0)]
+        self._tail = data[-8:]
+        self.bytes_fed += len(data)
+        self._parser.feed(data)
+        self._read_events()
+        if match and not self.done:
+            # Closing flushes events the parser holds back waiting for more input
+            self.close()
+        return self.done
+
+    def close(self) -> None:
+        """Ends the scan (e.g. the page ended without a body)."""
+        if self.done:
+            return
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        self._read_events()
+        self.done = True
+
+    def _read_events(self) -> None:
+        for event, element in self._parser.read_events():
+            tag = element.tag
+            if (event == 'end' and tag == 'head') or (event == 'start' and tag == 'body'):
+                self.done = True
+                return
+            if event == 'start' and tag != 'script':
+                self.collector.element(tag, element.attrib)
+            elif event == 'end' and tag == 'script':
+                self.collector.element(tag, element.attrib, element.text)
+
+    def metadata(self) -> Dict[str, Optional[str]]:
+        """Raw values found so far (see finalize for the ArticleResult form)."""
+        return self.collector.raw()
+
+
+def scan_head(html: bytes, chunk_size: int = 16384) -> Dict[str, Optional[str]]:
+    """HeadScanner over an already-downloaded page; stops at the end of <head>."""
+    scanner = HeadScanner()
+    for start in range(0, len(html), chunk_size):
+        if scanner.feed(html[start:start + chunk_size]):
+            break
+    scanner.close()
+    return scanner.metadata()
+
+
+def max_age_filter(days: float, now: Optional[datetime] = None) -> Callable[[Dict[str, Optional[str]]], Optional[str]]:
+    """
+    head_filter for ArticleScraper: rejects pages published more than `days`
+    ago according to their <head>. Pages without a parseable date pass.
+    """
+    def check(raw: Dict[str, Optional[str]]) -> Optional[str]:
+        published = parse_date(raw['date']) if raw.get('date') else None
+        if published is None:
+            return None
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=timezone.utc)
+        if (now or datetime.now(timezone.utc)) - published > timedelta(days=days):
+            return f"published {raw['date']}, more than {days:g} days ago"
+        return None
+    return check
+
+
+def main():
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            html = f.read()
+        print(json.dumps({'file': path, **scan_head(html)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
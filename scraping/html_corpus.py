@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Offline HTML corpus for extraction benchmarks.
+
+Loads saved news pages (*.html / *.htm) from a directory, or generates a
+synthetic corpus of realistic-looking article pages when no directory is
+given: <head> metadata, navigation, sidebars, inline scripts, comment
+threads and a varying number of paragraphs and images.
+
+Synthetic pages rotate through the metadata styles publishers use (see
+HEAD_STYLES): Open Graph plus article:* meta tags, JSON-LD NewsArticle
+only, older name=pubdate/twitter:image tags, and none at all (just a
+<time> in the body).
+
+Save real pages with e.g.:
+curl -sL https://example.com/some-article > fixtures/some-article.html
+"""
+
+import os
+import random
+from typing import List, Optional, Tuple
+
+from stand_in_server import PARAGRAPH
+
+# (name, html)
+CorpusPage = Tuple[str, str]
+
+
+def load_corpus(directory: str) -> List[CorpusPage]:
+    """Returns (filename, html) for every saved HTML page in `directory`."""
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as f:
+                pages.append((name, f.read()))
+    return pages
+
+
+HEAD_STYLES = ['open-graph', 'json-ld', 'legacy-meta', 'bare']
+
+
+def synthetic_head_metadata(index: int) -> str:
+    """The <head> metadata tags of synthetic page `index`, in style HEAD_STYLES[index % 4]."""
+    style = HEAD_STYLES[index % len(HEAD_STYLES)]
+    published = f"2025-11-0{index % 9 + 1}T09:30:00Z"
+    if style == 'open-graph':
+        return (f'<meta property="og:image" content="https://cdn.example.com/lead/{index}.jpg">\n'
+                f'<meta property="article:published_time" content="{published}">\n'
+                f'<meta name="author" content="By Reporter {index % 7}">')
+    if style == 'json-ld':
+        return ('<script type="application/ld+json">{"@context": "https://schema.org", "@graph": ['
+                '{"@type": "WebSite", "name": "Example News"}, '
+                f'{{"@type": "NewsArticle", "headline": "Story {index}: Transit line opens early", '
+                f'"image": {{"@type": "ImageObject", "url": "https://cdn.example.com/lead/{index}.jpg"}}, '
+                f'"datePublished": "{published}", '
+                f'"author": [{{"@type": "Person", "name": "Reporter {index % 7}"}}]}}]}}</script>')
+    if style == 'legacy-meta':
+        return (f'<meta name="twitter:image" content="/lead/{index}.jpg">\n'
+                f'<meta name="pubdate" content="{published}">\n'
+                f'<meta property="article:author" content="Reporter {index % 7}">')
+    return ''
+
+
+def synthetic_page(index: int, rng: random.Random) -> str:
+    """Builds one synthetic news page with realistic boilerplate around the article."""
+    paragraphs = rng.randint(6, 60)
+    images = rng.randint(0, 15)
+    nav_links = rng.randint(20, 200)
+    comments = rng.randint(0, 80)
+
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(nav_links))
+    body = "".join(f"<p>{PARAGRAPH}</p>\n" for _ in range(paragraphs))
+    imgs = "".join(
+        f'<figure><img src="/images/{index}/{i}.jpg" width="{rng.choice([0, 16, 640, 1200])}">'
+        f'<figcaption>Photo {i}</figcaption></figure>\n'
+        for i in range(images)
+    )
+    thread = "".join(
+        f'<div class="comment"><span class="user">reader{i}</span><p>Great piece, thanks for sharing.</p></div>'
+        for i in range(comments)
+    )
+    scripts = "".join(f"<script>window.__data{i} = {{\"id\": {i}, \"slot\": \"ad-{i}\"}};</script>" for i in range(10))
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Story {index}: Transit line opens early | Example News</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<meta property="og:title" content="Story {index}: Transit line opens early">
+{synthetic_head_metadata(index)}
+<link rel="stylesheet" href="/static/site.css">
+{scripts}
+</head>
+<body>
+<header><nav><ul>{nav}</ul></nav></header>
+<div class="ad-banner" style="display:none">Advertisement</div>
+<main>
+<article class="story-body">
+<h1>Story {index}: Transit line opens early</h1>
+<time datetime="2025-11-01T09:30:00Z">Nov 1, 2025</time>
+{imgs}{body}</article>
+<aside class="sidebar"><h3>Most read</h3><ul>{nav[:2000]}</ul></aside>
+</main>
+<section class="comments">{thread}</section>
+<footer><p>Copyright Example News. All rights reserved.</p><ul>{nav[:1000]}</ul></footer>
+</body>
+</html>"""
+
+
+def synthetic_corpus(count: int = 50, seed: int = 0) -> List[CorpusPage]:
+    """Returns `count` synthetic (name, html) pages, deterministic for a given seed."""
+    rng = random.Random(seed)
+    return [(f"synthetic-{i}.html", synthetic_page(i, rng)) for i in range(count)]
+
+
+def get_corpus(directory: Optional[str] = None, count: int = 50) -> List[CorpusPage]:
+    """Loads `directory` if given, otherwise falls back to a synthetic corpus."""
+    if directory:
+        pages = load_corpus(directory)
+        if not pages:
+            raise ValueError(f"No .html files found in {directory}")
+        return pages
+    return synthetic_corpus(count)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk HTTP cache for ArticleScraper.
+
+- Keyed by normalized URL (see url_normalize.py)
+- Bodies are zlib-compressed and stored by SHA-256 of their content, so the
+  same page served under several URLs is only stored once
+- Stale entries are revalidated with conditional GETs (If-None-Match /
+  If-Modified-Since); a 304 reuses the stored body
+- TTL for freshness, plus a total size cap enforced with LRU eviction
+- Only pages are stored: 200 responses with an HTML/XML content type (or
+  none), not no-store ones
+- Offline "cache-only" mode that never touches the network
+- Per-run hit ratio and bytes saved via stats()
+
+Layout:
+<cache_dir>/index.sqlite3         url -> validators, blob hash, timestamps
+<cache_dir>/blobs/ab/abcdef...z   compressed bodies
+
+Usage:
+cache = HttpCache('.scrape_cache', ttl=3600)
+ArticleScraper(url, cache=cache).fetch_article()
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from url_normalize import normalize_url
+
+DEFAULT_CACHE_DIR = '.scrape_cache'
+DEFAULT_TTL = 6 * 3600                    # seconds a cached page is served without revalidation
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024     # compressed bytes on disk before LRU eviction
+
+# Response headers worth keeping with the body
+STORED_HEADERS = ['content-type', 'etag', 'last-modified', 'cache-control']
+
+
+def is_page(content_type: str) -> bool:
+    """True for an HTML/XML content type, or a missing one: what ArticleScraper parses."""
+    content_type = content_type.lower()
+    return not content_type or 'html' in content_type or 'xml' in content_type
+
+
+def read_blob(path: str) -> bytes:
+    """Returns the decompressed body stored in a blob file."""
+    with open(path, 'rb') as f:
+        return zlib.decompress(f.read())
+
+
+class CacheMiss(Exception):
+    """Raised in cache-only mode when a URL has no cached copy."""
+
+
+class HttpCache:
+    """Content-addressed, size-bounded HTTP cache with conditional revalidation."""
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        offline: bool = False,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._blob_dir = os.path.join(directory, 'blobs')
+        os.makedirs(self._blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                blob TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                encoding TEXT,
+                headers TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_blob ON entries (blob)")
+        self._db.commit()
+        self._disk_total = self._disk_bytes()
+
+        self._stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0, 'bytes_saved': 0}
+
+    # ---- public API ----
+
+    def fetch(self, session: requests.Session, url: str, headers: Optional[Dict[str, str]] = None,
+              timeout: float = 15, stream: bool = False) -> requests.Response:
+        """
+        GETs `url` through the cache and returns a requests.Response.
+
+        Fresh entries are served from disk. Stale entries with an ETag or
+        Last-Modified are revalidated; anything else goes to the network and
+        successful responses are stored.
+
+        With stream=True a network response is returned unread and is not
+        stored; the caller reads it (e.g. with a size cap) and then decides
+        whether to store() it.
+        """
+        key = normalize_url(url)
+        entry = self._lookup(key)
+
+        if self.offline:
+            if entry is None:
+                raise CacheMiss(f"{url} is not in the cache (cache-only mode).")
+            return self._hit(entry, url)
+
+        if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+            return self._hit(entry, url)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            stored = entry['headers']
+            if stored.get('etag'):
+                request_headers['If-None-Match'] = stored['etag']
+            if stored.get('last-modified'):
+                request_headers['If-Modified-Since'] = stored['last-modified']
+
+        response = session.get(url, headers=request_headers, timeout=timeout, stream=stream)
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            with self._lock:
+                self._db.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), key))
+                self._db.commit()
+                self._stats['revalidated'] += 1
+            return self._hit(entry, url)
+
+        with self._lock:
+            self._stats['misses'] += 1
+        if not stream:
+            self.store(url, response)
+        return response
+
+    def store(self, url: str, response: requests.Response) -> None:
+        """Stores a fully read 200 page (see is_page) unless it is marked no-store."""
+        if (response.status_code == 200 and is_page(response.headers.get('content-type', ''))
+                and 'no-store' not in response.headers.get('cache-control', '')):
+            self._store(normalize_url(url), response)
+
+    def blob_ref(self, url: str) -> Optional[str]:
+        """Path of the blob holding `url`'s cached body, for lazy loading with read_blob()."""
+        with self._lock:
+            row = self._db.execute("SELECT blob FROM entries WHERE url = ?", (normalize_url(url),)).fetchone()
+        return self._blob_path(row[0]) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns this run's counters plus hit ratio and current on-disk size."""
+        with self._lock:
+            stats = dict(self._stats)
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            stats['disk_bytes'] = self._disk_total
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['entries'] = entries
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---- internals ----
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT blob, size, encoding, headers, fetched_at FROM entries WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            blob, size, encoding, headers, fetched_at = row
+            # Read under the lock so eviction can't delete the blob mid-read
+            try:
+                with open(self._blob_path(blob), 'rb') as f:
+                    compressed = f.read()
+            except FileNotFoundError:
+                return None
+        return {'url': key, 'blob': blob, 'size': size, 'encoding': encoding, 'compressed': compressed,
+                'headers': json.loads(headers), 'fetched_at': fetched_at}
+
+    def _hit(self, entry: Dict[str, Any], url: str) -> requests.Response:
+        """Builds a 200 Response from a cached entry and records the hit."""
+        body = zlib.decompress(entry['compressed'])
+
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = url
+        response._content = body
+        response._content_consumed = True
+        response.encoding = entry['encoding']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.headers['X-Cache'] = 'HIT'
+
+        with self._lock:
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), entry['url']))
+            self._db.commit()
+            self._stats['hits'] += 1
+            self._stats['bytes_saved'] += entry['size']
+        return response
+
+    def _store(self, key: str, response: requests.Response) -> None:
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        # Compress outside the lock; only placing/removing blob files is serialized
+        compressed = None if os.path.exists(path) else zlib.compress(body, 6)
+
+        # Decide the text encoding once, so hits (and response.text) don't re-run charset detection
+        encoding = response.encoding = response.encoding or response.apparent_encoding
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        now = time.time()
+
+        with self._lock:
+            # Identical bodies share one blob
+            if not os.path.exists(path):
+                if compressed is None:
+                    compressed = zlib.compress(body, 6)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp, path)
+                self._disk_total += len(compressed)
+
+            old = self._db.execute("SELECT blob FROM entries WHERE url = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, digest, len(body), os.path.getsize(path), encoding, json.dumps(headers), now, now),
+            )
+            if old and old[0] != digest:
+                self._release_blob(old[0])
+            self._stats['stored'] += 1
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """Drops least-recently-used entries until the blob store fits max_bytes. Caller holds the lock."""
+        if self._disk_total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, blob FROM entries ORDER BY accessed_at").fetchall()
+        for url, blob in rows:
+            if self._disk_total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._release_blob(blob)
+            self._stats['evicted'] += 1
+
+    def _release_blob(self, blob: str) -> None:
+        """Deletes a blob if no entry references it any more. Caller holds the lock."""
+        (refs,) = self._db.execute("SELECT COUNT(*) FROM entries WHERE blob = ?", (blob,)).fetchone()
+        path = self._blob_path(blob)
+        if refs or not os.path.exists(path):
+            return
+        self._disk_total -= os.path.getsize(path)
+        os.remove(path)
+
+    def _disk_bytes(self) -> int:
+        # Sum over distinct blobs, since deduplicated bodies are shared; only
+        # run at startup, afterwards the total is kept up to date incrementally
+        row = self._db.execute(
+            "SELECT COALESCE(SUM(stored_size), 0) FROM (SELECT blob, MAX(stored_size) AS stored_size "
+            "FROM entries GROUP BY blob)"
+        ).fetchone()
+        return row[0]
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blob_dir, digest[:2], digest)
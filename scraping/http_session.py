@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Shared pooled HTTP session for the scraper and the TikTok client.
+
+A single requests.Session keeps TCP/TLS connections alive between requests
+to the same host, so scraping many articles from a few publishers (or
+paging through the Research API) only pays the handshake once per pooled
+connection instead of once per request.
+
+- Pool sizes can be set per host (e.g. more connections for a big publisher)
+- Accept-Encoding advertises gzip/deflate, plus br when brotli is installed
+- Connection reuse stats show how many requests rode on an existing connection
+- An optional HostScheduler (see politeness.py) sees every response, so
+  429s and Retry-After from any caller slow that host down for all of them
+
+Install dependencies:
+pip install requests
+pip install brotli  # optional, enables br decoding
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+
+from politeness import HostScheduler, get_shared_scheduler
+
+DEFAULT_POOL_CONNECTIONS = 100   # number of distinct hosts kept in the pool cache
+DEFAULT_POOL_MAXSIZE = 10        # connections kept alive per host
+
+# e.g. {'open.tiktokapis.com': 4, 'www.nytimes.com': 16}
+DEFAULT_HOST_POOL_SIZES: Dict[str, int] = {}
+
+
+class ConnectionStats:
+    """Thread-safe per-host counters for requests sent and connections opened."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = {}
+
+    def _bump(self, host: str, key: str) -> None:
+        with self._lock:
+            counters = self._hosts.setdefault(host, {'requests': 0, 'connections': 0})
+            counters[key] += 1
+
+    def record_request(self, host: str) -> None:
+        self._bump(host, 'requests')
+
+    def record_connection(self, host: str) -> None:
+        self._bump(host, 'connections')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns totals and per-host counters.
+
+        `reused` is the number of requests that went over an already-open
+        connection, i.e. the handshakes saved by pooling.
+        """
+        with self._lock:
+            hosts = {host: dict(counters) for host, counters in self._hosts.items()}
+
+        for counters in hosts.values():
+            counters['reused'] = max(counters['requests'] - counters['connections'], 0)
+
+        total_requests = sum(c['requests'] for c in hosts.values())
+        total_connections = sum(c['connections'] for c in hosts.values())
+        reused = sum(c['reused'] for c in hosts.values())
+        return {
+            'requests': total_requests,
+            'connections': total_connections,
+            'reused': reused,
+            'reuse_ratio': round(reused / total_requests, 4) if total_requests else 0.0,
+            'hosts': hosts,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that reports requests and newly opened connections to a ConnectionStats."""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        # Pool subclasses bound to this adapter's stats; _new_conn only runs
+        # when the pool has no idle keep-alive connection to hand out.
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.record_connection(self.host)
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.record_connection(self.host)
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        host = requests.utils.urlparse(request.url).hostname or ''
+        self.stats.record_request(host)
+        return super().send(request, **kwargs)
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session with keep-alive connection pools, per-host pool sizes,
+    compressed transfer negotiation and connection reuse stats.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        host_pool_sizes: Optional[Dict[str, int]] = None,
+        scheduler: Optional[HostScheduler] = None,
+    ):
+        super().__init__()
+        self.stats = ConnectionStats()
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.attach(self)
+
+        # Negotiates gzip/deflate, and br only if a brotli decoder is importable
+        self.headers.update(make_headers(accept_encoding=True))
+        self.headers['Connection'] = 'keep-alive'
+
+        default_adapter = CountingHTTPAdapter(
+            self.stats, pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self.mount('http://', default_adapter)
+        self.mount('https://', default_adapter)
+
+        # requests picks the longest matching mount prefix, so these win for their host
+        host_pool_sizes = DEFAULT_HOST_POOL_SIZES if host_pool_sizes is None else host_pool_sizes
+        for host, size in host_pool_sizes.items():
+            adapter = CountingHTTPAdapter(self.stats, pool_connections=1, pool_maxsize=size)
+            self.mount(f'http://{host}/', adapter)
+            self.mount(f'https://{host}/', adapter)
+
+
+_shared_session: Optional[PooledSession] = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session() -> PooledSession:
+    """Returns the process-wide PooledSession (paced by the shared HostScheduler), creating it on first use."""
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = PooledSession(scheduler=get_shared_scheduler())
+    return _shared_session
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Image probing: real dimensions and format of candidate article images from
+their first few KB, fetched concurrently with HTTP range requests.
+
+ArticleScraper can only guess which <img> tags are content from their
+width/height attributes, which most pages leave out, so icons, avatars and
+tracking pixels pass through. ImageProber asks each candidate for its
+header bytes (Range: bytes=0-4095), reads the size from the PNG / GIF /
+JPEG / WebP / BMP / AVIF header and closes, never downloading the image
+itself. JPEG headers are walked segment by segment, so a large EXIF block
+before the frame header costs one more ranged request for the bytes past
+it, not a download of everything in between. Servers that ignore Range
+are read up to MAX_PROBE_BYTES and dropped.
+
+Probes are cached by URL, and a URL being probed is shared by every caller
+asking for it meanwhile. Failures are cached only when they are definitive
+(not an image, a 4xx); a timeout, connection error, 429 or 5xx is dropped
+from the cache so the next caller probes again. rank() keeps images big enough
+for the video's visual track (MIN_SIDE, no banners or strips beyond
+MAX_ASPECT) and orders them by area.
+
+Usage:
+prober = ImageProber(workers=16)
+infos = prober.probe_many(urls)            # concurrent, in input order
+best = prober.select(urls, limit=10)       # probed, filtered, largest first
+record = prober.probe_record(record)       # scraper record: ranks additional_images
+python image_probe.py https://example.com/a.jpg https://example.com/b.png
+"""
+
+import argparse
+import json
+import re
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from http_session import PooledSession
+from telemetry import METRICS
+
+PROBE_BYTES = 4096                   # ranged window; covers every format but JPEGs with big EXIF/ICC blocks
+MAX_PROBE_BYTES = 512 * 1024         # give up on a header that isn't found within this many bytes
+DEFAULT_PROBE_WORKERS = 16
+DEFAULT_PROBE_TIMEOUT = 5            # seconds per request
+DEFAULT_CACHE_SIZE = 20000           # probed URLs remembered
+MIN_SIDE = 200                       # pixels; smaller images are icons, avatars or pixels
+MAX_ASPECT = 4.0                     # wider or taller than this is a banner, divider or strip
+MAX_ADDITIONAL_IMAGES = 10
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-')
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...); C4, C8 and CC are not frames
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+_JPEG_STANDALONE = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+# read(offset, size) -> up to `size` bytes of the image starting at `offset` (short at end of file)
+Reader = Callable[[int, int], bytes]
+
+
+class ProbeError(Exception):
+    """Raised when an image's header can't be fetched or isn't a known format."""
+
+
+class TransientProbeError(ProbeError):
+    """Raised when the server may answer differently later (429, 5xx)."""
+
+
+@dataclass(slots=True)
+class ImageInfo:
+    """What a probe learned about one image URL."""
+    url: str
+    format: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    bytes_read: int = 0
+    requests: int = 0
+    error: Optional[str] = None
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+    def is_usable(self, min_side: int = MIN_SIDE, max_aspect: float = MAX_ASPECT) -> bool:
+        """Large enough and not a strip; unprobeable images and vector art are not."""
+        if self.error or not self.width or not self.height:
+            return False
+        short, long = sorted((self.width, self.height))
+        return short >= min_side and long / short <= max_aspect
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# ---- header parsing ----
+
+def _u16be(data: bytes, at: int) -> int:
+    return struct.unpack_from('>H', data, at)[0]
+
+
+def _u32be(data: bytes, at: int) -> int:
+    return struct.unpack_from('>I', data, at)[0]
+
+
+def _jpeg_size(read: Reader) -> Optional[Tuple[int, int]]:
+    # Walk the segments (marker + length) until a start-of-frame, which holds the size
+    pos = 2
+    while pos < MAX_PROBE_BYTES:
+        head = read(pos, 9)
+        if len(head) < 4 or head[0] != 0xFF:
+            return None
+        marker = head[1]
+        if marker == 0xFF:          # fill byte
+            pos += 1
+            continue
+        if marker in _JPEG_STANDALONE:
+            pos += 2
+            continue
+        if marker == 0xD9 or marker == 0xDA:   # end of image / start of scan before any frame header
+            return None
+        if marker in _JPEG_SOF:
+            if len(head) < 9:
+                return None
+            return _u16be(head, 7), _u16be(head, 5)
+        pos += 2 + _u16be(head, 2)
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b'VP8X' and len(data) >= 30:
+        return (int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1)
+    if chunk == b'VP8L' and len(data) >= 25 and data[20] == 0x2F:
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8 ' and len(data) >= 30 and data[23:26] == b'\x9d\x01\x2a':
+        return struct.unpack_from('<H', data, 26)[0] & 0x3FFF, struct.unpack_from('<H', data, 28)[0] & 0x3FFF
+    return None
+
+
+def image_size(read: Reader) -> Tuple[str, int, int]:
+    """
+    (format, width, height) from an image's header bytes. SVG comes back as
+    ('svg', 0, 0): it has no pixel size. Raises ProbeError otherwise.
+    """
+    head = read(0, 32)
+    size: Optional[Tuple[int, int]] = None
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        fmt, size = 'png', (_u32be(head, 16), _u32be(head, 20))
+    elif head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        fmt, size = 'gif', struct.unpack_from('<HH', head, 6)
+    elif head.startswith(b'\xff\xd8'):
+        fmt, size = 'jpeg', _jpeg_size(read)
+    elif head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        fmt, size = 'webp', _webp_size(head)
+    elif head.startswith(b'BM') and len(head) >= 26:
+        width, height = struct.unpack_from('<ii', head, 18)
+        fmt, size = 'bmp', (width, abs(height))
+    elif head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis', b'heic', b'heix', b'mif1'):
+        # Image spatial extents property: size, 'ispe', version/flags, width, height
+        data = read(0, PROBE_BYTES)
+        at = data.find(b'ispe')
+        fmt = 'avif' if head[8:12] in (b'avif', b'avis') else 'heic'
+        if at >= 0 and len(data) >= at + 16:
+            size = (_u32be(data, at + 8), _u32be(data, at + 12))
+    elif b'<svg' in read(0, 1024).lower():
+        return 'svg', 0, 0
+    else:
+        raise ProbeError("not a recognized image format")
+    if not size:
+        raise ProbeError(f"{fmt} header has no size within {MAX_PROBE_BYTES} bytes")
+    return fmt, size[0], size[1]
+
+
+# ---- fetching ----
+
+class _RangeReader:
+    """
+    Serves read(offset, size) from ranged GETs of one URL, fetching a new
+    window (at least PROBE_BYTES) only when a read falls outside the last one.
+    """
+
+    def __init__(self, session: requests.Session, url: str, timeout: float, window: int = PROBE_BYTES,
+                 limit: int = MAX_PROBE_BYTES):
+        self.session = session
+        self.url = url
+        self.timeout = timeout
+        self.window = window
+        self.limit = limit
+        self.start = 0
+        self.buf = b''
+        self.eof = False
+        self.bytes_read = 0
+        self.requests = 0
+
+    def __call__(self, offset: int, size: int) -> bytes:
+        end = min(offset + size, self.limit)
+        if offset < self.start or end > self.start + len(self.buf):
+            if not (self.eof and offset >= self.start):
+                self._fetch(offset, max(end - offset, self.window))
+        return self.buf[offset - self.start:end - self.start]
+
+    def _fetch(self, offset: int, size: int) -> None:
+        size = min(size, self.limit - offset)
+        if size <= 0:
+            raise ProbeError(f"no image header within {self.limit} bytes")
+        headers = {'Range': f'bytes={offset}-{offset + size - 1}', 'Accept-Encoding': 'identity'}
+        self.requests += 1
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout, stream=True)
+        try:
+            if response.status_code == 416:      # offset past the end of the file
+                self.start, self.buf, self.eof = offset, b'', True
+                return
+            if response.status_code == 429 or response.status_code >= 500:
+                raise TransientProbeError(f"HTTP {response.status_code}")
+            if response.status_code not in (200, 206):
+                raise ProbeError(f"HTTP {response.status_code}")
+            start = 0
+            if response.status_code == 206:
+                match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+                start = int(match.group(1)) if match else offset
+            wanted = offset + size - start
+            buf = bytearray()
+            if response.status_code == 206:
+                # Read to the end (just the window) so the connection goes back to the pool
+                buf += response.content
+                self.eof = len(buf) < wanted
+            else:
+                # Range was ignored: the body starts at 0, read only as far as needed and drop it
+                for chunk in response.iter_content(8192):
+                    buf += chunk
+                    if len(buf) >= wanted:
+                        break
+                else:
+                    self.eof = True
+            self.bytes_read += len(buf)
+            self.start, self.buf = start, bytes(buf[:wanted])
+        finally:
+            response.close()
+
+
+class ImageProber:
+    """
+    Concurrent, cached image header probes.
+
+    Probes run on a thread pool of `workers`, over a keep-alive session. The
+    cache holds the most recent `cache_size` URLs, mapped to a Future so a
+    URL already being probed isn't fetched twice. Transient failures are
+    evicted once they complete.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        workers: int = DEFAULT_PROBE_WORKERS,
+        timeout: float = DEFAULT_PROBE_TIMEOUT,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        min_side: int = MIN_SIDE,
+        max_aspect: float = MAX_ASPECT,
+    ):
+        self.session = session or PooledSession(pool_maxsize=workers)
+        self.workers = workers
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.min_side = min_side
+        self.max_aspect = max_aspect
+        self._cache: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, url: str) -> ImageInfo:
+        """Probes one URL on the calling thread (or returns the cached result)."""
+        return self._submit(url, inline=True).result()
+
+    def probe_many(self, urls: Iterable[str]) -> List[ImageInfo]:
+        """Probes every URL concurrently; results in input order."""
+        futures = [self._submit(url) for url in urls]
+        return [f.result() for f in futures]
+
+    def rank(self, infos: Iterable[ImageInfo], limit: Optional[int] = None) -> List[ImageInfo]:
+        """Usable images, largest first (page order among equals)."""
+        usable = [info for info in infos if info.is_usable(self.min_side, self.max_aspect)]
+        usable.sort(key=lambda info: -info.area)
+        return usable[:limit] if limit is not None else usable
+
+    def select(self, urls: Iterable[str], limit: int = MAX_ADDITIONAL_IMAGES) -> List[str]:
+        """The URLs of the `limit` largest usable images among `urls`."""
+        return [info.url for info in self.rank(self.probe_many(urls), limit)]
+
+    def probe_record(self, record: Dict[str, Any], limit: int = MAX_ADDITIONAL_IMAGES) -> Dict[str, Any]:
+        """
+        Replaces a scraper record's additional_images with its `limit` largest
+        usable ones and adds 'images': format and size of the primary image
+        (if it probed fine) and of each kept image. Failed records pass through.
+        """
+        if not record.get('ok', True):
+            return record
+        primary = record.get('primary_image')
+        candidates = record.get('additional_images') or []
+        infos = self.probe_many(([primary] if primary else []) + candidates)
+        primary_info = infos.pop(0) if primary else None
+        kept = self.rank(infos, limit)
+        record['additional_images'] = [info.url for info in kept]
+        described = ([primary_info] if primary_info and not primary_info.error else []) + kept
+        record['images'] = [
+            {'url': info.url, 'format': info.format, 'width': info.width, 'height': info.height}
+            for info in described
+        ]
+        return record
+
+    def probe_records(self, records: Iterable[Dict[str, Any]], limit: int = MAX_ADDITIONAL_IMAGES
+                      ) -> Iterator[Dict[str, Any]]:
+        for record in records:
+            yield self.probe_record(record, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {'probed': self.misses, 'cache_hits': self.hits,
+                'hit_ratio': self.hits / total if total else 0.0, 'cached': len(self._cache)}
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> 'ImageProber':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _submit(self, url: str, inline: bool = False) -> Future:
+        with self._lock:
+            future = self._cache.get(url)
+            if future is not None:
+                self._cache.move_to_end(url)
+                self.hits += 1
+                METRICS.inc('image_probe_cache_hits')
+                return future
+            self.misses += 1
+            future = self._cache[url] = Future()
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            if not inline and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-probe')
+        if inline:
+            self._run(url, future)
+        else:
+            self._executor.submit(self._run, url, future)
+        return future
+
+    def _run(self, url: str, future: Future) -> None:
+        info, definitive = self._probe(url)
+        if not definitive:
+            # Callers already waiting share this result; later ones probe again
+            with self._lock:
+                if self._cache.get(url) is future:
+                    del self._cache[url]
+        future.set_result(info)
+
+    def _probe(self, url: str) -> Tuple[ImageInfo, bool]:
+        """The probe's result, and whether it is definitive (worth caching)."""
+        info = ImageInfo(url)
+        reader = _RangeReader(self.session, url, self.timeout)
+        started = time.perf_counter()
+        definitive = True
+        try:
+            info.format, info.width, info.height = image_size(reader)
+        except TransientProbeError as e:
+            info.error = str(e)
+            definitive = False
+        except ProbeError as e:
+            info.error = str(e)
+        except requests.RequestException as e:
+            info.error = f"{type(e).__name__}: {e}"
+            definitive = False
+        except Exception as e:
+            info.error = f"unreadable header: {e}"
+        METRICS.observe('image_probe', time.perf_counter() - started)
+        info.bytes_read, info.requests = reader.bytes_read, reader.requests
+        METRICS.inc('images_probed')
+        METRICS.inc('image_probe_bytes', info.bytes_read)
+        if info.error:
+            METRICS.inc('image_probe_errors')
+        return info, definitive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe image URLs for format and dimensions from their headers.")
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--workers', type=int, default=DEFAULT_PROBE_WORKERS)
+    args = parser.parse_args()
+    with ImageProber(workers=args.workers) as prober:
+        for info in prober.probe_many(args.urls):
+            print(json.dumps(info.to_dict()))
+    print(f"{prober.session.stats.snapshot()['requests']} requests", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+End-to-end article -> script -> video pipeline runner.
+
+Links the pieces that otherwise run by hand, as streaming stages:
+
+    fetch -> extract -> dedup -> images -> generate -> render
+
+- fetch: BatchScraper (per-host caps, politeness, retries), HTML only
+- extract: ExtractionPool worker processes, one page per stage worker
+  thread at a time, so extraction runs on as many cores as extract workers
+- dedup: crawl index (unchanged articles) and MinHash near-duplicates,
+  one worker since both are stateful
+- images: ImageProber reads each candidate image's size from its first few
+  KB and keeps the largest usable ones for the visual track (image_probe.py)
+- generate: POST to finetuning/script_server.py's /generate, which batches
+  concurrent requests on the GPU; a 503 (its queue is full) is retried,
+  up to --max-busy-retries times before the record counts as failed
+- render: the frontend's /api/generate-audio then /api/render-video
+
+Each stage has its own bounded inbox and worker count. A stage that can't
+keep up fills its inbox, the stage before it blocks on put, and so on back
+to fetching: slow GPU generation throttles scraping instead of piling up
+pages in memory. At most (sum of queue sizes + workers + fetches in flight)
+records exist at once, however long the URL list.
+
+Per-stage throughput, queue depths, busy workers and time spent blocked on
+a full downstream queue are reported every --report-every seconds and at
+the end. Finished records (with 'script', and 'videoPath' when rendered)
+are written as JSONL.
+
+Usage:
+python pipeline.py urls.txt --script-server http://127.0.0.1:8765 -o scripts.jsonl
+python pipeline.py urls.txt --script-server http://gpu:8765 --frontend http://localhost:3000 \\
+    --generate-workers 8 --render-workers 2 --index crawl_index.sqlite3
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+from urllib.parse import urlparse
+
+from batch_scraper import DEFAULT_MAX_IN_FLIGHT, DEFAULT_PER_HOST, BatchScraper, fetch_one, read_urls
+from crawl_index import CrawlIndex
+from dedup import DEFAULT_THRESHOLD, Deduplicator
+from extraction_pool import ExtractionPool
+from http_session import PooledSession
+from image_probe import DEFAULT_PROBE_WORKERS, ImageProber
+from politeness import DEFAULT_RATE, HostScheduler
+from python_scraper import MAX_ADDITIONAL_IMAGES, MAX_IMAGE_CANDIDATES
+from telemetry import DEFAULT_LOG_LEVEL, METRICS, configure_logging
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_EXTRACT_WORKERS = 4
+DEFAULT_IMAGE_WORKERS = 4        # records probed at once, each with its images probed concurrently
+DEFAULT_GENERATE_WORKERS = 8     # concurrent requests for the script server to batch
+DEFAULT_RENDER_WORKERS = 1
+DEFAULT_REPORT_EVERY = 10.0
+GENERATE_TIMEOUT = 600           # seconds; a request may wait behind a full server queue
+RENDER_TIMEOUT = 900
+BUSY_RETRY_DELAY = 1.0           # seconds before re-sending a 503'd request, doubled per retry
+MAX_BUSY_DELAY = 30.0
+DEFAULT_MAX_BUSY_RETRIES = 10    # about 3 minutes of 503s before a request is given up
+
+# End of input marker passed down the queues
+_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline step: `workers` threads take records from a bounded inbox,
+    apply `fn` and put the result on the next stage's inbox.
+
+    `fn` returns the record to pass on, or None to drop it. Records that
+    already failed (ok=False) pass straight through, and an exception from
+    `fn` turns the record into a failure naming the stage. `finish`, if
+    given, runs on the last worker thread once the input is exhausted
+    (e.g. to close a per-thread SQLite connection).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+        workers: int = 1,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        finish: Optional[Callable[[], None]] = None,
+    ):
+        if workers < 1 or queue_size < 1:
+            raise ValueError("workers and queue_size must both be at least 1.")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.finish = finish
+        self.inbox: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0   # waiting on a full downstream queue
+        self.max_depth = 0
+        self._running = workers
+        self._lock = threading.Lock()
+
+    def process(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not record.get('ok', True):
+            return record
+        with self._lock:
+            self.busy += 1
+        started = time.perf_counter()
+        try:
+            result = self.fn(record)
+        except Exception as e:
+            result = dict(record, ok=False, error=f"{self.name}: {e}")
+        with self._lock:
+            self.busy -= 1
+            self.busy_seconds += time.perf_counter() - started
+            self.processed += 1
+            if result is None:
+                self.dropped += 1
+            elif not result.get('ok', True):
+                self.failed += 1
+        return result
+
+    def worker_done(self) -> bool:
+        """Marks one worker as finished; True for the last one."""
+        with self._lock:
+            self._running -= 1
+            return self._running == 0
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'processed': self.processed,
+                'per_second': round(self.processed / elapsed, 2) if elapsed else 0.0,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'queue_depth': self.inbox.qsize(),
+                'queue_size': self.inbox.maxsize,
+                'max_depth': self.max_depth,
+                'busy': self.busy,
+                'workers': self.workers,
+                'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0.0,
+                'blocked_seconds': round(self.blocked_seconds, 2),
+            }
+
+
+class Pipeline:
+    """
+    Runs a source iterator through a chain of Stages on threads.
+
+    The source (e.g. BatchScraper.run) is advanced on its own thread, and
+    only as fast as the first stage's inbox drains; run() yields the
+    records that come out of the last stage, in completion order.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = DEFAULT_QUEUE_SIZE,
+                 report_every: Optional[float] = None, report_to: TextIO = sys.stderr):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = stages
+        self.outbox: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.report_every = report_every
+        self.report_to = report_to
+        self.fed = 0
+        self.feed_blocked_seconds = 0.0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._error: Optional[BaseException] = None
+
+    def run(self, source: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        self.started = time.perf_counter()
+        threads = [threading.Thread(target=self._feed, args=(source,), daemon=True, name='pipeline-source')]
+        for i, stage in enumerate(self.stages):
+            out = self.stages[i + 1].inbox if i + 1 < len(self.stages) else self.outbox
+            target = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            for n in range(stage.workers):
+                threads.append(threading.Thread(target=self._work, args=(stage, out, target), daemon=True,
+                                                name=f"pipeline-{stage.name}-{n}"))
+        done = threading.Event()
+        if self.report_every:
+            threads.append(threading.Thread(target=self._report_loop, args=(done,), daemon=True,
+                                            name='pipeline-report'))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                record = self.outbox.get()
+                if record is _DONE:
+                    break
+                yield record
+        finally:
+            done.set()
+            self.finished = time.perf_counter()
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, out: "queue.Queue", record: Any, target: Optional[Stage]) -> float:
+        """Puts record on `out` (blocking while it's full); returns the seconds spent blocked."""
+        started = time.perf_counter()
+        out.put(record)
+        if target is not None:
+            depth = out.qsize()
+            with target._lock:
+                target.max_depth = max(target.max_depth, depth)
+        return time.perf_counter() - started
+
+    def _feed(self, source: Iterable[Dict[str, Any]]) -> None:
+        first = self.stages[0]
+        try:
+            for record in source:
+                self.feed_blocked_seconds += self._put(first.inbox, record, first)
+                self.fed += 1
+        except BaseException as e:
+            self._error = e
+        finally:
+            first.inbox.put(_DONE)
+
+    def _work(self, stage: Stage, out: "queue.Queue", target: Optional[Stage]) -> None:
+        while True:
+            record = stage.inbox.get()
+            if record is _DONE:
+                if not stage.worker_done():
+                    stage.inbox.put(_DONE)   # for this stage's other workers
+                    return
+                if stage.finish is not None:
+                    stage.finish()
+                out.put(_DONE)
+                return
+            result = stage.process(record)
+            if result is not None:
+                blocked = self._put(out, result, target)
+                with stage._lock:
+                    stage.blocked_seconds += blocked
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+        stats = {'source': {
+            'processed': self.fed,
+            'per_second': round(self.fed / elapsed, 2) if elapsed else 0.0,
+            'blocked_seconds': round(self.feed_blocked_seconds, 2),
+        }}
+        for stage in self.stages:
+            stats[stage.name] = stage.stats(elapsed)
+        stats['elapsed'] = round(elapsed, 2)
+        return stats
+
+    def report(self) -> str:
+        """One line per stage: throughput, queue depth/size, busy workers, blocked time."""
+        stats = self.stats()
+        source = stats['source']
+        lines = [f"[{stats['elapsed']:7.1f}s] source   {source['processed']:6d} "
+                 f"({source['per_second']:.2f}/s) blocked {source['blocked_seconds']:.1f}s"]
+        for stage in self.stages:
+            s = stats[stage.name]
+            lines.append(
+                f"{'':10} {stage.name:8} {s['processed']:6d} ({s['per_second']:.2f}/s) "
+                f"queue {s['queue_depth']}/{s['queue_size']} (max {s['max_depth']}) "
+                f"busy {s['busy']}/{s['workers']} ({s['utilization']:.0%}) "
+                f"dropped {s['dropped']} failed {s['failed']} blocked {s['blocked_seconds']:.1f}s"
+            )
+        return "\n".join(lines)
+
+    def _report_loop(self, done: threading.Event) -> None:
+        while not done.wait(self.report_every):
+            print(self.report(), file=self.report_to, flush=True)
+
+
+class DedupFilter:
+    """
+    Drops articles that are unchanged since the last run (crawl index) or
+    near-duplicates of one already passed on (MinHash-LSH). Stateful, so
+    run it as a single-worker stage, with close() as the stage's finish:
+    the SQLite connection is opened and closed on that worker's thread.
+    """
+
+    def __init__(self, dedup: Optional[Deduplicator] = None, index_path: Optional[str] = None):
+        self.dedup = dedup
+        self.index_path = index_path
+        self.index: Optional[CrawlIndex] = None
+        self.counts = {'unchanged': 0, 'duplicates': 0}
+
+    def __call__(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.index_path is not None:
+            if self.index is None:
+                self.index = CrawlIndex(self.index_path)
+            if self.index.record(record) == 'unchanged':
+                self.counts['unchanged'] += 1
+                return None
+        if self.dedup is not None and self.dedup.add(record['url'], record.get('article_text', '')) is not None:
+            self.counts['duplicates'] += 1
+            return None
+        return record
+
+    def close(self) -> None:
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+
+def post_json(session: PooledSession, url: str, payload: Any, timeout: float,
+              max_busy_retries: int = DEFAULT_MAX_BUSY_RETRIES) -> Dict[str, Any]:
+    """
+    POSTs JSON and returns the JSON answer. A 503 (the service's queue is
+    full) is retried after a growing delay, so the calling stage simply
+    stays busy and the back-pressure reaches the stages before it. After
+    max_busy_retries retries the 503 is raised like any other error, so a
+    service that never recovers fails records instead of stalling the run.
+    """
+    delay = BUSY_RETRY_DELAY
+    for attempt in range(max_busy_retries + 1):
+        response = session.post(url, json=payload, timeout=timeout)
+        if response.status_code != 503 or attempt == max_busy_retries:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_BUSY_DELAY)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{url} answered {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+
+def script_generator(server_url: str, session: PooledSession, max_busy_retries: int = DEFAULT_MAX_BUSY_RETRIES
+                     ) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Stage fn: asks the script server for a script from the record's title and article text."""
+    endpoint = server_url.rstrip('/') + '/generate'
+
+    def generate(record: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {'title': record.get('title'), 'article_text': record.get('article_text')}
+        answer = post_json(session, endpoint, payload, GENERATE_TIMEOUT, max_busy_retries)
+        return dict(record, script=answer['script'], generation_latency=answer.get('latency'))
+
+    return generate
+
+
+def video_renderer(frontend_url: str, session: PooledSession, max_busy_retries: int = DEFAULT_MAX_BUSY_RETRIES
+                   ) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Stage fn: TTS then render through the frontend's API routes."""
+    base = frontend_url.rstrip('/')
+
+    def render(record: Dict[str, Any]) -> Dict[str, Any]:
+        audio = post_json(session, base + '/api/generate-audio', {'text': record['script']}, RENDER_TIMEOUT,
+                          max_busy_retries)
+        video = post_json(session, base + '/api/render-video', {
+            'text': record['script'],
+            'audioPath': audio['audioPath'],
+            'timings': audio['timings'],
+            'duration': audio['duration'],
+        }, RENDER_TIMEOUT, max_busy_retries)
+        return dict(record, audioPath=audio['audioPath'], duration=audio['duration'], videoPath=video['videoPath'])
+
+    return render
+
+
+def build_pipeline(
+    script_server: str,
+    frontend: Optional[str] = None,
+    extract_workers: int = DEFAULT_EXTRACT_WORKERS,
+    generate_workers: int = DEFAULT_GENERATE_WORKERS,
+    render_workers: int = DEFAULT_RENDER_WORKERS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    dedup_threshold: Optional[float] = DEFAULT_THRESHOLD,
+    index_path: Optional[str] = None,
+    report_every: Optional[float] = None,
+    image_workers: int = DEFAULT_IMAGE_WORKERS,
+    probe_workers: int = DEFAULT_PROBE_WORKERS,
+    max_busy_retries: int = DEFAULT_MAX_BUSY_RETRIES,
+) -> Pipeline:
+    """
+    The extract -> dedup [-> images] -> generate [-> render] stages, fed by a
+    fetch source (see run_pipeline). image_workers=0 skips image probing.
+    Extraction runs on a pool of extract_workers processes, shut down when
+    the extract stage finishes.
+    """
+    dedup = DedupFilter(Deduplicator(threshold=dedup_threshold) if dedup_threshold else None, index_path)
+    downstream = PooledSession(pool_maxsize=max(generate_workers, render_workers))
+    if image_workers:
+        prober = ImageProber(workers=probe_workers)
+    # With a prober, extraction keeps extra candidates for it to rank
+    extractor = ExtractionPool(workers=extract_workers,
+                               max_images=MAX_IMAGE_CANDIDATES if image_workers else MAX_ADDITIONAL_IMAGES).start()
+    stages = [
+        Stage('extract', extractor.extract, workers=extract_workers, queue_size=queue_size, finish=extractor.close),
+        Stage('dedup', dedup, workers=1, queue_size=queue_size, finish=dedup.close),
+    ]
+    if image_workers:
+        stages.append(Stage('images', prober.probe_record, workers=image_workers, queue_size=queue_size,
+                            finish=prober.close))
+    stages += [
+        Stage('generate', script_generator(script_server, downstream, max_busy_retries), workers=generate_workers,
+              queue_size=queue_size),
+    ]
+    if frontend:
+        stages.append(Stage('render', video_renderer(frontend, downstream, max_busy_retries), workers=render_workers,
+                            queue_size=queue_size))
+    return Pipeline(stages, queue_size=queue_size, report_every=report_every)
+
+
+def run_pipeline(pipeline: Pipeline, scraper: BatchScraper, urls: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Feeds the URLs' fetched pages (HTML only) through the pipeline's stages."""
+    return pipeline.run(scraper.run(urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape articles and turn them into TikTok scripts (and videos).")
+    parser.add_argument('inputs', nargs='*', help="URL list files ('-' for stdin) or URLs")
+    parser.add_argument('-o', '--output', default='pipeline_output.jsonl', help="JSONL output file ('-' for stdout)")
+    parser.add_argument('--script-server', default='http://127.0.0.1:8765',
+                        help="finetuning/script_server.py base URL")
+    parser.add_argument('--frontend', help="Frontend base URL; render a video per script (e.g. http://localhost:3000)")
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help="Maximum fetches in flight across all hosts")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help="Maximum fetches in flight per host")
+    parser.add_argument('--timeout', type=int, default=15, help="Per-fetch timeout in seconds")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help="Fetches per second per host, with 429/5xx backoff (0 = unpaced)")
+    parser.add_argument('--extract-workers', type=int, default=DEFAULT_EXTRACT_WORKERS,
+                        help="Extraction worker processes")
+    parser.add_argument('--generate-workers', type=int, default=DEFAULT_GENERATE_WORKERS,
+                        help="Concurrent script server requests")
+    parser.add_argument('--render-workers', type=int, default=DEFAULT_RENDER_WORKERS)
+    parser.add_argument('--max-busy-retries', type=int, default=DEFAULT_MAX_BUSY_RETRIES,
+                        help="Retries of a 503 from the script server or frontend before the record fails")
+    parser.add_argument('--image-workers', type=int, default=DEFAULT_IMAGE_WORKERS,
+                        help="Articles whose images are probed at once (0 = keep images unprobed)")
+    parser.add_argument('--probe-workers', type=int, default=DEFAULT_PROBE_WORKERS, help="Image probes in flight")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help="Capacity of each stage's inbox")
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Near-duplicate similarity threshold (0 = no near-duplicate filtering)")
+    parser.add_argument('--index', help="Crawl index file: skip indexed URLs and drop unchanged articles")
+    parser.add_argument('--report-every', type=float, default=DEFAULT_REPORT_EVERY,
+                        help="Seconds between progress reports on stderr (0 = only at the end)")
+    parser.add_argument('--log-level', default=DEFAULT_LOG_LEVEL, help="DEBUG, INFO, WARNING or ERROR (JSON lines on stderr)")
+    parser.add_argument('--metrics-out', help="Write per-stage timers and counters here (.prom for Prometheus text, else JSON)")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    urls = []
+    for item in args.inputs or ['-']:
+        if item == '-':
+            urls.extend(read_urls(sys.stdin))
+        elif urlparse(item).scheme in ('http', 'https'):
+            urls.append(item)
+        else:
+            with open(item, encoding='utf-8') as f:
+                urls.extend(read_urls(f))
+    if not urls:
+        print("Error: No URLs provided.", file=sys.stderr)
+        return
+
+    if args.index is not None:
+        index = CrawlIndex(args.index)
+        submitted = len(urls)
+        urls = index.filter_unseen(urls)
+        index.close()
+        print(f"Index: skipping {submitted - len(urls)} already-processed URLs, {len(urls)} to fetch",
+              file=sys.stderr)
+
+    scheduler = HostScheduler(default_rate=args.rate) if args.rate > 0 else None
+    scraper = BatchScraper(max_in_flight=args.max_in_flight, per_host=args.per_host, timeout=args.timeout,
+                           scrape_fn=fetch_one, scheduler=scheduler)
+    pipeline = build_pipeline(
+        args.script_server,
+        frontend=args.frontend,
+        extract_workers=args.extract_workers,
+        generate_workers=args.generate_workers,
+        render_workers=args.render_workers,
+        queue_size=args.queue_size,
+        dedup_threshold=args.dedup_threshold,
+        index_path=args.index,
+        report_every=args.report_every or None,
+        image_workers=args.image_workers,
+        probe_workers=args.probe_workers,
+        max_busy_retries=args.max_busy_retries,
+    )
+
+    counts = {'ok': 0, 'failed': 0}
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        for record in run_pipeline(pipeline, scraper, urls):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            counts['ok' if record.get('ok', True) else 'failed'] += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(pipeline.report(), file=sys.stderr)
+    print(f"Wrote {counts['ok']} scripts ({counts['failed']} failed) from {len(urls)} URLs "
+          f"in {pipeline.stats()['elapsed']:.1f}s", file=sys.stderr)
+    if args.metrics_out:
+        METRICS.write(args.metrics_out)
+        print(f"Metrics: wrote per-stage timings to {args.metrics_out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
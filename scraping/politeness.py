@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Per-host politeness scheduler shared by the scraper and the TikTok client.
+
+- A token bucket per host caps the request rate (with a small burst)
+- 429 and 5xx responses put the host on hold: for the Retry-After period
+  when the server sends one, otherwise for a jittered exponential backoff
+- The rate adapts: a 429 halves the host's rate (once per hold, however
+  many in-flight requests hit it), and every success creeps it back up
+  towards the configured rate
+- Non-blocking try_acquire() lets a dispatcher skip a throttled host and
+  keep other hosts busy; acquire() blocks for single-threaded callers
+
+Responses are recorded through a requests response hook, so everything
+sent through an attached session feeds the scheduler automatically.
+
+Usage:
+scheduler = HostScheduler(default_rate=2.0, host_rates={'open.tiktokapis.com': 0.5})
+scheduler.attach(session)
+response = polite_request(session, scheduler, 'POST', url, json=payload)
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+DEFAULT_RATE = 2.0          # requests per second per host
+DEFAULT_BURST = 2           # requests a quiet host may send back to back
+DEFAULT_BASE_BACKOFF = 1.0  # seconds, doubled per consecutive failure
+DEFAULT_MAX_BACKOFF = 60.0
+DEFAULT_MAX_RETRIES = 4
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Returns the Retry-After header (delta-seconds or HTTP-date) as seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(when - (now if now is not None else time.time()), 0.0)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class _HostState:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.configured_rate = rate
+        self.bucket = TokenBucket(rate, burst, now)
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.counters = {'requests': 0, 'throttled': 0, 'errors': 0}
+
+
+class HostScheduler:
+    """Thread-safe per-host token buckets with Retry-After and adaptive backoff."""
+
+    def __init__(
+        self,
+        default_rate: float = DEFAULT_RATE,
+        burst: float = DEFAULT_BURST,
+        host_rates: Optional[Dict[str, float]] = None,
+        base_backoff: float = DEFAULT_BASE_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        self.default_rate = default_rate
+        self.burst = burst
+        self.host_rates = {host.lower(): rate for host, rate in (host_rates or {}).items()}
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str, now: float) -> _HostState:
+        """Caller holds the lock."""
+        state = self._hosts.get(host)
+        if state is None:
+            rate = self.host_rates.get(host, self.default_rate)
+            state = self._hosts[host] = _HostState(rate, self.burst, now)
+        return state
+
+    def set_rate(self, host: str, rate: float) -> None:
+        """Sets (or changes) the configured rate for one host."""
+        host = host.lower()
+        with self._lock:
+            self.host_rates[host] = rate
+            state = self._hosts.get(host)
+            if state is not None:
+                state.configured_rate = rate
+                state.bucket.rate = rate
+
+    # ---- pacing ----
+
+    def delay(self, host: str) -> float:
+        """Seconds until `host` may be sent another request, without taking a token."""
+        with self._lock:
+            now = self.clock()
+            state = self._state(host, now)
+            return max(state.blocked_until - now, state.bucket.delay(now), 0.0)
+
+    def try_acquire(self, host: str) -> float:
+        """
+        Takes a token for `host` if one is available and returns 0. Otherwise
+        returns the seconds to wait and takes nothing, so the caller can go
+        and serve another host in the meantime.
+        """
+        with self._lock:
+            now = self.clock()
+            state = self._state(host, now)
+            wait = max(state.blocked_until - now, state.bucket.delay(now), 0.0)
+            if wait == 0.0:
+                state.bucket.take()
+                state.counters['requests'] += 1
+            return wait
+
+    def acquire(self, host: str) -> None:
+        """Blocks until a request to `host` is allowed and takes the token."""
+        while True:
+            wait = self.try_acquire(host)
+            if wait == 0.0:
+                return
+            time.sleep(wait)
+
+    # ---- feedback ----
+
+    def record(self, host: str, status_code: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Feeds a response status back into the host's pacing.
+
+        Returns the seconds the host is now on hold for a retryable status,
+        or None if the response wasn't throttled or a server error.
+        """
+        with self._lock:
+            now = self.clock()
+            state = self._state(host, now)
+            if status_code not in RETRYABLE_STATUSES:
+                state.failures = 0
+                # Additive increase back towards the configured rate
+                bucket = state.bucket
+                bucket.rate = min(state.configured_rate, bucket.rate + state.configured_rate / 50)
+                return None
+
+            state.failures += 1
+            if status_code == 429:
+                state.counters['throttled'] += 1
+                # Multiplicative decrease, down to 1/16 of the configured rate.
+                # Concurrent requests all hitting the same limit count once.
+                if now >= state.blocked_until:
+                    state.bucket.rate = max(state.configured_rate / 16, state.bucket.rate / 2)
+            else:
+                state.counters['errors'] += 1
+
+            hold = parse_retry_after(retry_after)
+            if hold is None:
+                # Jittered exponential backoff, so retries from many
+                # workers don't arrive in lockstep
+                ceiling = min(self.max_backoff, self.base_backoff * 2 ** (state.failures - 1))
+                hold = self.rng.uniform(ceiling / 2, ceiling)
+            hold = min(hold, self.max_backoff)
+            state.blocked_until = max(state.blocked_until, now + hold)
+            return hold
+
+    def attach(self, session: requests.Session) -> None:
+        """
+        Records the outcome of every request `session` sends, against the host
+        it was sent to (the one acquire() paced it for). After redirects, the
+        final status counts for the original host, not the one redirected to.
+        """
+        send = session.send
+        hops = threading.local()
+
+        def recording_send(request, **kwargs):
+            if getattr(hops, 'active', False):
+                # A redirect hop, sent from within the outer call below
+                return send(request, **kwargs)
+            hops.active = True
+            try:
+                response = send(request, **kwargs)
+            finally:
+                hops.active = False
+            self.record(host_of(request.url), response.status_code, response.headers.get('Retry-After'))
+            return response
+
+        session.send = recording_send
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                host: dict(state.counters, rate=round(state.bucket.rate, 3), failures=state.failures)
+                for host, state in self._hosts.items()
+            }
+
+
+def polite_request(session: requests.Session, scheduler: HostScheduler, method: str, url: str,
+                   max_retries: int = DEFAULT_MAX_RETRIES, **kwargs) -> requests.Response:
+    """
+    Sends a request paced by `scheduler`, retrying 429/5xx responses after
+    the host's hold expires. The session must be attached to the scheduler.
+    Returns the last response (which may still be an error).
+    """
+    host = host_of(url)
+    for attempt in range(max_retries + 1):
+        scheduler.acquire(host)
+        response = session.request(method, url, **kwargs)
+        if response.status_code not in RETRYABLE_STATUSES or attempt == max_retries:
+            return response
+        response.close()
+    return response
+
+
+_shared_scheduler: Optional[HostScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_shared_scheduler() -> HostScheduler:
+    """Returns the process-wide HostScheduler, creating it on first use."""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        with _shared_scheduler_lock:
+            if _shared_scheduler is None:
+                _shared_scheduler = HostScheduler()
+    return _shared_scheduler
@@ -13,38 +13,200 @@ Original file is located at
 #!/usr/bin/env python3
 """
 Article scraping logic converted from TypeScript to Python.
-Uses requests, BeautifulSoup, and readability-lxml for article extraction.
+Uses requests, lxml, and readability-lxml for article extraction.
+
+Pages are streamed: the content type and Content-Length are checked before
+any body is read, and reading stops once the <head> plus enough of the body
+for extraction has arrived, or at a hard byte cap.
+
+Each page is parsed exactly once into an lxml tree; metadata, Readability
+and image extraction all run off that shared tree. The parser backend is
+pluggable: 'lxml' (fast, default) or 'html.parser' (BeautifulSoup's pure
+Python parser, converted to an lxml tree).
 
 Install dependencies:
 pip install requests beautifulsoup4 readability-lxml lxml
 """
 
 import requests
-from bs4 import BeautifulSoup
+import lxml.html
+from dataclasses import dataclass, field
+from lxml.html import HtmlElement
 from readability import Document
+from readability.htmls import get_title
 from urllib.parse import urljoin, urlparse
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Callable, Optional, List, Dict, Any
 import json
+import logging
+import re
+import time
+
+from http_cache import HttpCache, is_page, read_blob
+from head_metadata import HeadScanner, extract_metadata
+from http_session import get_shared_session
+from image_probe import MAX_ADDITIONAL_IMAGES, ImageProber
+from telemetry import METRICS, configure_logging
+
+log = logging.getLogger(__name__)
+
+# Streaming fetch limits (see ArticleScraper.fetch_html)
+MAX_PAGE_BYTES = 10 * 1024 * 1024          # hard cap on body bytes read (and on declared Content-Length)
+BODY_BYTES_AFTER_HEAD = 2 * 1024 * 1024    # body kept after </head>; plenty for Readability
+STREAM_CHUNK_SIZE = 64 * 1024
+HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+
+# Content images: <img> tags with a width or height attribute are skipped
+# without probing unless one of them is at least MIN_IMAGE_DIMENSION, so a
+# single small attribute is enough; tags with neither are kept. With an
+# ImageProber, up to MAX_IMAGE_CANDIDATES are probed for their real size.
+MIN_IMAGE_DIMENSION = 50
+MAX_IMAGE_CANDIDATES = 30
+
+
+class PageRejected(Exception):
+    """Raised when a response is refused from its headers (non-HTML, too large)."""
+
+
+# Fields written when a result is serialized (raw HTML only on request)
+RESULT_FIELDS = [
+    "url",
+    "title",
+    "source",
+    "author",
+    "date",
+    "primary_image",
+    "additional_images",
+    "article_text",
+]
+
+
+@dataclass(slots=True)
+class ArticleResult:
+    """
+    A scraped article.
+
+    Slotted to keep per-result overhead small when holding large batches.
+    The raw page HTML is not kept unless asked for (keep_html=True); when the
+    page came through an HttpCache, html_ref points at its cached blob
+    instead and .html loads it from disk on access.
+    """
+    url: str
+    title: str
+    source: str
+    author: Optional[str]
+    date: Optional[str]
+    primary_image: Optional[str]
+    additional_images: List[str]
+    article_text: str
+    raw_html: Optional[str] = field(default=None, repr=False)
+    html_ref: Optional[str] = field(default=None, repr=False)
+    html_encoding: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def html(self) -> Optional[str]:
+        """Raw HTML if kept, else loaded from the cache blob (not memoized), else None."""
+        if self.raw_html is None and self.html_ref:
+            return read_blob(self.html_ref).decode(self.html_encoding or 'utf-8', 'replace')
+        return self.raw_html
+
+    def to_dict(self, include_html: bool = False) -> Dict[str, Any]:
+        """JSON-ready dict of the result; the raw HTML is left out unless include_html."""
+        data = {name: getattr(self, name) for name in RESULT_FIELDS}
+        if include_html:
+            data['html'] = self.html
+        return data
+
+    def to_json(self, include_html: bool = False) -> str:
+        """One JSONL line for the result."""
+        return json.dumps(self.to_dict(include_html), ensure_ascii=False)
+
+
+# Same parser setup readability uses internally, so handing it our tree
+# produces exactly the summary it would have produced from the raw string.
+_UTF8_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def _parse_with_lxml(html: str) -> HtmlElement:
+    return lxml.html.document_fromstring(html.encode('utf-8', 'replace'), parser=_UTF8_PARSER)
+
+
+def _parse_with_html_parser(html: str) -> HtmlElement:
+    from lxml.html import soupparser
+    return soupparser.fromstring(html, features='html.parser')
+
+
+PARSER_BACKENDS = {
+    'lxml': _parse_with_lxml,
+    'html.parser': _parse_with_html_parser,
+}
+
+# Visible body text only; script/style/template contents aren't article text
+BODY_TEXT_XPATH = '//body//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]'
 
 
 class ArticleScraper:
     """Scrapes article content, metadata, and images from a given URL."""
 
-    def __init__(self, url: str, timeout: int = 15):
+    def __init__(
+        self,
+        url: str,
+        timeout: int = 15,
+        session: Optional[requests.Session] = None,
+        parser: str = 'lxml',
+        cache: Optional[HttpCache] = None,
+        stream: bool = True,
+        max_bytes: int = MAX_PAGE_BYTES,
+        body_bytes: int = BODY_BYTES_AFTER_HEAD,
+        keep_html: bool = False,
+        max_images: int = MAX_ADDITIONAL_IMAGES,
+        image_prober: Optional[ImageProber] = None,
+        head_filter: Optional[Callable[[Dict[str, Optional[str]]], Optional[str]]] = None,
+    ):
+        if parser not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend '{parser}'. Choose from: {', '.join(PARSER_BACKENDS)}")
         self.url = url
         self.timeout = timeout
+        self.parser = parser
+        # Seconds spent in each extraction stage for the last page processed
+        self.stage_timings: Dict[str, float] = {}
+        # Reuse pooled keep-alive connections across scrapers unless told otherwise
+        self.session = session or get_shared_session()
+        # Optional on-disk cache with conditional revalidation (see http_cache.py)
+        self.cache = cache
+        # Streaming mode: reject by headers, then read at most max_bytes, stopping
+        # body_bytes after </head>. stream=False reads the whole response as before.
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.body_bytes = body_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        # HTTP status of the last fetch (None if no response came back)
+        self.status_code: Optional[int] = None
+        # Raw HTML is opt-in on results; otherwise only a cache reference is kept
+        self.keep_html = keep_html
+        self.html_ref: Optional[str] = None
+        self.html_encoding: Optional[str] = None
+        # At most max_images additional_images: the first ones in the article, or
+        # with an image_prober the largest usable of its first MAX_IMAGE_CANDIDATES
+        self.max_images = max_images
+        self.image_prober = image_prober
+        # Called with the <head> metadata (raw values, see head_metadata.HeadScanner);
+        # a returned reason rejects the page. Streaming, it runs as soon as the head
+        # has arrived, before the body is read; cached and stream=False pages are
+        # checked the same way once their body is in hand
+        self.head_filter = head_filter
+        self.head_metadata: Optional[Dict[str, Optional[str]]] = None
         self.headers = {
             'User-Agent': 'SmartStorySuiteBot/1.0 (+https://your-domain.com/bot-info)',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
         }
 
-    def fetch_article(self) -> Dict[str, Any]:
+    def fetch_article(self) -> ArticleResult:
         """
         Fetches and extracts article content, metadata, and images.
 
         Returns:
-            Dictionary containing:
+            ArticleResult containing:
                 - article_text: Main article content
                 - title: Article title
                 - source: Source/site name
@@ -52,57 +214,81 @@ class ArticleScraper:
                 - date: Publication date (if available)
                 - primary_image: Primary og:image URL
                 - additional_images: List of additional image URLs from content
-                - html: Raw HTML content
+                - html: Raw HTML content (only if keep_html, or lazily from the cache)
         """
+        html = self.fetch_html()
         try:
-            # Fetch the HTML
-            response = requests.get(self.url, headers=self.headers, timeout=self.timeout)
-            response.raise_for_status()
-
-            # Check content type
-            content_type = response.headers.get('content-type', '')
-            if 'text/html' not in content_type:
-                print(f"Warning: Content type is not HTML ({content_type}). Attempting parse anyway.")
-
-            html = response.text
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Extract metadata
-            metadata = self._extract_metadata(soup)
-
-            # Extract article content using Readability
-            doc = Document(html)
-            article_html = doc.summary()
-            article_text = BeautifulSoup(article_html, 'html.parser').get_text()
-            article_title = doc.title()
-
-            # Fallback if Readability fails
-            if not article_text or len(article_text.strip()) < 150:
-                print("Readability failed or content too short. Falling back to body text.")
-                body_text = soup.body.get_text() if soup.body else ""
-                if body_text and len(body_text.strip()) > 150:
-                    article_text = body_text
-                    article_title = soup.title.string if soup.title else "Title not found"
-                else:
-                    raise ValueError("Could not extract sufficient article content.")
-
-            # Extract additional images from article content
-            additional_images = self._extract_content_images(article_html, metadata['primary_image'])
-
-            # Use metadata author if Readability didn't find one
-            author = metadata['author']
+            result = self.extract(html)
+        except Exception as e:
+            raise Exception(f"Error fetching or parsing article: {str(e)}")
+        if not self.keep_html and self.html_ref:
+            result.html_ref = self.html_ref
+            result.html_encoding = self.html_encoding
+        return result
 
-            return {
-                'article_text': article_text.strip(),
-                'title': article_title or soup.title.string or "Title not found",
-                'source': self._infer_source(),
-                'author': author,
-                'date': metadata['date'],
-                'primary_image': metadata['primary_image'],
-                'additional_images': additional_images,
-                'html': html
-            }
+    def fetch_html(self) -> str:
+        """
+        Fetches the raw page HTML without extracting anything.
 
+        Kept separate from extract() so I/O and CPU-bound parsing can run in
+        different pools (see extraction_pool.py). Timed as the 'fetch' stage.
+        """
+        started = time.perf_counter()
+        try:
+            html = self._fetch_html()
+        except Exception:
+            METRICS.inc('fetch_errors')
+            raise
+        finally:
+            METRICS.observe('fetch', time.perf_counter() - started)
+        METRICS.inc('pages_fetched')
+        METRICS.inc('bytes_fetched', self.bytes_read or 0)
+        return html
+
+    def _fetch_html(self) -> str:
+        try:
+            # Fetch the HTML
+            if self.cache is not None:
+                response = self.cache.fetch(
+                    self.session, self.url, headers=self.headers, timeout=self.timeout, stream=self.stream
+                )
+            else:
+                response = self.session.get(self.url, headers=self.headers, timeout=self.timeout, stream=self.stream)
+            self.status_code = response.status_code
+
+            try:
+                response.raise_for_status()
+
+                # Check content type
+                content_type = response.headers.get('content-type', '')
+                if not self.stream:
+                    if 'text/html' not in content_type:
+                        log.warning("Content type is not HTML (%s). Attempting parse anyway.", content_type,
+                                    extra={'url': self.url})
+                    self.bytes_read = len(response.content)
+                    self._filter_body(response.content)
+                    return response.text
+
+                self._check_headers(response)
+                if not response._content_consumed:
+                    self._read_capped(response)
+                    # Only complete pages go in the cache
+                    if self.cache is not None and not self.truncated:
+                        self.cache.store(self.url, response)
+                else:
+                    # Already read: a cache hit or 304 revalidation
+                    self.bytes_read = len(response.content)
+                    self._filter_body(response.content)
+
+                if self.cache is not None and not self.truncated:
+                    self.html_ref = self.cache.blob_ref(self.url)
+                    self.html_encoding = response.encoding
+                return response.text
+            finally:
+                response.close()
+
+        except PageRejected:
+            raise
         except requests.exceptions.Timeout:
             raise Exception("Failed to fetch article: The request timed out.")
         except requests.exceptions.HTTPError as e:
@@ -115,78 +301,165 @@ class ArticleScraper:
         except Exception as e:
             raise Exception(f"Error fetching or parsing article: {str(e)}")
 
-    def _extract_metadata(self, soup: BeautifulSoup) -> Dict[str, Optional[str]]:
-        """Extracts metadata from HTML meta tags."""
-        metadata = {
-            'primary_image': None,
-            'date': None,
-            'author': None
-        }
-
-        # Extract primary image (og:image)
-        try:
-            og_image = soup.find('meta', property='og:image')
-            if og_image and og_image.get('content'):
-                potential_url = og_image.get('content')
-                absolute_url = urljoin(self.url, potential_url)
-                parsed = urlparse(absolute_url)
-                if parsed.scheme in ['http', 'https']:
-                    metadata['primary_image'] = absolute_url
-                    print(f"DEBUG: Validated/Resolved primary image URL: {absolute_url}")
-                else:
-                    print(f"DEBUG: Resolved URL has non-http(s) protocol ({parsed.scheme}). Discarding.")
-            else:
-                print(f"DEBUG: No og:image meta tag found for {self.url}.")
-        except Exception as e:
-            print(f"DEBUG: Error extracting og:image: {str(e)}")
-
-        # Extract date
-        try:
-            date_tag = (
-                soup.find('meta', property='article:published_time') or
-                soup.find('meta', attrs={'name': 'date'}) or
-                soup.find('meta', attrs={'name': 'pubdate'}) or
-                soup.find('meta', attrs={'name': 'timestamp'}) or
-                soup.find('time', attrs={'datetime': True})
+    def _check_headers(self, response: requests.Response) -> None:
+        """Rejects non-HTML and oversized responses before reading the body."""
+        content_type = response.headers.get('content-type', '').lower()
+        if not is_page(content_type):
+            raise PageRejected(f"Failed to fetch article: Content type is not HTML ({content_type}).")
+
+        content_length = response.headers.get('content-length', '')
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise PageRejected(
+                f"Failed to fetch article: Page is too large ({int(content_length)} bytes, "
+                f"cap is {self.max_bytes})."
             )
 
-            if date_tag:
-                date_str = date_tag.get('content') or date_tag.get('datetime')
-                if date_str:
-                    try:
-                        parsed_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                        metadata['date'] = parsed_date.strftime('%B %d, %Y')
-                        print(f"DEBUG: Formatted scraped date: {metadata['date']}")
-                    except Exception as date_error:
-                        print(f"DEBUG: Could not parse date '{date_str}': {date_error}")
-                        metadata['date'] = date_str
-        except Exception as e:
-            print(f"DEBUG: Error extracting date: {str(e)}")
+    def _read_capped(self, response: requests.Response) -> None:
+        """
+        Reads a streamed body in chunks until it ends, the byte cap is hit, or
+        body_bytes have arrived after </head>. Leaves the bytes read on the
+        response so response.text decodes them the usual way. With a
+        head_filter, the <head> is scanned as it arrives and a rejected page
+        raises PageRejected before its body is read.
+        """
+        buf = bytearray()
+        head_end = None
+        self.truncated = False
+        scanner = HeadScanner() if self.head_filter is not None else None
+
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            if scanner is not None and scanner.feed(chunk):
+                try:
+                    self._apply_head_filter(scanner)
+                except PageRejected:
+                    self.bytes_read = len(buf) + len(chunk)
+                    # The rest of the body is still on the socket
+                    response.raw.close()
+                    raise
+                scanner = None
+            if head_end is None:
+                # Overlap the search with the previous chunk in case the tag is split
+                match = HEAD_END_RE.search(buf + chunk, max(len(buf) - 8, 0))
+                if match:
+                    head_end = match.end()
+            buf += chunk
+
+            if len(buf) >= self.max_bytes or (head_end is not None and len(buf) - head_end >= self.body_bytes):
+                self.truncated = True
+                break
+
+        if self.truncated:
+            limit = self.max_bytes if head_end is None else min(self.max_bytes, head_end + self.body_bytes)
+            del buf[limit:]
+            # Unread data is still on the socket; don't hand this connection back to the pool
+            response.raw.close()
+
+        self.bytes_read = len(buf)
+        if scanner is not None:
+            # Page ended without a recognisable end of <head>
+            self._apply_head_filter(scanner)
+
+        response._content = bytes(buf)
+        response._content_consumed = True
+
+    def _filter_body(self, content: bytes) -> None:
+        """Runs head_filter over a body that was read in full (cache hit, 304, stream=False)."""
+        if self.head_filter is not None:
+            scanner = HeadScanner()
+            scanner.feed(content)
+            self._apply_head_filter(scanner)
+
+    def _apply_head_filter(self, scanner: HeadScanner) -> None:
+        scanner.close()
+        self.head_metadata = scanner.metadata()
+        reason = self.head_filter(self.head_metadata)
+        if reason:
+            METRICS.inc('pages_rejected_head')
+            raise PageRejected(f"Failed to fetch article: Rejected from <head> ({reason}).")
+
+    def extract(self, html: str) -> ArticleResult:
+        """
+        Extracts article content, metadata, and images from already-fetched HTML.
 
-        # Extract author
-        try:
-            author_tag = (
-                soup.find('meta', attrs={'name': 'author'}) or
-                soup.find('meta', property='article:author') or
-                soup.find('meta', attrs={'name': 'article:author'}) or
-                soup.find('meta', property='book:author')
-            )
+        The page is parsed once; every stage below reads the same tree.
+        Per-stage timings are left in self.stage_timings and recorded in
+        METRICS (parse, metadata, readability, images).
 
-            if author_tag and author_tag.get('content'):
-                author = author_tag.get('content').strip()
-                if author.lower().startswith('by '):
-                    author = author[3:].strip()
-                metadata['author'] = author
-                print(f"DEBUG: Scraped author from meta tag: {author}")
+        Returns:
+            ArticleResult, carrying the raw HTML only if keep_html.
+        """
+        timings = self.stage_timings = {}
+
+        started = time.perf_counter()
+        tree = PARSER_BACKENDS[self.parser](html)
+        timings['parse'] = time.perf_counter() - started
+
+        # Metadata and title are read before Readability, which drops hidden
+        # elements from the tree it is given.
+        started = time.perf_counter()
+        metadata = self._extract_metadata(tree)
+        page_title = tree.findtext('.//title')
+        timings['metadata'] = time.perf_counter() - started
+
+        # Extract article content using Readability. It works on copies of our
+        # tree and leaves the cleaned article tree on doc.html, so nothing
+        # has to be re-parsed from its HTML output.
+        started = time.perf_counter()
+        doc = Document(tree)
+        doc.summary()
+        article_tree = doc.html
+        article_text = article_tree.text_content()
+        article_title = get_title(tree)
+        timings['readability'] = time.perf_counter() - started
+
+        # Fallback if Readability fails
+        if not article_text or len(article_text.strip()) < 150:
+            log.info("Readability failed or content too short. Falling back to body text.", extra={'url': self.url})
+            METRICS.inc('readability_fallbacks')
+            body_text = "".join(tree.xpath(BODY_TEXT_XPATH))
+            if body_text and len(body_text.strip()) > 150:
+                article_text = body_text
+                article_title = page_title or "Title not found"
             else:
-                print(f"DEBUG: No standard author meta tag found for {self.url}.")
-        except Exception as e:
-            print(f"DEBUG: Error extracting author: {str(e)}")
-
+                raise ValueError("Could not extract sufficient article content.")
+
+        # Extract additional images from article content
+        started = time.perf_counter()
+        limit = MAX_IMAGE_CANDIDATES if self.image_prober is not None else self.max_images
+        additional_images = self._extract_content_images(article_tree, metadata['primary_image'], limit)
+        timings['images'] = time.perf_counter() - started
+        if self.image_prober is not None:
+            # Network-bound; timed per image as 'image_probe'
+            additional_images = self.image_prober.select(additional_images, self.max_images)
+
+        # Use metadata author if Readability didn't find one
+        author = metadata['author']
+
+        for stage, seconds in timings.items():
+            METRICS.observe(stage, seconds)
+        METRICS.inc('articles_extracted')
+
+        return ArticleResult(
+            url=self.url,
+            title=article_title or page_title or "Title not found",
+            source=self._infer_source(),
+            author=author,
+            date=metadata['date'],
+            primary_image=metadata['primary_image'],
+            additional_images=additional_images,
+            article_text=article_text.strip(),
+            raw_html=html if self.keep_html else None,
+        )
+
+    def _extract_metadata(self, tree: HtmlElement) -> Dict[str, Optional[str]]:
+        """Extracts primary image, date and author in one pass over meta/time/JSON-LD tags (see head_metadata.py)."""
+        metadata = extract_metadata(tree, self.url)
+        log.debug("Scraped metadata for %s: %s", self.url, metadata)
         return metadata
 
-    def _extract_content_images(self, article_html: str, primary_image: Optional[str]) -> List[str]:
-        """Extracts additional images from article content."""
+    def _extract_content_images(self, article_tree: HtmlElement, primary_image: Optional[str],
+                                limit: int = MAX_ADDITIONAL_IMAGES) -> List[str]:
+        """Extracts up to `limit` additional image URLs from the Readability article tree."""
         additional_images = []
         seen_urls = set()
 
@@ -194,13 +467,9 @@ class ArticleScraper:
             seen_urls.add(primary_image)
 
         try:
-            content_soup = BeautifulSoup(article_html, 'html.parser')
-            images = content_soup.find_all('img')
-
-            print(f"DEBUG: Found {len(images)} <img> tags within Readability content.")
+            images = list(article_tree.iter('img'))
 
-            MIN_DIMENSION = 50
-            MAX_ADDITIONAL_IMAGES = 10
+            log.debug("Found %d <img> tags within Readability content.", len(images))
 
             for img in images:
                 src = img.get('src')
@@ -211,21 +480,21 @@ class ArticleScraper:
                     try:
                         absolute_src = urljoin(self.url, src)
                         parsed = urlparse(absolute_src)
-                        is_likely_content = (width == 0 and height == 0) or width >= MIN_DIMENSION or height >= MIN_DIMENSION
+                        is_likely_content = (width == 0 and height == 0) or width >= MIN_IMAGE_DIMENSION or height >= MIN_IMAGE_DIMENSION
 
                         if parsed.scheme in ['http', 'https'] and absolute_src not in seen_urls and is_likely_content:
                             additional_images.append(absolute_src)
                             seen_urls.add(absolute_src)
 
-                            if len(additional_images) >= MAX_ADDITIONAL_IMAGES:
+                            if len(additional_images) >= limit:
                                 break
                     except Exception as url_error:
-                        print(f"DEBUG: Could not parse or resolve image src '{src}': {url_error}")
+                        log.debug("Could not parse or resolve image src '%s': %s", src, url_error)
 
-            print(f"DEBUG: Added {len(additional_images)} valid additional image URLs.")
+            log.debug("Added %d valid additional image URLs.", len(additional_images))
 
         except Exception as e:
-            print(f"DEBUG: Error parsing article content HTML: {str(e)}")
+            log.debug("Error parsing article content HTML: %s", e)
 
         return additional_images
 
@@ -237,6 +506,7 @@ class ArticleScraper:
 
 def main():
     """Example usage of the ArticleScraper (Colab-friendly)."""
+    configure_logging(fmt='text')  # LOG_LEVEL=DEBUG to trace each step
 
     print("📰 Article Scraper")
     print("=" * 80)
@@ -256,27 +526,19 @@ def main():
         print("\n" + "=" * 80)
         print("SCRAPING RESULTS")
         print("=" * 80)
-        print(f"\nTitle: {result['title']}")
-        print(f"Source: {result['source']}")
-        print(f"Author: {result['author'] or 'N/A'}")
-        print(f"Date: {result['date'] or 'N/A'}")
-        print(f"Primary Image: {result['primary_image'] or 'N/A'}")
-        print(f"Additional Images: {len(result['additional_images'])}")
-        print(f"\nArticle Text Length: {len(result['article_text'])} characters")
-        print(f"\nFirst 500 characters:\n{result['article_text'][:500]}...")
+        print(f"\nTitle: {result.title}")
+        print(f"Source: {result.source}")
+        print(f"Author: {result.author or 'N/A'}")
+        print(f"Date: {result.date or 'N/A'}")
+        print(f"Primary Image: {result.primary_image or 'N/A'}")
+        print(f"Additional Images: {len(result.additional_images)}")
+        print(f"\nArticle Text Length: {len(result.article_text)} characters")
+        print(f"\nFirst 500 characters:\n{result.article_text[:500]}...")
 
         # Save to JSON
         output_file = "scraped_article.json"
         with open(output_file, "w", encoding="utf-8") as f:
-            json.dump({
-                "title": result["title"],
-                "source": result["source"],
-                "author": result["author"],
-                "date": result["date"],
-                "primary_image": result["primary_image"],
-                "additional_images": result["additional_images"],
-                "article_text": result["article_text"]
-            }, f, indent=2, ensure_ascii=False)
+            json.dump(result.to_dict(), f, indent=2, ensure_ascii=False)
 
         print(f"\n✅ Results saved to {output_file}")
 
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Local stand-in HTTP server for benchmarks and offline checks.
+
+Serves canned responses from an in-memory route table on 127.0.0.1 with a
+configurable per-request latency, so the scraper can be exercised without
+touching real publisher sites.
+
+Example:
+    with StandInServer({'/article': article_page('Hello')}, latency=0.2) as server:
+        ArticleScraper(server.url('/article')).fetch_article()
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple, Union
+
+# (status, headers, body)
+Response = Tuple[int, Dict[str, str], bytes]
+# A route is either a canned response or a callable that builds one from the handler
+Route = Union[Response, Callable[[BaseHTTPRequestHandler], Response]]
+
+PARAGRAPH = (
+    "City officials confirmed on Tuesday that the new transit line will open ahead of schedule, "
+    "citing faster than expected progress on tunnelling and station fit-out. Commuters along the "
+    "route have waited nearly a decade for the project, which was delayed twice by funding disputes. "
+)
+
+
+def article_page(title: str, paragraphs: int = 8, images: int = 2) -> Response:
+    """Builds a canned news article page with metadata, body text and images."""
+    body = "".join(f"<p>{PARAGRAPH}</p>\n" for _ in range(paragraphs))
+    imgs = "".join(f'<img src="/images/{i}.jpg" width="640" height="360">\n' for i in range(images))
+    html = f"""<!DOCTYPE html>
+<html>
+<head>
+<title>{title}</title>
+<meta property="og:image" content="/images/lead.jpg">
+<meta property="article:published_time" content="2025-11-04T09:30:00Z">
+<meta name="author" content="By Jane Reporter">
+</head>
+<body>
+<nav><a href="/">Home</a> <a href="/news">News</a></nav>
+<article>
+<h1>{title}</h1>
+{imgs}{body}</article>
+<footer>Copyright Example News</footer>
+</body>
+</html>"""
+    return 200, {'Content-Type': 'text/html; charset=utf-8'}, html.encode('utf-8')
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up early (aborted or size-capped reads) is expected here
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class StandInServer:
+    """Threaded HTTP server serving a fixed route table with artificial latency."""
+
+    def __init__(self, routes: Dict[str, Route], latency: Union[float, Callable[[str], float]] = 0.0):
+        self.routes = routes
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd: Optional[_QuietHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def url(self, path: str = '/') -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def start(self) -> 'StandInServer':
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out as two writes; with Nagle on, the body waits
+            # for the client's delayed ACK (~40 ms on Linux) on keep-alive connections
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._serve(self, send_body=True)
+
+            def do_HEAD(self):
+                server._serve(self, send_body=False)
+
+            def do_POST(self):
+                server._serve(self, send_body=True)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = _QuietHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _serve(self, handler: BaseHTTPRequestHandler, send_body: bool) -> None:
+        with self._lock:
+            self.request_count += 1
+
+        # Always drain the request body so keep-alive connections stay in sync
+        length = int(handler.headers.get('Content-Length') or 0)
+        handler.request_body = handler.rfile.read(length) if length else b''
+
+        path = handler.path.split('?', 1)[0]
+        delay = self.latency(path) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+
+        route = self.routes.get(path)
+        if route is None:
+            status, headers, body = 404, {'Content-Type': 'text/plain'}, b'Not Found'
+        elif callable(route):
+            status, headers, body = route(handler)
+        else:
+            status, headers, body = route
+
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        if not any(name.lower() == 'content-length' for name in headers):
+            handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if send_body:
+            try:
+                handler.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client gave up early (e.g. a size-capped or aborted read)
+                pass
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Structured logging and hot-path timers/counters for the scraper and the
+script generation code.
+
+Logging goes through the standard logging module, so it is level-gated and
+lazily formatted: log.debug("image %s", url) costs a level check when
+DEBUG is off, never a string format or a write. configure_logging() writes
+one JSON object per line (or plain text), with any extra= fields as keys,
+and by default does the writing on a background thread (QueueHandler), so
+hot loops never block on stderr.
+
+METRICS is a process-wide registry of per-stage timers (histograms: count,
+sum, max, buckets) and counters, cheap enough to record on every page and
+every generation batch:
+
+    fetch, parse, metadata, readability, images   (python_scraper.py)
+    tokenize, prefill, decode                      (finetuning/generate.py)
+
+and exports them as JSON or Prometheus text format, so a production run
+shows where the time actually goes.
+
+Usage:
+log = logging.getLogger(__name__)
+configure_logging('INFO')                     # once, in main()
+with METRICS.timer('parse'):
+    tree = parse(html)
+METRICS.inc('pages_fetched')
+METRICS.write('metrics.prom')                 # or .json
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO
+
+DEFAULT_LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING')
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+PROMETHEUS_NAMESPACE = 'tiktok_pipeline'
+
+# Seconds; upper bounds of the timer histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, plus the record's extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: Optional[str] = None, fmt: str = 'json', stream: TextIO = sys.stderr,
+                      background: bool = True) -> None:
+    """
+    Sets up the root logger: `level` (default $LOG_LEVEL or WARNING), 'json'
+    or 'text' lines on `stream`. With `background`, records are handed to a
+    queue and written by a listener thread (flushed at exit).
+    """
+    global _listener
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _stop_listener()
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    if background:
+        records: "queue.SimpleQueue" = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler)
+        _listener.start()
+        handler = logging.handlers.QueueHandler(records)
+    root.addHandler(handler)
+    root.setLevel((level or DEFAULT_LOG_LEVEL).upper())
+
+
+@atexit.register
+def _stop_listener() -> None:
+    # Writes out whatever the background listener still has queued
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class _Timer:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self, bucket_count: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * bucket_count   # observations per bucket (not cumulative)
+
+
+class Metrics:
+    """Thread-safe registry of named timers and counters."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._timers: Dict[str, _Timer] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Records one timing for `stage`."""
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            timer = self._timers.get(stage)
+            if timer is None:
+                timer = self._timers[stage] = _Timer(len(self.buckets) + 1)
+            timer.count += 1
+            timer.total += seconds
+            if seconds > timer.max:
+                timer.max = seconds
+            timer.buckets[index] += 1
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Times the with-block as one observation of `stage` (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Timers (count, total/mean/max seconds) and counters as plain dicts."""
+        with self._lock:
+            timers = {
+                stage: {
+                    'count': t.count,
+                    'total_seconds': round(t.total, 6),
+                    'mean_seconds': round(t.total / t.count, 6) if t.count else 0.0,
+                    'max_seconds': round(t.max, 6),
+                }
+                for stage, t in sorted(self._timers.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        total = sum(t['total_seconds'] for t in timers.values())
+        for t in timers.values():
+            t['share'] = round(t['total_seconds'] / total, 4) if total else 0.0
+        return {'timers': timers, 'counters': counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, namespace: str = PROMETHEUS_NAMESPACE) -> str:
+        """Prometheus text exposition format: one histogram over stages, one counter per name."""
+        with self._lock:
+            timers = {stage: (t.count, t.total, list(t.buckets)) for stage, t in sorted(self._timers.items())}
+            counters = dict(sorted(self._counters.items()))
+
+        name = f"{namespace}_stage_seconds"
+        lines: List[str] = [f"# HELP {name} Time spent per pipeline stage.", f"# TYPE {name} histogram"]
+        for stage, (count, total, buckets) in timers.items():
+            cumulative = 0
+            for bound, observed in zip(self.buckets, buckets):
+                cumulative += observed
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        for counter, value in counters.items():
+            metric = f"{namespace}_{counter}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Writes Prometheus text to *.prom / *.txt, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json() + "\n"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Returns and clears everything recorded so far, e.g. in a worker
+        process after each task, for merge() into the parent's registry.
+        """
+        with self._lock:
+            state = {
+                'timers': {stage: (t.count, t.total, t.max, t.buckets) for stage, t in self._timers.items()},
+                'counters': self._counters,
+            }
+            self._timers = {}
+            self._counters = {}
+        return state
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        """Adds the timers and counters of a drain() (same buckets) to this registry."""
+        with self._lock:
+            for stage, (count, total, longest, buckets) in state['timers'].items():
+                timer = self._timers.get(stage)
+                if timer is None:
+                    timer = self._timers[stage] = _Timer(len(self.buckets) + 1)
+                timer.count += count
+                timer.total += total
+                timer.max = max(timer.max, longest)
+                timer.buckets = [a + b for a, b in zip(timer.buckets, buckets)]
+            for name, value in state['counters'].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def format_table(self) -> str:
+        """Human-readable summary, slowest stage first."""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':12} {'count':>8} {'total s':>10} {'mean ms':>9} {'max ms':>9} {'share':>6}"]
+        for stage, t in sorted(snapshot['timers'].items(), key=lambda item: -item[1]['total_seconds']):
+            lines.append(f"{stage:12} {t['count']:8d} {t['total_seconds']:10.3f} {t['mean_seconds'] * 1000:9.2f} "
+                         f"{t['max_seconds'] * 1000:9.2f} {t['share']:6.1%}")
+        for name, value in snapshot['counters'].items():
+            lines.append(f"{name}: {value:g}")
+        return "\n".join(lines)
+
+
+METRICS = Metrics()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+URL normalization used as the key for cached and indexed articles.
+
+Two URLs that point at the same article should normalize to the same
+string: scheme and host are lowercased, default ports and fragments are
+dropped, tracking parameters (utm_*, fbclid, ...) are removed and the
+remaining query parameters are sorted.
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    'ref_src', 'cmpid', 'smid', 'smtyp', 'ocid', 'taid',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """Returns a canonical form of `url` for use as a cache/index key."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
@@ -0,0 +1,110 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { EmptyScriptError, generateSpeechFromSentences } from '@/lib/tts';
+
+// finetuning/script_server.py
+const SCRIPT_SERVER_URL = process.env.SCRIPT_SERVER_URL || 'http://127.0.0.1:8765';
+
+interface ScriptEvent {
+  event: 'token' | 'sentence' | 'done' | 'error';
+  text?: string;
+  script?: string;
+  error?: string;
+  time_to_first_sentence?: number | null;
+  seconds?: number;
+}
+
+// Parse the server's NDJSON stream into events as lines arrive
+async function* readEvents(body: ReadableStream<Uint8Array>): AsyncGenerator<ScriptEvent> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let newline = buffer.indexOf('\n');
+    while (newline >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) yield JSON.parse(line);
+      newline = buffer.indexOf('\n');
+    }
+  }
+  if (buffer.trim()) yield JSON.parse(buffer);
+}
+
+export async function POST(request: NextRequest) {
+  const started = Date.now();
+  try {
+    const { summary } = await request.json();
+
+    if (!summary || typeof summary !== 'string' || summary.trim().length === 0) {
+      return NextResponse.json(
+        { error: 'Summary is required and must be a non-empty string' },
+        { status: 400 }
+      );
+    }
+
+    // Stream the script: each sentence goes to TTS as soon as it is decoded
+    const response = await fetch(`${SCRIPT_SERVER_URL}/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ summary }),
+    });
+
+    if (!response.ok || !response.body) {
+      return NextResponse.json(
+        { error: 'Script generation failed', details: `script server answered ${response.status}` },
+        { status: 502 }
+      );
+    }
+
+    const generation: { done?: ScriptEvent } = {};
+    const body = response.body;
+    async function* sentences() {
+      for await (const event of readEvents(body)) {
+        if (event.event === 'sentence' && event.text) {
+          yield event.text;
+        } else if (event.event === 'done') {
+          generation.done = event;
+        } else if (event.event === 'error') {
+          throw new Error(event.error || 'Script generation failed');
+        }
+      }
+    }
+
+    const result = await generateSpeechFromSentences(sentences());
+    const metrics = {
+      timeToFirstSentence: generation.done?.time_to_first_sentence ?? null,
+      timeToFirstAudio: result.timeToFirstAudio,
+      generationSeconds: generation.done?.seconds ?? null,
+      totalSeconds: (Date.now() - started) / 1000,
+    };
+    console.log('Script + audio pipeline:', metrics);
+
+    return NextResponse.json({
+      success: true,
+      text: generation.done?.script ?? result.text,
+      audioPath: result.audioPath,
+      timings: result.timings,
+      duration: result.duration,
+      metrics,
+    });
+  } catch (error) {
+    if (error instanceof EmptyScriptError) {
+      return NextResponse.json(
+        { error: 'Script generation failed', details: error.message },
+        { status: 502 }
+      );
+    }
+    console.error('Error generating script audio:', error);
+    return NextResponse.json(
+      { error: 'Failed to generate script audio', details: error instanceof Error ? error.message : 'Unknown error' },
+      { status: 500 }
+    );
+  }
+}
@@ -1,5 +1,5 @@
 import { EdgeTTS } from 'node-edge-tts';
-import { readFileSync, existsSync } from 'fs';
+import { readFileSync, existsSync, writeFileSync, unlinkSync } from 'fs';
 
 export interface WordTiming {
   word: string;
@@ -13,32 +13,43 @@ interface SubtitleEntry {
   end: number; // in milliseconds
 }
 
-export async function generateSpeechWithTimings(text: string): Promise<{
-  audioPath: string;
-  timings: WordTiming[];
-  duration: number;
-}> {
+/**
+ * Thrown by generateSpeechFromSentences when the stream ends without a
+ * single sentence, e.g. the script server produced an empty script
+ */
+export class EmptyScriptError extends Error {
+  constructor(message = 'No sentences to synthesize: the script is empty') {
+    super(message);
+    this.name = 'EmptyScriptError';
+  }
+}
+
+// Constant bitrate, so an MP3's duration is its size * 8 / bitrate
+const OUTPUT_FORMAT = 'audio-24khz-48kbitrate-mono-mp3';
+const OUTPUT_BITS_PER_SECOND = 48000;
+
+function createTTS(): EdgeTTS {
   // Use an expressive voice for natural-sounding narration
   // en-US-AriaNeural is female, expressive
   // en-US-GuyNeural is male, expressive
   const voice = 'en-US-AriaNeural';
 
-  const tts = new EdgeTTS({
+  return new EdgeTTS({
     voice,
     lang: 'en-US',
-    outputFormat: 'audio-24khz-48kbitrate-mono-mp3',
+    outputFormat: OUTPUT_FORMAT,
     saveSubtitles: true, // Save subtitle timing data
     rate: '+0%', // Normal speed
     pitch: '+0Hz', // Normal pitch
     timeout: 60000, // 60 seconds timeout for longer texts
   });
+}
 
-  const timestamp = Date.now();
-  const audioFileName = `speech_${timestamp}.mp3`;
-  const audioPath = `public/audio/${audioFileName}`;
-  const subtitlePath = `${audioPath}.json`;
-
-  // Generate the audio file with subtitle data
+/**
+ * Synthesize text to audioPath and return its word timings
+ * (from the subtitle file Edge TTS writes next to it)
+ */
+async function synthesize(tts: EdgeTTS, text: string, audioPath: string): Promise<WordTiming[]> {
   console.log('Starting TTS generation for text length:', text.length);
   try {
     await tts.ttsPromise(text, audioPath);
@@ -49,6 +60,7 @@ export async function generateSpeechWithTimings(text: string): Promise<{
   }
 
   // Read and parse the subtitle data
+  const subtitlePath = `${audioPath}.json`;
   let timings: WordTiming[] = [];
   if (existsSync(subtitlePath)) {
     const subtitleData = readFileSync(subtitlePath, 'utf-8');
@@ -59,6 +71,22 @@ export async function generateSpeechWithTimings(text: string): Promise<{
   if (timings.length === 0) {
     timings = createFallbackTimings(text);
   }
+  return timings;
+}
+
+export async function generateSpeechWithTimings(text: string): Promise<{
+  audioPath: string;
+  timings: WordTiming[];
+  duration: number;
+}> {
+  const tts = createTTS();
+
+  const timestamp = Date.now();
+  const audioFileName = `speech_${timestamp}.mp3`;
+  const audioPath = `public/audio/${audioFileName}`;
+
+  // Generate the audio file with subtitle data
+  const timings = await synthesize(tts, text, audioPath);
 
   // Calculate duration from timings or estimate
   const duration = timings.length > 0
@@ -72,6 +100,75 @@ export async function generateSpeechWithTimings(text: string): Promise<{
   };
 }
 
+/**
+ * Synthesize a script sentence by sentence, as the sentences arrive
+ * (e.g. from the script server's /stream endpoint), instead of
+ * waiting for the whole script. Each sentence is one Edge TTS call;
+ * the MP3s are joined into one file and the word timings shifted by
+ * the audio before them, so the result is used like
+ * generateSpeechWithTimings'. Throws EmptyScriptError (and writes
+ * nothing) if no sentence arrives.
+ */
+export async function generateSpeechFromSentences(sentences: AsyncIterable<string>): Promise<{
+  text: string;
+  audioPath: string;
+  timings: WordTiming[];
+  duration: number;
+  timeToFirstAudio: number | null; // seconds until the first sentence was synthesized
+}> {
+  const tts = createTTS();
+  const started = Date.now();
+
+  const timestamp = Date.now();
+  const audioFileName = `speech_${timestamp}.mp3`;
+  const parts: Buffer[] = [];
+  const timings: WordTiming[] = [];
+  const texts: string[] = [];
+  let offset = 0; // seconds of audio so far
+  let timeToFirstAudio: number | null = null;
+
+  for await (const sentence of sentences) {
+    const partPath = `public/audio/speech_${timestamp}_${parts.length}.mp3`;
+    const partTimings = await synthesize(tts, sentence, partPath);
+    const audio = readFileSync(partPath);
+    unlinkSync(partPath);
+    if (existsSync(`${partPath}.json`)) {
+      unlinkSync(`${partPath}.json`);
+    }
+
+    for (const timing of partTimings) {
+      timings.push({
+        word: timing.word,
+        startTime: timing.startTime + offset,
+        endTime: timing.endTime + offset,
+      });
+    }
+    offset += (audio.length * 8) / OUTPUT_BITS_PER_SECOND;
+    parts.push(audio);
+    texts.push(sentence);
+    if (timeToFirstAudio === null) {
+      timeToFirstAudio = (Date.now() - started) / 1000;
+    }
+  }
+
+  if (parts.length === 0) {
+    throw new EmptyScriptError();
+  }
+
+  // MP3 frames can simply be concatenated
+  const audioPath = `public/audio/${audioFileName}`;
+  writeFileSync(audioPath, Buffer.concat(parts));
+  console.log(`Joined ${parts.length} sentences (${offset.toFixed(1)}s of audio) into ${audioPath}`);
+
+  return {
+    text: texts.join(' '),
+    audioPath: `/audio/${audioFileName}`,
+    timings,
+    duration: offset + 0.5,
+    timeToFirstAudio,
+  };
+}
+
 function parseSubtitleJSON(jsonData: string): WordTiming[] {
   const timings: WordTiming[] = [];
 